@@ -3,6 +3,9 @@ from __future__ import annotations
 
 import os
 import sys
+import time
+
+_STARTED = time.perf_counter()   # start of the startup-time measurement (see MainWindow)
 
 
 def _prepare_sys_path() -> None:
@@ -36,12 +39,194 @@ def _resolve_main_window():
         return MainWindow
 
 
+def _headless_verify(argv) -> int | None:
+    """
+    `--verify [--repair] [--remove-extra] [--full]`: check .minecraft against the manifest of
+    the installed version (verify.manifest_to_check) without opening the window. Returns the
+    exit code, or None for normal GUI start.
+    """
+    import argparse
+
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("--verify", action="store_true")
+    ap.add_argument("--repair", action="store_true")
+    ap.add_argument("--remove-extra", action="store_true")
+    ap.add_argument("--full", action="store_true", help="re-hash everything (ignore the state index)")
+    args, _ = ap.parse_known_args(argv)
+    if not args.verify:
+        return None
+
+    _prepare_sys_path()
+    import logging
+    from app.services import timing
+    from app.services.config import load_settings
+    from app.services.logging_util import init_logging
+    from app.services.minecraft import cleanup_backups
+    from app.services.transaction import busy
+    from app.services.verify import manifest_to_check, repair, verify
+
+    init_logging()  # console + logs/<date>.log (the windowed exe has no console)
+    log = logging.info
+    s = load_settings()
+    mc = s.get("minecraft_path") or ""
+    if not os.path.isdir(mc):
+        log(f"[ERROR] .minecraft path does not exist: {mc}")
+        return 2
+    with timing.run("verify", log=log), busy(mc, log):
+        mani, can_repair = manifest_to_check(mc, log)
+        report = verify(mc, mani, log, full=args.full)
+        if args.repair and not can_repair:
+            log("[VERIFY] not repairing: run --update (or Update to Latest) first")
+            return 3
+        if args.repair:
+            if repair(mc, mani, report, log, remove_extra=args.remove_extra):
+                cleanup_backups(log)
+            report = verify(mc, mani, log)
+    broken = report["missing"] or report["modified"] or (args.remove_extra and report["extra"])
+    return 1 if broken else 0
+
+
+def _headless_build(argv) -> int | None:
+    """
+    `--build [--out DIR] [--include a,b,...]`: build the pack and manifest without the
+    window (selection defaults to the admin tab's saved one). Returns the exit code, or None.
+    """
+    import argparse
+
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("--build", action="store_true")
+    ap.add_argument("--out", default="")
+    ap.add_argument("--include", default="")
+    args, _ = ap.parse_known_args(argv)
+    if not args.build:
+        return None
+
+    _prepare_sys_path()
+    import logging
+    from app.services import packer
+    from app.services.config import get_include_selection
+    from app.services.logging_util import init_logging
+
+    init_logging()
+    include = [p for p in args.include.split(",") if p.strip()] or get_include_selection()
+    try:
+        res = packer.build(include, args.out or None, log=logging.info)
+    except RuntimeError as ex:
+        logging.error(f"[ERROR] {ex}")
+        return 2
+    logging.info(f"[DONE] Pack: {res.zip_path}")
+    logging.info(f"[DONE] Manifest: {res.manifest_path}")
+    return 0
+
+
+def _headless_update(argv) -> int | None:
+    """
+    `--update [--background]`: update .minecraft to the latest pack without the window
+    (e.g. from a startup entry). --background applies the background_* network/disk
+    limits and low priority from settings. Returns the exit code, or None.
+    """
+    import argparse
+
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("--update", action="store_true")
+    ap.add_argument("--background", action="store_true")
+    args, _ = ap.parse_known_args(argv)
+    if not args.update:
+        return None
+
+    _prepare_sys_path()
+    import contextlib
+    import logging
+    import shutil
+    from app.services import prefetch, throttle, timing
+    from app.services.config import load_settings
+    from app.services.github_api import get_latest_manifest
+    from app.services.logging_util import init_logging
+    from app.services.minecraft import apply_manifest, cleanup_backups, is_up_to_date
+    from app.services.transaction import busy
+    from app.services.updater import prepare_update
+
+    init_logging()
+    log = logging.info
+    s = load_settings()
+    mc = s.get("minecraft_path") or ""
+    if not os.path.isdir(mc):
+        log(f"[ERROR] .minecraft path does not exist: {mc}")
+        return 2
+    with timing.run("update", log=log), busy(mc, log), \
+            (throttle.background(log, s) if args.background else contextlib.nullcontext()):
+        try:
+            mani = get_latest_manifest()
+        except OSError:  # offline: apply what --prefetch staged, if anything
+            mani = prefetch.staged_manifest(mc)
+            if mani is None:
+                raise
+            log("[PREFETCH] GitHub unreachable; applying the staged update")
+        log(f"[MANIFEST] version {mani.get('version') or '(missing)'}")
+        if is_up_to_date(mani, log):
+            log("[UP TO DATE] local files already match this version; nothing to download")
+            return 0
+        ex = prefetch.take(mc, mani, log) or prepare_update(mani, mc, s.get("last_applied_version", ""), log)
+        try:
+            apply_manifest(ex, mani, dry_run=False, log=log)
+        finally:
+            shutil.rmtree(ex, ignore_errors=True)
+        cleanup_backups(log)
+    return 0
+
+
+def _headless_prefetch(argv) -> int | None:
+    """
+    `--prefetch [--every MINUTES]`: download and stage the next update in the background
+    (network/disk limits and low priority from settings) so the next launch only applies it.
+    With --every it keeps polling; without, it checks once. Returns the exit code, or None.
+    """
+    import argparse
+
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("--prefetch", action="store_true")
+    ap.add_argument("--every", type=float, default=0.0)
+    args, _ = ap.parse_known_args(argv)
+    if not args.prefetch:
+        return None
+
+    _prepare_sys_path()
+    import logging
+    import time
+    from app.services import prefetch, throttle, timing
+    from app.services.logging_util import init_logging
+
+    init_logging()
+    log = logging.info
+    while True:
+        try:
+            with throttle.background(log), timing.run("prefetch", log=log):
+                prefetch.run_once(log)
+        except Exception as ex:  # network hiccups are expected; try again next round
+            logging.error(f"[PREFETCH] {ex}")
+            if not args.every:
+                return 1
+        if not args.every:
+            return 0
+        time.sleep(args.every * 60)
+
+
 def main() -> None:
+    for headless in (_headless_verify, _headless_build, _headless_update, _headless_prefetch):
+        code = headless(sys.argv[1:])
+        if code is not None:
+            sys.exit(code)
     MainWindow = _resolve_main_window()
 
     from PySide6.QtWidgets import QApplication
     app = QApplication(sys.argv)
-    w = MainWindow()
+    on_ready = None
+    if "--startup-time" in sys.argv[1:]:
+        # print the time to the first paint and exit; no startup actions run (see bench/startup.py)
+        def on_ready(win):
+            print(f"[STARTUP] {win.startup_seconds * 1000:.0f} ms to first paint", flush=True)
+            app.quit()
+    w = MainWindow(started=_STARTED, on_ready=on_ready)
     w.show()
     sys.exit(app.exec())
 
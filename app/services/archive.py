@@ -0,0 +1,254 @@
+#app\services\archive.py
+"""
+Single-file compressed backups.
+
+write_archive() streams files into one standard .zip (opens in Explorer/7-Zip)
+but compresses members in parallel: each file is deflated on a worker thread
+(zlib releases the GIL) and the results are written in order as raw members.
+Files that don't shrink (region files, jars, pngs are compressed already) are
+stored as-is instead of being deflated twice. The zip central directory is the
+index, so restore_files() pulls single files without extracting the rest.
+
+zstd would be faster still, but it is not in the standard library and a .zip
+keeps backups restorable with no tools at all.
+"""
+
+import hashlib
+import os
+import struct
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import hashing, timing
+
+LEVEL = 6
+PARALLEL_MAX = 32 * 1024 * 1024   # bigger files are streamed on the writing thread
+PENDING_MAX = 256 * 1024 * 1024   # file bytes in flight (each held raw + compressed until written)
+STREAM_CHUNK = 1024 * 1024
+_U32 = 0xFFFFFFFF
+
+_LOCAL = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL = struct.Struct("<IHHHHHHIIIHHHHHII")
+_EOCD64 = struct.Struct("<IQHHIIQQQQ")
+_LOCATOR = struct.Struct("<IIQI")
+_EOCD = struct.Struct("<IHHHHIIH")
+_VERSION = 45   # zip64
+_UTF8 = 0x800
+
+
+def _dos_time(mtime: float) -> Tuple[int, int]:
+    t = time.localtime(max(mtime, 315532800))  # zip can't express dates before 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), \
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def _compress(full: str, level: int, want_sha: bool):
+    """Whole small file → (method, crc, size, payload, sha256 or None)."""
+    with open(full, "rb") as f:
+        data = f.read()
+    crc = zlib.crc32(data)
+    sha = hashlib.sha256(data).hexdigest() if want_sha else None
+    c = zlib.compressobj(level, zlib.DEFLATED, -15)
+    packed = c.compress(data) + c.flush()
+    if len(packed) >= len(data):
+        return zipfile.ZIP_STORED, crc, len(data), data, sha
+    return zipfile.ZIP_DEFLATED, crc, len(data), packed, sha
+
+
+class _Writer:
+    def __init__(self, f):
+        self.f = f
+        self.central: List[bytes] = []
+
+    def _local(self, name: bytes, method: int, dt, crc: int, size: int, csize: int) -> bytes:
+        extra = struct.pack("<HHQQ", 1, 16, size, csize)
+        return _LOCAL.pack(0x04034B50, _VERSION, _UTF8, method, dt[0], dt[1], crc, _U32, _U32,
+                           len(name), len(extra)) + name + extra
+
+    def _add_central(self, name: bytes, method: int, dt, crc: int, size: int, csize: int, offset: int):
+        extra = struct.pack("<HHQQQ", 1, 24, size, csize, offset)
+        self.central.append(_CENTRAL.pack(0x02014B50, _VERSION, _VERSION, _UTF8, method, dt[0], dt[1], crc,
+                                          _U32, _U32, len(name), len(extra), 0, 0, 0, 0, _U32) + name + extra)
+
+    def member(self, arc: str, mtime: float, method: int, crc: int, size: int, payload: bytes):
+        name, dt = arc.encode("utf-8"), _dos_time(mtime)
+        offset = self.f.tell()
+        self.f.write(self._local(name, method, dt, crc, size, len(payload)))
+        self.f.write(payload)
+        self._add_central(name, method, dt, crc, size, len(payload), offset)
+
+    def copy(self, arc: str, mtime: float, info: zipfile.ZipInfo, src):
+        """Copy an already-compressed member of another zip (open binary `src`) without inflating it."""
+        src.seek(info.header_offset)
+        hdr = _LOCAL.unpack(src.read(_LOCAL.size))
+        src.seek(hdr[9] + hdr[10], 1)  # skip its name + extra
+        name, dt = arc.encode("utf-8"), _dos_time(mtime)
+        offset = self.f.tell()
+        self.f.write(self._local(name, info.compress_type, dt, info.CRC, info.file_size, info.compress_size))
+        left = info.compress_size
+        while left:
+            chunk = src.read(min(left, STREAM_CHUNK))
+            if not chunk:
+                raise OSError(f"{arc}: base archive is truncated")
+            self.f.write(chunk)
+            left -= len(chunk)
+        self._add_central(name, info.compress_type, dt, info.CRC, info.file_size, info.compress_size, offset)
+
+    def stream(self, arc: str, full: str, mtime: float, level: int, want_sha: bool):
+        """
+        Deflate a big file chunk by chunk, then patch sizes/crc into its local header.
+        Returns (size, compressed size, sha256 or None).
+        """
+        name, dt = arc.encode("utf-8"), _dos_time(mtime)
+        offset = self.f.tell()
+        self.f.write(self._local(name, zipfile.ZIP_DEFLATED, dt, 0, 0, 0))
+        c = zlib.compressobj(level, zlib.DEFLATED, -15)
+        h = hashlib.sha256() if want_sha else None
+        crc = size = csize = 0
+        with open(full, "rb") as src:
+            for chunk in iter(lambda: src.read(STREAM_CHUNK), b""):
+                crc = zlib.crc32(chunk, crc)
+                if h:
+                    h.update(chunk)
+                size += len(chunk)
+                out = c.compress(chunk)
+                csize += len(out)
+                self.f.write(out)
+        out = c.flush()
+        csize += len(out)
+        self.f.write(out)
+        end = self.f.tell()
+        self.f.seek(offset)
+        self.f.write(self._local(name, zipfile.ZIP_DEFLATED, dt, crc, size, csize))
+        self.f.seek(end)
+        self._add_central(name, zipfile.ZIP_DEFLATED, dt, crc, size, csize, offset)
+        return size, csize, h.hexdigest() if h else None
+
+    def close(self):
+        cd_offset = self.f.tell()
+        for rec in self.central:
+            self.f.write(rec)
+        cd_size = self.f.tell() - cd_offset
+        n = len(self.central)
+        eocd64 = self.f.tell()
+        self.f.write(_EOCD64.pack(0x06064B50, 44, _VERSION, _VERSION, 0, 0, n, n, cd_size, cd_offset))
+        self.f.write(_LOCATOR.pack(0x07064B50, 0, eocd64, 1))
+        self.f.write(_EOCD.pack(0x06054B50, 0, 0, min(n, 0xFFFF), min(n, 0xFFFF),
+                                min(cd_size, _U32), min(cd_offset, _U32), 0))
+
+
+def write_archive(
+    out_path: str,
+    files: Iterable[Tuple],
+    level: int = LEVEL,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    on_member: Optional[Callable[[str, int, Optional[str]], None]] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    base: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Write (full_path, arcname) pairs into out_path as a zip. `files` is consumed lazily,
+    so a generator keeps memory flat however many files there are.
+
+    A third item (full_path, arcname, True) copies that member's compressed bytes from
+    the `base` zip instead of reading the file (incremental rebuilds; the caller vouches
+    the file is unchanged). progress(bytes_done) fires as members land; on_member(arcname,
+    size, sha256) too, in archive order, with the sha256 computed from the same read that
+    compressed the file (None for copied members, or unless on_member is given).
+    A truthy cancelled() aborts.
+    Written to out_path + ".part" and renamed, so a crash never leaves a torn archive.
+    Returns {"files", "bytes", "compressed", "reused"}.
+    """
+    workers = workers or hashing.default_workers()
+    want_sha = on_member is not None
+    stats = {"files": 0, "bytes": 0, "compressed": 0, "reused": 0}
+    part = out_path + ".part"
+    base_zip = zipfile.ZipFile(base) if base else None
+    base_f = open(base, "rb") if base else None
+    try:
+        with timing.span("archive", level=level) as sp, open(part, "wb") as f, \
+                ThreadPoolExecutor(max_workers=workers) as pool:
+            w = _Writer(f)
+            # (arc, mtime, future or base ZipInfo, bytes held) in write order; bounded by count and bytes
+            pending = []
+
+            def count(arc: str, size: int, csize: int, sha: Optional[str]):
+                stats["files"] += 1
+                stats["bytes"] += size
+                stats["compressed"] += csize
+                sp.add(bytes=size, files=1)
+                if on_member:
+                    on_member(arc, size, sha)
+                if progress:
+                    progress(stats["bytes"])
+
+            def drain(limit: int, room: int = 0):
+                """Write members out until at most `limit` are pending and `room` more bytes fit."""
+                while pending and (len(pending) > limit or sum(p[3] for p in pending) + room > PENDING_MAX):
+                    arc, mtime, job, _ = pending.pop(0)
+                    if isinstance(job, zipfile.ZipInfo):
+                        w.copy(arc, mtime, job, base_f)
+                        stats["reused"] += 1
+                        count(arc, job.file_size, job.compress_size, None)
+                        continue
+                    method, crc, size, payload, sha = job.result()
+                    w.member(arc, mtime, method, crc, size, payload)
+                    count(arc, size, len(payload), sha)
+
+            for item in files:
+                full, arc = item[0], item[1]
+                if cancelled and cancelled():
+                    raise RuntimeError("Cancelled")
+                st = os.stat(full)
+                if len(item) > 2 and item[2] and base_zip:
+                    pending.append((arc, st.st_mtime, base_zip.getinfo(arc), 0))
+                    drain(workers * 2)
+                    continue
+                if st.st_size > PARALLEL_MAX:
+                    drain(0)
+                    size, csize, sha = w.stream(arc, full, st.st_mtime, level, want_sha)
+                    count(arc, size, csize, sha)
+                    continue
+                drain(workers * 2 - 1, st.st_size)
+                pending.append((arc, st.st_mtime, pool.submit(_compress, full, level, want_sha), st.st_size))
+            drain(0)
+            w.close()
+    except BaseException:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+        raise
+    finally:
+        if base_zip:
+            base_zip.close()
+            base_f.close()
+    os.replace(part, out_path)
+    return stats
+
+
+def list_archive(path: str) -> Dict[str, int]:
+    """arcname → uncompressed size, read from the central directory only."""
+    with zipfile.ZipFile(path) as z:
+        return {i.filename: i.file_size for i in z.infolist()}
+
+
+def restore_files(path: str, rels: Iterable[str], dst_root: str,
+                  log: Optional[Callable[[str], None]] = None) -> int:
+    """Extract the given files (or whole folders, by prefix) from an archive into dst_root."""
+    n = 0
+    with zipfile.ZipFile(path) as z:
+        names = z.namelist()
+        for rel in rels:
+            rel = rel.replace("\\", "/").strip("/")
+            for name in names:
+                if name == rel or name.startswith(rel + "/"):
+                    z.extract(name, dst_root)
+                    n += 1
+                    if log:
+                        log(f"[RESTORE] {name}")
+    return n
@@ -0,0 +1,156 @@
+#app\services\cache.py
+"""
+Persistent download cache shared by every .minecraft profile on this machine.
+
+Objects live in %LOCALAPPDATA%\\MinecraftManager\\cache\\objects\\<sha[:2]>\\<sha256>
+and are only added after their content matched the expected sha256. The file
+mtime is the LRU clock (bumped on every hit); the cache is trimmed to
+settings "cache_max_mb" after each insert.
+
+Objects are hardlinked in and out where possible, so writing through such a
+link would change the object: downloads are written to a .part file and renamed
+over their target (never truncated in place), and materialize() re-checks the
+sha256 before handing an object out.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Iterable, List, Optional
+
+from . import hashing
+from .config import load_settings, settings_dir
+
+TEMP_PREFIX = "mcman_"
+ORPHAN_AGE = 6 * 3600  # seconds; anything this old is not in use by a running update
+
+
+def cache_dir() -> str:
+    d = os.path.join(settings_dir(), "cache", "objects")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+def _obj_path(sha256: str) -> str:
+    sha256 = sha256.lower()
+    return os.path.join(cache_dir(), sha256[:2], sha256)
+
+
+def _link_or_copy(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + ".part"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def lookup(sha256: Optional[str]) -> Optional[str]:
+    """Path of the cached object (and mark it recently used), or None."""
+    if not sha256:
+        return None
+    p = _obj_path(sha256)
+    if not os.path.isfile(p):
+        return None
+    try:
+        os.utime(p, None)
+    except OSError:
+        pass
+    return p
+
+
+def materialize(sha256: str, to_dir: str, name: str) -> Optional[str]:
+    """
+    Place a cached object at to_dir/name (hardlink when possible). None on miss; an
+    object whose content no longer matches its sha256 is dropped and counts as a miss.
+    """
+    p = lookup(sha256)
+    if not p:
+        return None
+    if hashing.sha256_file(p) != sha256.lower():
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+        return None
+    out = os.path.join(to_dir, name)
+    _link_or_copy(p, out)
+    return out
+
+
+def put(path: str, sha256: str, log: Optional[Callable[[str], None]] = None) -> str:
+    """Add an already-verified file under its sha256 and trim the cache."""
+    dst = _obj_path(sha256)
+    if not os.path.isfile(dst):
+        _link_or_copy(path, dst)
+        os.utime(dst, None)
+    max_mb = int(load_settings().get("cache_max_mb", 4096))
+    evict(max_mb * 1024 * 1024, keep=dst, log=log)
+    return dst
+
+
+def _objects() -> List[os.DirEntry]:
+    out = []
+    root = cache_dir()
+    for sub in os.scandir(root):
+        if sub.is_dir():
+            out.extend(e for e in os.scandir(sub.path) if e.is_file() and not e.name.endswith(".part"))
+    return out
+
+
+def evict(max_bytes: int, keep: Optional[str] = None, log: Optional[Callable[[str], None]] = None) -> int:
+    """Delete least-recently-used objects until the cache fits max_bytes. Returns bytes freed."""
+    entries = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in _objects()]
+    total = sum(sz for _, sz, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep and os.path.normcase(path) == os.path.normcase(keep):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        freed += size
+        if log:
+            log(f"[CACHE] evicted {os.path.basename(path)[:12]}… ({size / 1e6:.1f} MB)")
+    return freed
+
+
+def usage() -> int:
+    return sum(e.stat().st_size for e in _objects())
+
+
+def cleanup_temp_dirs(extra_roots: Iterable[str] = (), log: Optional[Callable[[str], None]] = None,
+                      max_age: float = ORPHAN_AGE) -> int:
+    """
+    Remove orphaned mcman_* folders from %TEMP% (and extract_* folders in the given
+    stage roots) left behind by crashed or killed updates. Returns how many were removed.
+    """
+    now = time.time()
+    roots = [(tempfile.gettempdir(), TEMP_PREFIX)] + [(r, "extract_") for r in extra_roots]
+    removed = 0
+    for root, prefix in roots:
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            continue
+        for e in entries:
+            if not e.name.startswith(prefix) or not e.is_dir(follow_symlinks=False):
+                continue
+            try:
+                if now - e.stat().st_mtime < max_age:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(e.path, ignore_errors=True)
+            removed += 1
+    if removed and log:
+        log(f"[CLEANUP] Removed {removed} leftover temp folder(s)")
+    return removed
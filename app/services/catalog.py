@@ -0,0 +1,195 @@
+#app\services\catalog.py
+"""
+Backups/catalog.json: one entry per backup, a folder or a single .zip
+archive (name, created, label,
+version, prev_version, size, items), so listing and pruning never walk the
+backup trees. Order is by the recorded creation time, not by folder name.
+
+Pruning first renames doomed folders into Backups/.trash (instant, and the
+catalog is updated right away); the slow delete happens in purge_trash(),
+which the UI runs as a low-priority background task.
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+CATALOG_FILE = "catalog.json"
+TRASH_DIR = ".trash"
+ARCHIVE_EXT = ".zip"   # single-file backups (see archive.py)
+
+
+def _path(root: str) -> str:
+    return os.path.join(root, CATALOG_FILE)
+
+
+def _save(root: str, entries: List[Dict]):
+    p = _path(root)
+    with open(p + ".part", "w", encoding="utf-8") as f:
+        json.dump({"backups": entries}, f, indent=2)
+    os.replace(p + ".part", p)
+
+
+def _dir_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for base, _, names in os.walk(path):
+        for n in names:
+            try:
+                total += os.path.getsize(os.path.join(base, n))
+            except OSError:
+                pass
+    return total
+
+
+def _load(root: str) -> List[Dict]:
+    try:
+        with open(_path(root), "r", encoding="utf-8") as f:
+            return list(json.load(f).get("backups", []))
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def entries(root: str) -> List[Dict]:
+    """
+    Backups, newest first. Folders missing from the catalog (made by older versions
+    or by hand) are added once, dated by their mtime; entries whose folder is gone
+    are dropped.
+    """
+    known = _load(root)
+    try:
+        names = {n for n in os.listdir(root) if n != TRASH_DIR and (
+            os.path.isdir(os.path.join(root, n)) or n.endswith(ARCHIVE_EXT))}
+    except OSError:
+        return []
+    out = [e for e in known if e.get("name") in names]
+    seen = {e["name"] for e in out}
+    for n in sorted(names - seen):
+        full = os.path.join(root, n)
+        out.append({
+            "name": n,
+            "created": os.path.getmtime(full),
+            "label": n.split("_", 2)[-1] if n.count("_") >= 2 else n,
+            "version": "",
+            "prev_version": "",
+            "size": _dir_size(full),
+            "items": sorted(os.listdir(full)) if os.path.isdir(full) else [],
+        })
+    out.sort(key=lambda e: e.get("created", 0), reverse=True)
+    if out != known:
+        _save(root, out)
+    return out
+
+
+def add(root: str, backup_dir: str, label: str, items: Iterable[str],
+        version: str = "", prev_version: str = "") -> Dict:
+    """Record a freshly made backup folder."""
+    entry = {
+        "name": os.path.basename(backup_dir),
+        "created": time.time(),
+        "label": label,
+        "version": version,
+        "prev_version": prev_version,
+        "size": _dir_size(backup_dir),
+        "items": list(items),
+    }
+    cur = [e for e in _load(root) if e.get("name") != entry["name"]]
+    _save(root, [entry] + cur)
+    return entry
+
+
+def select_prunable(items: List[Dict], keep_n: int = 0, max_age_days: float = 0,
+                    max_total_mb: float = 0, now: Optional[float] = None) -> List[Dict]:
+    """
+    Entries (newest first) to drop under count / age / total-size limits (0 = no limit).
+    The newest backup is always kept so there is something to roll back to.
+    """
+    now = time.time() if now is None else now
+    drop = []
+    total = 0
+    for i, e in enumerate(items):
+        total += int(e.get("size", 0))
+        if i == 0:
+            continue
+        if (keep_n and i >= keep_n) \
+                or (max_age_days and now - e.get("created", now) > max_age_days * 86400) \
+                or (max_total_mb and total > max_total_mb * 1024 * 1024):
+            drop.append(e)
+            total -= int(e.get("size", 0))
+    return drop
+
+
+def prune(root: str, keep_n: int = 0, max_age_days: float = 0, max_total_mb: float = 0,
+          log: Optional[Callable[[str], None]] = None) -> List[str]:
+    """Move prunable backups to the trash folder and drop them from the catalog. Returns their names."""
+    items = entries(root)
+    drop = select_prunable(items, keep_n, max_age_days, max_total_mb)
+    if not drop:
+        return []
+    trash = os.path.join(root, TRASH_DIR)
+    os.makedirs(trash, exist_ok=True)
+    gone = []
+    for e in drop:
+        src = os.path.join(root, e["name"])
+        try:
+            os.replace(src, os.path.join(trash, f"{e['name']}_{int(time.time() * 1000)}"))
+        except OSError as ex:
+            if log:
+                log(f"[PRUNE] {e['name']}: {ex}")
+            continue
+        gone.append(e["name"])
+        if log:
+            log(f"[PRUNE] {e['name']} ({int(e.get('size', 0)) / 1e6:.1f} MB)")
+    _save(root, [e for e in items if e["name"] not in gone])
+    return gone
+
+
+def _rmtree(path: str, cancelled: Optional[Callable[[], bool]]) -> bool:
+    """shutil.rmtree(ignore_errors=True) that stops between folders when cancelled."""
+    if not cancelled:
+        shutil.rmtree(path, ignore_errors=True)
+        return True
+    for base, dirs, names in os.walk(path, topdown=False):
+        if cancelled():
+            return False
+        for name in names:
+            try:
+                os.remove(os.path.join(base, name))
+            except OSError:
+                pass
+        try:
+            os.rmdir(base)
+        except OSError:
+            pass
+    return True
+
+
+def purge_trash(root: str, log: Optional[Callable[[str], None]] = None,
+                cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Actually delete pruned backups. Slow on big trees; run it off the UI/update path.
+    When cancelled it stops early; whatever is left stays in the trash for the next purge.
+    """
+    trash = os.path.join(root, TRASH_DIR)
+    if not os.path.isdir(trash):
+        return 0
+    n = 0
+    for name in os.listdir(trash):
+        if cancelled and cancelled():
+            break
+        p = os.path.join(trash, name)
+        if os.path.isdir(p):
+            if not _rmtree(p, cancelled):
+                break
+        else:
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+        n += 1
+    if n and log:
+        log(f"[PRUNE] deleted {n} old backup(s)")
+    return n
@@ -0,0 +1,205 @@
+#app\services\compact_manifest.py
+"""
+manifest.mcm: the manifest in a compact, streamable binary form.
+
+manifest.json stays the compatibility format (same content, pretty JSON); for
+packs with many files the app publishes and prefers this one:
+
+    b"MCM" + format version (1 byte)
+    varint length + zlib(JSON of the manifest without "files")
+    blocks, each: varint length + zlib(up to BLOCK_ENTRIES entries sorted by path)
+    varint 0
+    varint length + zlib(JSON index: [[first path, offset, length], ...] per block)
+    8-byte offset of the index + b"MCM" + version
+
+A block is stored by column: entry count, the paths and the alias paths (""
+for none) each joined with newlines, little-endian u64 sizes, then raw 32-byte
+sha256s. Entries are sorted, so every path sits right after the one it shares
+the longest prefix with and zlib folds the repeats away; decoding is a split()
+and a struct unpack, no per-byte Python loop.
+
+Read front to back it is a stream (read_stream); with a seekable source, get()
+finds one path by bisecting the index and inflating a single block.
+"""
+
+import bisect
+import io
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ASSET = "manifest.mcm"
+MAGIC = b"MCM"
+VERSION = 1
+BLOCK_ENTRIES = 256
+_FOOTER = struct.Struct("<Q3sB")
+
+
+def _put_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _read_varint(f) -> int:
+    n = shift = 0
+    while True:
+        b = f.read(1)
+        if not b:
+            raise ValueError("manifest.mcm is truncated")
+        n |= (b[0] & 0x7F) << shift
+        if b[0] < 0x80:
+            return n
+        shift += 7
+
+
+_BLOCK_HEAD = struct.Struct("<III")   # entries, paths length, aliases length
+
+
+def _encode_block(entries: List[Dict[str, Any]]) -> bytes:
+    paths = "\n".join(f["path"] for f in entries).encode("utf-8")
+    aliases = "\n".join(f.get("alias") or "" for f in entries).encode("utf-8")
+    if paths.count(b"\n") != len(entries) - 1:
+        raise ValueError("file paths must not contain newlines")
+    k = len(entries)
+    raw = _BLOCK_HEAD.pack(k, len(paths), len(aliases)) + paths + aliases \
+        + struct.pack(f"<{k}Q", *(int(f["size"]) for f in entries)) \
+        + b"".join(bytes.fromhex(f["sha256"]) for f in entries)
+    return zlib.compress(raw, 9)
+
+
+def _decode_block(data: bytes) -> Iterator[Dict[str, Any]]:
+    raw = zlib.decompress(data)
+    k, np, na = _BLOCK_HEAD.unpack_from(raw)
+    pos = _BLOCK_HEAD.size
+    paths = raw[pos:pos + np].decode("utf-8").split("\n")
+    aliases = raw[pos + np:pos + np + na].decode("utf-8").split("\n")
+    pos += np + na
+    sizes = struct.unpack_from(f"<{k}Q", raw, pos)
+    shas = raw[pos + 8 * k:pos + 40 * k].hex()
+    for i in range(k):
+        f = {"path": paths[i], "size": sizes[i], "sha256": shas[64 * i:64 * i + 64]}
+        if aliases[i]:
+            f["alias"] = aliases[i]
+        yield f
+
+
+def dumps(manifest: Dict[str, Any]) -> bytes:
+    head = {k: v for k, v in manifest.items() if k != "files"}
+    files = sorted(manifest.get("files") or [], key=lambda f: f["path"])
+    out = io.BytesIO()
+    out.write(MAGIC + bytes([VERSION]))
+    blob = zlib.compress(json.dumps(head, separators=(",", ":")).encode("utf-8"), 9)
+    _write_chunk(out, blob)
+    index = []
+    for i in range(0, len(files), BLOCK_ENTRIES):
+        chunk = files[i:i + BLOCK_ENTRIES]
+        blob = _encode_block(chunk)
+        index.append([chunk[0]["path"], _write_chunk(out, blob), len(blob)])
+    out.write(b"\0")
+    at = out.tell()
+    _write_chunk(out, zlib.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"), 9))
+    out.write(_FOOTER.pack(at, MAGIC, VERSION))
+    return out.getvalue()
+
+
+def _write_chunk(out, blob: bytes) -> int:
+    """varint length + blob; returns the blob's offset."""
+    n = bytearray()
+    _put_varint(n, len(blob))
+    out.write(n)
+    at = out.tell()
+    out.write(blob)
+    return at
+
+
+def write(path: str, manifest: Dict[str, Any]):
+    with open(path + ".part", "wb") as f:
+        f.write(dumps(manifest))
+    os.replace(path + ".part", path)
+
+
+def _check_magic(head: bytes):
+    if head[:3] != MAGIC:
+        raise ValueError("not a manifest.mcm file")
+    if head[3] > VERSION:
+        raise ValueError(f"manifest.mcm format {head[3]} is newer than this app supports ({VERSION})")
+
+
+def read_stream(f) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """(manifest without files, iterator of file entries) from a forward-only stream."""
+    _check_magic(f.read(4))
+    head = json.loads(zlib.decompress(f.read(_read_varint(f))))
+
+    def files():
+        while True:
+            n = _read_varint(f)
+            if not n:
+                return
+            yield from _decode_block(f.read(n))
+
+    return head, files()
+
+
+class FileTable:
+    """
+    manifest["files"] backed by the encoded bytes: iterating inflates one block at a
+    time (entries come sorted by path) and get() touches a single block.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        at, magic, version = _FOOTER.unpack_from(data, len(data) - _FOOTER.size)
+        _check_magic(magic + bytes([version]))
+        n, pos = _get_varint(data, at)
+        self.index = json.loads(zlib.decompress(data[pos:pos + n]))
+        self._firsts = [b[0] for b in self.index]
+        self._len: Optional[int] = None
+
+    def _block(self, i: int) -> Iterator[Dict[str, Any]]:
+        _, off, n = self.index[i]
+        return _decode_block(self.data[off:off + n])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self.index)):
+            yield from self._block(i)
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = sum(1 for _ in self)
+        return self._len
+
+    def __bool__(self) -> bool:
+        return bool(self.index)
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        i = bisect.bisect_right(self._firsts, path) - 1
+        if i < 0:
+            return None
+        return next((f for f in self._block(i) if f["path"] == path), None)
+
+
+def loads(data: bytes) -> Dict[str, Any]:
+    """Manifest dict whose "files" is a lazy FileTable."""
+    head, _ = read_stream(io.BytesIO(data))
+    head["files"] = FileTable(data)
+    return head
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return loads(f.read())
@@ -12,7 +12,7 @@ APP_NAME = "MinecraftManager"
 SETTINGS_DIR = appdirs.user_data_dir(APP_NAME, appauthor=False, roaming=False)
 SETTINGS_FILE = os.path.join(SETTINGS_DIR, "settings.json")
 
-NEVER_TOUCH = ["saves", "screenshots", "logs", "crash-reports"]
+NEVER_TOUCH = ["saves", "screenshots", "logs", "crash-reports", ".mcman"]
 
 DEFAULT_CHECKED = [
     "config", "journeymap", "libraries", "mods", "resourcepacks", "shaderpacks",
@@ -30,6 +30,14 @@ def _default_settings() -> dict:
         "minecraft_path": default_minecraft_path(),
         "dry_run": False,
         "keep_backups": 3,
+        # extra backup limits, applied in the background after an update (0 = off)
+        "backup_max_age_days": 0,
+        "backup_max_total_mb": 0,
+        # copy backups: "folder" (loose files) or "archive" (one parallel-compressed .zip)
+        "backup_format": "folder",
+        # incremental world backups ("" = Documents\mc-manager-backups) and how many increments to keep
+        "world_backup_dir": "",
+        "world_backup_keep": 10,
         "telemetry_enabled": False,
         "last_applied_version": "",
         # UI preference
@@ -37,9 +45,43 @@ def _default_settings() -> dict:
         # User automation
         "auto_update": False,
         "auto_close":  False,
+        # background updates (auto update, --update --background): KB/s caps (0 = unlimited),
+        # lifted after this many seconds without keyboard/mouse input (0 = never), low CPU/I/O priority
+        "background_net_kbps": 4096,
+        "background_disk_kbps": 16384,
+        "background_idle_seconds": 120,
+        "background_low_priority": True,
         # Admin automation
         "auto_build":  False,
         "auto_publish": False,
+        # build a binary delta against the last published pack
+        "build_deltas": True,
+        # store identical files once per pack (duplicates become manifest aliases); off by default
+        # because clients without alias support silently skip the duplicates
+        "build_dedupe": False,
+        # ordered "+glob"/"-glob" rules for what goes into a pack; the last match wins (see rules.py)
+        "pack_rules": ["-*.log", "-logs/", "-crash-reports/", "-.cache/"],
+        # admin watch mode: poll interval, quiet time before a rebuild, publish after each rebuild
+        "watch_interval_seconds": 1.0,
+        "watch_quiet_seconds": 3.0,
+        "watch_publish": False,
+        # parallel asset uploads when publishing
+        "upload_concurrency": 3,
+        # LAN mirror: try this http://host:port before GitHub ("" = off)
+        "mirror_url": "",
+        # serve built/published packs to the LAN from this app
+        "mirror_serve": False,
+        "mirror_port": 8765,
+        # shared download cache (keyed by sha256, least-recently-used evicted first)
+        "cache_max_mb": 4096,
+        # per-path apply mode written into built manifests: {"config": "overlay", ...}
+        # ("mirror" default, "overlay" keeps player extras, "keep-local" never overwrites)
+        "path_modes": {},
+        # more .minecraft folders updated along with minecraft_path; files under store_paths
+        # are hardlinked from one shared object store ("" = <minecraft_path>\.mcman\objects)
+        "instances": [],
+        "store_paths": ["mods", "libraries"],
+        "object_store_dir": "",
         # saved selection for admin tree
         "include_selected": list(DEFAULT_CHECKED),
     }
@@ -69,6 +111,10 @@ def save_settings(data: dict):
     with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
+def settings_dir() -> str:
+    _ensure_dir()
+    return SETTINGS_DIR
+
 def settings_store_location() -> str: return SETTINGS_FILE
 def pat_store_location() -> str: return _secrets_path()
 
@@ -1,14 +1,30 @@
 import os
+import io
 import json
+import hashlib
 import time
-from typing import Dict, Any, Optional, Callable, List
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, Callable, List, Tuple
 
 import requests
 
 from .config import load_settings, get_pat
+from . import cache, compact_manifest, hashing, throttle, timing
+from .delta import remember_published
+from .mirror import fetch_from_mirror
 
 UA = {"User-Agent": "MinecraftManager/1.0"}
 
+# Overridable so benchmarks/tests can point at a local stand-in server.
+API_BASE = os.environ.get("MCMAN_GITHUB_API", "https://api.github.com").rstrip("/")
+
+UPLOAD_CHUNK = 1024 * 1024
+UPLOAD_TIMEOUT = 600
+UPLOAD_ATTEMPTS = 5
+UPLOAD_BACKOFF = 2.0  # seconds, doubled per retry
+_TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+
 
 # --------- Helpers ---------
 def _token_or_fail() -> str:
@@ -40,12 +56,37 @@ def _stage(progress: Optional[Callable[[float], None]], value: float):
 
 # --------- Read (User tab) ---------
 def get_latest_manifest(progress=None, log=None) -> Dict[str, Any]:
+    rel, _ = get_latest_release()
+    return manifest_from_release(rel, log)
+
+
+def get_latest_release(etag: Optional[str] = None) -> Tuple[Optional[dict], str]:
+    """
+    (latest release JSON, its ETag). With the ETag of an earlier answer, returns
+    (None, etag) when nothing changed; GitHub does not count such 304s against the rate limit.
+    """
     s = load_settings()
-    url = f"https://api.github.com/repos/{s['repo_owner']}/{s['repo_name']}/releases/latest"
-    r = requests.get(url, headers=_auth_headers(), timeout=60)
+    url = f"{API_BASE}/repos/{s['repo_owner']}/{s['repo_name']}/releases/latest"
+    headers = {**_auth_headers(), "If-None-Match": etag} if etag else _auth_headers()
+    r = requests.get(url, headers=headers, timeout=60)
+    if etag and r.status_code == 304:
+        return None, etag
     r.raise_for_status()
-    rel = r.json()
+    return r.json(), r.headers.get("ETag", "")
+
+
+def manifest_from_release(rel: dict, log=None) -> Dict[str, Any]:
     assets = rel.get("assets", [])
+    # the compact form (see compact_manifest.py) when the release has it; its "files" stay lazy
+    compact = next((a for a in assets if a.get("name") == compact_manifest.ASSET), None)
+    if compact:
+        try:
+            mr = requests.get(compact["browser_download_url"], headers=_auth_headers(), timeout=60)
+            mr.raise_for_status()
+            return compact_manifest.loads(mr.content)
+        except (requests.RequestException, ValueError) as e:
+            if log:
+                log(f"[MANIFEST] {compact_manifest.ASSET} unusable ({e}); using manifest.json")
     mani = next((a for a in assets if a.get("name") == "manifest.json"), None)
     if not mani:
         raise RuntimeError("manifest.json not found in latest release assets.")
@@ -55,48 +96,176 @@ def get_latest_manifest(progress=None, log=None) -> Dict[str, Any]:
     return mr.json()
 
 
-def download_asset(asset_name: str, to_dir: str, progress=None, log=None) -> str:
+def get_manifest_for_version(version: str, log=None) -> Optional[Dict[str, Any]]:
+    """Manifest of the release tagged `version`, or None when that release no longer exists."""
     s = load_settings()
-    url = f"https://api.github.com/repos/{s['repo_owner']}/{s['repo_name']}/releases/latest"
-    r = requests.get(url, headers=_auth_headers(), timeout=60)
-    r.raise_for_status()
-    rel = r.json()
+    rel = _release_by_tag(s["repo_owner"], s["repo_name"], version)
+    if not rel:
+        return None
+    try:
+        return manifest_from_release(rel, log)
+    except RuntimeError:  # release without a manifest
+        return None
+
+
+def _latest_asset(asset_name: str, tag: Optional[str] = None) -> dict:
+    """An asset of the latest release, or of the release tagged `tag`."""
+    s = load_settings()
+    if tag:
+        rel = _release_by_tag(s["repo_owner"], s["repo_name"], tag)
+        if not rel:
+            raise RuntimeError(f"release {tag} not found.")
+    else:
+        url = f"{API_BASE}/repos/{s['repo_owner']}/{s['repo_name']}/releases/latest"
+        r = requests.get(url, headers=_auth_headers(), timeout=60)
+        r.raise_for_status()
+        rel = r.json()
     ass = next((a for a in rel.get("assets", []) if a.get("name") == asset_name), None)
     if not ass:
         raise RuntimeError(f"{asset_name} not found in latest release assets.")
-    durl = ass["browser_download_url"]
+    return ass
+
 
+class RangeFile(io.RawIOBase):
+    """
+    Read-only, seekable view of a remote file using HTTP Range requests, so
+    zipfile can read the central directory and single members of a release
+    asset without downloading the whole pack. Reads are fetched in blocks of at
+    least `block` bytes; `fetched` counts bytes actually transferred.
+    """
+
+    def __init__(self, url: str, size: int, headers: dict, block: int = 1024 * 1024):
+        super().__init__()
+        self.url, self.size, self.headers, self.block = url, size, headers, block
+        self.pos = 0
+        self.fetched = 0
+        self._buf_start = 0
+        self._buf = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.size}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def readinto(self, b) -> int:
+        if self.pos >= self.size:
+            return 0
+        want = len(b)
+        off = self.pos - self._buf_start
+        if not (0 <= off < len(self._buf)):
+            end = min(self.size, self.pos + max(want, self.block)) - 1
+            r = requests.get(self.url, headers={**self.headers, "Range": f"bytes={self.pos}-{end}"}, timeout=120)
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise RuntimeError("server ignored the Range header")
+            self._buf_start, self._buf = self.pos, r.content
+            self.fetched += len(r.content)
+            throttle.net(len(r.content))
+            off = 0
+        n = min(want, len(self._buf) - off)
+        b[:n] = self._buf[off:off + n]
+        self.pos += n
+        return n
+
+
+def open_asset_ranged(asset_name: str, tag: Optional[str] = None) -> RangeFile:
+    """RangeFile over a latest-release (or `tag`) asset; redirects are resolved once up front."""
+    ass = _latest_asset(asset_name, tag)
+    with requests.get(ass["browser_download_url"], headers=_auth_headers(), stream=True, timeout=60) as r:
+        r.raise_for_status()
+        url = r.url
+        size = int(r.headers.get("Content-Length", "0") or ass.get("size") or 0)
+    # the redirect target is pre-signed; only the original host gets our token
+    headers = _auth_headers() if url == ass["browser_download_url"] else dict(UA)
+    return RangeFile(url, size, headers)
+
+
+def download_asset(asset_name: str, to_dir: str, progress=None, log=None, sha256: Optional[str] = None,
+                   tag: Optional[str] = None) -> str:
+    """
+    Download a release asset (latest release, or the one tagged `tag`) into to_dir.
+    When the expected sha256 is known, the local download cache is checked first,
+    then the LAN mirror (if configured), then GitHub; whatever matches the sha256
+    is added to the cache.
+    """
+    s = load_settings()
     os.makedirs(to_dir, exist_ok=True)
+    if sha256:
+        hit = cache.materialize(sha256, to_dir, asset_name)
+        if hit:
+            if log:
+                log(f"[CACHE] {asset_name} (no download needed)")
+            if progress:
+                progress(1.0)
+            return hit
+
+    mirror_url = (s.get("mirror_url") or "").strip()
+    if sha256 and mirror_url:
+        got = fetch_from_mirror(mirror_url, asset_name, sha256, to_dir, progress, log)
+        if got:
+            cache.put(got, sha256, log)
+            return got
+
+    durl = _latest_asset(asset_name, tag)["browser_download_url"]
+
     out_path = os.path.join(to_dir, asset_name)
-    with requests.get(durl, headers=_auth_headers(), stream=True, timeout=600) as resp:
+    part = out_path + ".part"   # renamed over out_path: a hardlinked cache object there is never truncated
+    h = hashlib.sha256() if sha256 else None
+    with timing.span("download", asset=asset_name) as sp, \
+            requests.get(durl, headers=_auth_headers(), stream=True, timeout=600) as resp:
         resp.raise_for_status()
         total = int(resp.headers.get("Content-Length", "0") or "0")
         read = 0
-        with open(out_path, "wb") as f:
+        with open(part, "wb") as f:
             for chunk in resp.iter_content(chunk_size=65536):
                 if not chunk:
                     continue
                 f.write(chunk)
+                if h:
+                    h.update(chunk)
                 read += len(chunk)
+                throttle.net(len(chunk))
+                throttle.disk(len(chunk))
                 if progress and total:
                     progress(read / total)
+        sp.add(bytes=read, files=1)
+    os.replace(part, out_path)
+    if h and h.hexdigest() == sha256.lower():
+        cache.put(out_path, sha256, log)
     if progress:
         progress(1.0)
     return out_path
 
 
 def sha256_file(path: str) -> str:
-    import hashlib
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for b in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(b)
-    return h.hexdigest()
+    with timing.span("hash") as sp:
+        digest = hashing.sha256_file(path)
+        sp.add(bytes=os.path.getsize(path), files=1)
+    return digest
+
+
+def create_issue(title: str, body: str) -> Dict[str, Any]:
+    """Open an issue in the configured repo (used for opt-in telemetry snapshots)."""
+    s = load_settings()
+    _token_or_fail()
+    url = f"{API_BASE}/repos/{s['repo_owner']}/{s['repo_name']}/issues"
+    r = requests.post(url, headers=_auth_headers(), json={"title": title, "body": body}, timeout=60)
+    r.raise_for_status()
+    return r.json()
 
 
 # --------- Release helpers (Admin tab) ---------
 def _release_by_tag(owner: str, repo: str, tag: str) -> Optional[dict]:
-    url = f"https://api.github.com/repos/{owner}/{repo}/releases/tags/{tag}"
+    url = f"{API_BASE}/repos/{owner}/{repo}/releases/tags/{tag}"
     r = requests.get(url, headers=_auth_headers(), timeout=60)
     if r.status_code == 404:
         return None
@@ -106,14 +275,14 @@ def _release_by_tag(owner: str, repo: str, tag: str) -> Optional[dict]:
 
 def _list_releases(owner: str, repo: str) -> List[dict]:
     # enough for typical usage; can be paginated later if needed
-    url = f"https://api.github.com/repos/{owner}/{repo}/releases?per_page=100"
+    url = f"{API_BASE}/repos/{owner}/{repo}/releases?per_page=100"
     r = requests.get(url, headers=_auth_headers(), timeout=60)
     r.raise_for_status()
     return r.json()
 
 
 def _delete_release(owner: str, repo: str, release_id: int):
-    url = f"https://api.github.com/repos/{owner}/{repo}/releases/{release_id}"
+    url = f"{API_BASE}/repos/{owner}/{repo}/releases/{release_id}"
     r = requests.delete(url, headers=_auth_headers(), timeout=60)
     # 404 is fine (already gone)
     if r.status_code not in (204, 404):
@@ -123,7 +292,7 @@ def _delete_release(owner: str, repo: str, release_id: int):
 def _delete_tag(owner: str, repo: str, tag: str):
     if not tag:
         return
-    url = f"https://api.github.com/repos/{owner}/{repo}/git/refs/tags/{tag}"
+    url = f"{API_BASE}/repos/{owner}/{repo}/git/refs/tags/{tag}"
     r = requests.delete(url, headers=_auth_headers(), timeout=60)
     # 404 is fine (tag didn't exist)
     if r.status_code not in (204, 404):
@@ -131,7 +300,7 @@ def _delete_tag(owner: str, repo: str, tag: str):
 
 
 def _create_release(owner: str, repo: str, tag: str, name: str, body: str = "") -> dict:
-    url = f"https://api.github.com/repos/{owner}/{repo}/releases"
+    url = f"{API_BASE}/repos/{owner}/{repo}/releases"
     payload = {
         "tag_name": tag,
         "name": name,
@@ -144,36 +313,80 @@ def _create_release(owner: str, repo: str, tag: str, name: str, body: str = "")
     return r.json()
 
 
-class _ProgressFile:
+class _UploadBody:
     """
-    A file-like object that reports read progress to a callback.
-    requests will use __len__ for Content-Length automatically.
+    Streams a file to requests from one reused buffer (no per-chunk allocation).
+    requests uses __len__ for Content-Length; each yielded memoryview is sent
+    before the next readinto() overwrites the buffer.
     """
-    def __init__(self, path: str, cb: Optional[Callable[[float], None]], start: float, end: float):
-        self._f = open(path, "rb")
+    def __init__(self, path: str, cb: Optional[Callable[[float], None]], start: float, end: float,
+                 chunk: Optional[int] = None):
+        self._path = path
         self._total = os.path.getsize(path)
-        self._read = 0
         self._cb = cb
         self._start = start
         self._end = end
+        self._chunk = chunk or UPLOAD_CHUNK
+        self.sent = 0
 
     def __len__(self):
         return self._total
 
-    def read(self, amt: int = 1024 * 1024):
-        chunk = self._f.read(amt)
-        if not chunk:
-            return b""
-        self._read += len(chunk)
-        frac_file = (self._read / self._total) if self._total else 1.0
-        _stage(self._cb, self._start + (self._end - self._start) * frac_file)
-        return chunk
+    def __iter__(self):
+        mv = memoryview(bytearray(self._chunk))
+        self.sent = 0
+        _stage(self._cb, self._start)
+        with open(self._path, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(mv)
+                if not n:
+                    break
+                yield mv[:n]
+                self.sent += n
+                frac_file = (self.sent / self._total) if self._total else 1.0
+                _stage(self._cb, self._start + (self._end - self._start) * frac_file)
+
+
+class _ByteProgress:
+    """Aggregates per-asset upload fractions into one bar weighted by bytes (thread-safe)."""
+    def __init__(self, sizes: List[int], cb: Optional[Callable[[float], None]], start: float, end: float):
+        self._sizes = sizes
+        self._done = [0] * len(sizes)
+        self.total = sum(sizes)
+        self._cb = cb
+        self._start = start
+        self._end = end
+        self._lock = threading.Lock()
+
+    def part(self, i: int) -> Callable[[float], None]:
+        def cb(frac: float):
+            with self._lock:
+                self._done[i] = int(self._sizes[i] * max(0.0, min(1.0, frac)))
+                overall = (sum(self._done) / self.total) if self.total else 1.0
+            _stage(self._cb, self._start + (self._end - self._start) * overall)
+        return cb
 
-    def close(self):
-        try:
-            self._f.close()
-        except Exception:
-            pass
+
+def _release_api_url(upload_url_tmpl: str) -> str:
+    # upload_url looks like: https://uploads.github.com/repos/o/r/releases/<id>/assets{?name,label}
+    url = upload_url_tmpl.split("{", 1)[0]           # .../assets
+    url = url.rsplit("/", 1)[0]                       # .../releases/<id>
+    return url.replace("uploads.", "api.")
+
+
+def _delete_existing_asset(upload_url_tmpl: str, asset_name: str, assets: Optional[List[dict]] = None) -> bool:
+    """Delete an asset with this name from the release (before uploading, not after a 422)."""
+    if assets is None:
+        r = requests.get(_release_api_url(upload_url_tmpl), headers=_auth_headers(), timeout=60)
+        r.raise_for_status()
+        assets = r.json().get("assets", [])
+    asset = next((a for a in assets if a.get("name") == asset_name), None)
+    if not asset:
+        return False
+    r = requests.delete(asset["url"], headers=_auth_headers(), timeout=60)
+    if r.status_code not in (204, 404):
+        r.raise_for_status()
+    return True
 
 
 def _upload_asset(
@@ -184,40 +397,57 @@ def _upload_asset(
     progress: Optional[Callable[[float], None]] = None,
     start: float = 0.0,
     end: float = 1.0,
+    assets: Optional[List[dict]] = None,
+    log: Optional[Callable[[str], None]] = None,
 ):
     """
     Upload an asset to the release, reporting progress from [start, end].
-    Uses a file-like object so requests sets Content-Length correctly.
+    A same-named asset is deleted first (`assets` = the release's asset list, if the
+    caller already has it). Connection errors, timeouts, 5xx and 429 are retried with
+    backoff; GitHub has no resumable uploads, so a retry re-sends the file.
     """
-    # upload_url looks like: https://uploads.github.com/.../assets{?name,label}
     upload_url = upload_url_tmpl.split("{", 1)[0] + f"?name={asset_name}"
     heads = {"Content-Type": content_type, **_auth_headers()}
 
-    fp = _ProgressFile(filepath, progress, start, end)
-    try:
-        r = requests.post(upload_url, headers=heads, data=fp, timeout=600)
-    finally:
-        fp.close()
-
-    if r.status_code == 422 and "already_exists" in r.text:
-        # find & delete existing asset, then re-upload
-        rel_meta_url = upload_url_tmpl.split("{", 1)[0]          # .../assets
-        rel_meta_url = rel_meta_url.rsplit("/", 1)[0]             # .../releases/<id>
-        rel_meta_url = rel_meta_url.replace("uploads.", "api.")
-        rel_resp = requests.get(rel_meta_url, headers=_auth_headers(), timeout=60)
-        rel_resp.raise_for_status()
-        release = rel_resp.json()
-        asset = next((a for a in release.get("assets", []) if a.get("name") == asset_name), None)
-        if asset:
-            requests.delete(asset["url"], headers=_auth_headers(), timeout=60)
-
-        fp2 = _ProgressFile(filepath, progress, start, end)
-        try:
-            r = requests.post(upload_url, headers=heads, data=fp2, timeout=600)
-        finally:
-            fp2.close()
+    if _delete_existing_asset(upload_url_tmpl, asset_name, assets) and log:
+        log(f"[UPLOAD] Replaced existing asset {asset_name}")
+
+    with timing.span("upload", asset=asset_name) as sp:
+        attempt = 0
+        while True:
+            attempt += 1
+            r = None
+            try:
+                body = _UploadBody(filepath, progress, start, end)
+                r = requests.post(upload_url, headers=heads, data=body if len(body) else b"",
+                                  timeout=UPLOAD_TIMEOUT)
+                if r.status_code == 422 and "already_exists" in r.text:
+                    err = "asset already exists"
+                elif r.status_code in _TRANSIENT_STATUS:
+                    err = f"HTTP {r.status_code}"
+                else:
+                    break
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                err = e
+                if attempt >= UPLOAD_ATTEMPTS:
+                    raise
+
+            if attempt >= UPLOAD_ATTEMPTS:
+                break
+            wait = min(30.0, UPLOAD_BACKOFF * (2 ** (attempt - 1)))
+            if log:
+                log(f"[UPLOAD] {asset_name}: {err}; retry {attempt}/{UPLOAD_ATTEMPTS - 1} in {wait:.0f}s")
+            time.sleep(wait)
+            sp.set(retries=attempt)
+            # a failed upload can leave a broken placeholder asset behind
+            try:
+                _delete_existing_asset(upload_url_tmpl, asset_name)
+            except requests.RequestException:
+                pass
 
-    r.raise_for_status()
+        r.raise_for_status()
+        sp.add(bytes=os.path.getsize(filepath), files=1)
     _stage(progress, end)
     return r.json()
 
@@ -265,11 +495,15 @@ def publish_pack(
       1) Determine target tag from manifest['version'] (or timestamp).
       2) Delete any existing *other* releases and their tags.
       3) Create (or reuse) the target release.
-      4) Upload manifest.json and minecraft-pack.zip with live progress.
+      4) Upload the pack (and delta) assets concurrently, then manifest.json last.
     Returns the tag name used.
     """
     _token_or_fail()  # fail fast with a helpful message
+    with timing.run("publish", log=log):
+        return _publish_pack(manifest_path, zip_path, log, progress)
 
+
+def _publish_pack(manifest_path, zip_path, log, progress) -> str:
     s = load_settings()
     owner, repo = s["repo_owner"], s["repo_name"]
 
@@ -297,8 +531,53 @@ def publish_pack(
             log("[RELEASE] Using existing release (will replace assets).")
 
     upload_url = rel["upload_url"]
+    existing = rel.get("assets", [])
+
+    # Take the old manifest down first: until the new one goes up (last), clients
+    # must not see a manifest pointing at assets that are being replaced.
+    manifests = ("manifest.json", compact_manifest.ASSET)
+    for m in manifests:
+        if _delete_existing_asset(upload_url, m, existing) and log:
+            log(f"[UPLOAD] Removed previous {m} until all assets are uploaded")
+    existing = [a for a in existing if a.get("name") not in manifests]
+
+    base = os.path.dirname(manifest_path)
+    compact = os.path.join(base, compact_manifest.ASSET)
+    if not os.path.isfile(compact) or compact_manifest.load(compact).get("version") != mani.get("version"):
+        compact = None  # missing, or left over from another build
+    payload = [(zip_path, "minecraft-pack.zip", "application/zip")]
+    for d in mani.get("deltas", []) or []:
+        p = os.path.join(base, d["asset"])
+        if os.path.isfile(p):
+            payload.append((p, d["asset"], "application/zip"))
+
+    agg = _ByteProgress(
+        [os.path.getsize(p) for p, _, _ in payload] + [os.path.getsize(manifest_path)]
+        + ([os.path.getsize(compact)] if compact else []),
+        progress, start=0.10, end=1.0,
+    )
+    workers = max(1, int(s.get("upload_concurrency", 3)))
+    if log:
+        log(f"[UPLOAD] {len(payload)} asset(s), {agg.total / 1e6:.1f} MB, up to {workers} at a time")
 
-    # Upload manifest.json: 10% → 35%
+    def upload(i: int):
+        path, asset, ctype = payload[i]
+        if log:
+            log(f"[UPLOAD] {asset}")
+        _upload_asset(upload_url, path, asset, ctype, progress=agg.part(i), assets=existing, log=log)
+        if log:
+            log(f"[UPLOAD] {asset} done")
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(timing.bind(upload), i) for i in range(len(payload))]
+        for fut in as_completed(futures):
+            fut.result()  # re-raise the first failure; manifest is never uploaded then
+
+    if compact:
+        if log:
+            log(f"[UPLOAD] {compact_manifest.ASSET}")
+        _upload_asset(upload_url, compact, compact_manifest.ASSET, "application/octet-stream",
+                      progress=agg.part(len(payload) + 1), assets=existing, log=log)
     if log:
         log("[UPLOAD] manifest.json")
     _upload_asset(
@@ -306,23 +585,13 @@ def publish_pack(
         manifest_path,
         "manifest.json",
         "application/octet-stream",  # reliable for GitHub asset uploads
-        progress=progress,
-        start=0.10,
-        end=0.35,
+        progress=agg.part(len(payload)),
+        assets=existing,
+        log=log,
     )
 
-    # Upload minecraft-pack.zip: 35% → 1.0
-    if log:
-        log("[UPLOAD] minecraft-pack.zip")
-    _upload_asset(
-        upload_url,
-        zip_path,
-        "minecraft-pack.zip",
-        "application/zip",
-        progress=progress,
-        start=0.35,
-        end=1.0,
-    )
+    # the next build diffs against exactly what players can download now
+    remember_published(zip_path, manifest_path, log)
 
     if log:
         log("[DONE] Published.")
@@ -0,0 +1,111 @@
+#app\services\hashing.py
+"""
+Shared file hashing.
+
+- sha256_file(): no per-chunk allocation. Small/medium files are read with
+  readinto() into a per-thread reusable buffer; big files are mmap'ed and fed to
+  hashlib in slices (hashlib releases the GIL on large updates).
+- crc32_file(): fast non-cryptographic pre-check. Same value a zip stores per
+  member, so a local file can be compared with a pack entry without hashing it
+  cryptographically or decompressing anything.
+- hash_files(): many files concurrently on a thread pool (per-file manifests).
+"""
+
+import hashlib
+import mmap
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+BUF_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 64 * 1024 * 1024
+MMAP_SLICE = 64 * 1024 * 1024
+
+_local = threading.local()
+
+
+def _buffer() -> memoryview:
+    mv = getattr(_local, "mv", None)
+    if mv is None:
+        mv = _local.mv = memoryview(bytearray(BUF_SIZE))
+    return mv
+
+
+def _feed(path: str, update: Callable[[memoryview], None], use_mmap: Optional[bool] = None) -> int:
+    """Stream a file into update() without allocating per chunk. Returns bytes read."""
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if use_mmap is None:
+            use_mmap = size >= MMAP_THRESHOLD
+        if use_mmap and size:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    view = memoryview(mm)
+                    try:
+                        for off in range(0, size, MMAP_SLICE):
+                            update(view[off:off + MMAP_SLICE])
+                    finally:
+                        view.release()
+                return size
+            except (OSError, ValueError):
+                f.seek(0)  # e.g. special files or exotic filesystems: fall back to readinto
+        mv = _buffer()
+        total = 0
+        while True:
+            n = f.readinto(mv)
+            if not n:
+                return total
+            update(mv[:n])
+            total += n
+
+
+def sha256_file(path: str, use_mmap: Optional[bool] = None) -> str:
+    h = hashlib.sha256()
+    _feed(path, h.update, use_mmap)
+    return h.hexdigest()
+
+
+def crc32_file(path: str) -> int:
+    crc = 0
+
+    def upd(b):
+        nonlocal crc
+        crc = zlib.crc32(b, crc)
+
+    _feed(path, upd, use_mmap=False)
+    return crc
+
+
+def default_workers() -> int:
+    # hashing is I/O + GIL-free C; a few threads per core saturates most disks
+    return min(16, (os.cpu_count() or 2) * 2)
+
+
+def hash_files(
+    paths: Iterable[str],
+    algo: str = "sha256",
+    workers: Optional[int] = None,
+    on_done: Optional[Callable[[str, object], None]] = None,
+) -> Dict[str, object]:
+    """
+    Hash many files concurrently. `algo` is "sha256" (hex str) or "crc32" (int).
+    `on_done(path, digest)` is called from worker threads as results arrive.
+    """
+    fn = sha256_file if algo == "sha256" else crc32_file
+    paths = list(paths)
+    out: Dict[str, object] = {}
+    if not paths:
+        return out
+
+    def one(p):
+        d = fn(p)
+        if on_done:
+            on_done(p, d)
+        return p, d
+
+    with ThreadPoolExecutor(max_workers=workers or default_workers()) as ex:
+        for p, d in ex.map(one, paths):
+            out[p] = d
+    return out
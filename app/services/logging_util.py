@@ -3,10 +3,13 @@ from pathlib import Path
 import datetime
 from .config import settings_dir
 
+def log_dir() -> str:
+    d = Path(settings_dir()) / "logs"
+    d.mkdir(parents=True, exist_ok=True)
+    return str(d)
+
 def init_logging():
-    log_dir = Path(settings_dir()) / "logs"
-    log_dir.mkdir(parents=True, exist_ok=True)
-    logfile = log_dir / (datetime.datetime.now().strftime("%Y%m%d") + ".log")
+    logfile = Path(log_dir()) / (datetime.datetime.now().strftime("%Y%m%d") + ".log")
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(message)s",
@@ -1,186 +1,395 @@
 #app\services\minecraft.py
 
+import json
 import os
 import shutil
-import zipfile
+import tempfile
 import time
-import json
 from typing import Callable, Iterable, Dict, Any, List
 
 from .config import load_settings, save_settings, NEVER_TOUCH
+from . import archive, cache, catalog, compact_manifest, objects, packer, rules, state, timing, transaction
+
+APPLIED_MANIFEST = "applied.mcm"   # in .mcman: manifest of the last applied version
 
 
 def ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
 
 
-def backups_dir() -> str:
-    s = load_settings()
-    mc = s["minecraft_path"]
+def backups_dir(mc: str | None = None) -> str:
+    mc = mc or load_settings()["minecraft_path"]
     d = os.path.join(mc, "Backups")
     ensure_dir(d)
     return d
 
 
+def extra_instances(s: Dict[str, Any] | None = None) -> List[str]:
+    """Existing folders from settings "instances" (other .minecraft dirs kept in sync), minus the main one."""
+    s = s or load_settings()
+    main = os.path.normcase(os.path.abspath(s.get("minecraft_path") or ""))
+    out = []
+    for p in s.get("instances") or []:
+        p = (p or "").strip()
+        key = os.path.normcase(os.path.abspath(p)) if p else ""
+        if p and os.path.isdir(p) and key != main and key not in {os.path.normcase(os.path.abspath(o)) for o in out}:
+            out.append(p)
+    return out
+
+
+def _counting_copy(sp: "timing.Span"):
+    """copy2 that tallies bytes/files into a timing span (usable as copytree copy_function)."""
+    def copy(src, dst, *args, **kwargs):
+        out = shutil.copy2(src, dst, *args, **kwargs)
+        try:
+            sp.add(bytes=os.path.getsize(src), files=1)
+        except OSError:
+            pass
+        return out
+    return copy
+
+
+def _walk_items(mc: str, items: Iterable[str]):
+    """(full path, pack-style rel) for every file under the given items."""
+    for rel in items:
+        src = os.path.join(mc, rel)
+        if os.path.isfile(src):
+            yield src, safe_rel(rel)
+        for base, _, names in os.walk(src):
+            for n in names:
+                full = os.path.join(base, n)
+                yield full, os.path.relpath(full, mc).replace("\\", "/")
+
+
 def create_backup(label: str, items: Iterable[str], log: Callable[[str], None]) -> str:
+    """
+    Copy items into Backups/<stamp>_<label>, or, with settings "backup_format" =
+    "archive", into a single parallel-compressed Backups/<stamp>_<label>.zip
+    (see archive.py; single files restore straight from its index).
+    """
     root = backups_dir()
     stamp = time.strftime("%Y%m%d_%H%M%S")
     dest = os.path.join(root, f"{stamp}_{label}")
-    ensure_dir(dest)
     s = load_settings()
     mc = s["minecraft_path"]
-    for rel in items:
-        src = os.path.join(mc, rel)
-        if not os.path.exists(src):
-            continue
-        target = os.path.join(dest, rel)
-        os.makedirs(os.path.dirname(target), exist_ok=True)
-        if os.path.isdir(src):
-            shutil.copytree(src, target, dirs_exist_ok=True)
-        else:
+    items = list(items)
+    if s.get("backup_format", "folder") == "archive":
+        dest += catalog.ARCHIVE_EXT
+        st = archive.write_archive(dest, _walk_items(mc, items))
+        log(f"[BACKUP] {os.path.basename(dest)}: {st['files']} file(s), "
+            f"{st['bytes'] / 1e6:.1f} MB → {st['compressed'] / 1e6:.1f} MB")
+        catalog.add(root, dest, label, items)
+        return dest
+    ensure_dir(dest)
+    with timing.span("backup", label=label) as sp:
+        copy = _counting_copy(sp)
+        for rel in items:
+            src = os.path.join(mc, rel)
+            if not os.path.exists(src):
+                continue
+            target = os.path.join(dest, rel)
             os.makedirs(os.path.dirname(target), exist_ok=True)
-            shutil.copy2(src, target)
-        log(f"[BACKUP] {rel}")
+            if os.path.isdir(src):
+                shutil.copytree(src, target, dirs_exist_ok=True, copy_function=copy)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                copy(src, target)
+            log(f"[BACKUP] {rel}")
+    catalog.add(root, dest, label, items)
     return dest
 
 
-def prune_backups(keep_n: int, log: Callable[[str], None]):
-    d = backups_dir()
-    entries = [os.path.join(d, x) for x in os.listdir(d)]
-    entries = [x for x in entries if os.path.isdir(x)]
-    entries.sort(reverse=True)  # newest first (lexicographic stamp)
-    for extra in entries[keep_n:]:
-        shutil.rmtree(extra, ignore_errors=True)
-        log(f"[PRUNE] {os.path.basename(extra)}")
+def prune_backups(keep_n: int, log: Callable[[str], None], max_age_days: float = 0,
+                  max_total_mb: float = 0) -> List[str]:
+    """
+    Drop backups beyond the count/age/size limits from the catalog (newest is always kept).
+    Folders are only moved to Backups/.trash here; call purge_pruned_backups() to free the space.
+    """
+    return catalog.prune(backups_dir(), keep_n, max_age_days, max_total_mb, log)
+
+
+def purge_pruned_backups(log: Callable[[str], None], progress=None, cancelled=None) -> int:
+    """Delete the backups already pruned to the trash, for every instance. Stops early when cancelled."""
+    with timing.span("purge"):
+        n = catalog.purge_trash(backups_dir(), log, cancelled)
+        extras = extra_instances(load_settings())
+        for inst in extras:
+            n += catalog.purge_trash(backups_dir(inst), log, cancelled)
+        if extras and not (cancelled and cancelled()):
+            objects.gc(objects.store_dir(), log)  # old versions drop out of the store with their backups
+        return n
+
+
+def cleanup_backups(log: Callable[[str], None], progress=None, cancelled=None, purge: bool = True) -> int:
+    """
+    Prune with the configured limits, then delete. Meant for a low-priority background thread.
+    Pruning only renames; purge=False leaves the slow delete to a later purge_pruned_backups().
+    """
+    s = load_settings()
+    limits = (int(s.get("keep_backups", 3)), float(s.get("backup_max_age_days", 0) or 0),
+              float(s.get("backup_max_total_mb", 0) or 0))
+    with timing.span("prune"):
+        prune_backups(limits[0], log, limits[1], limits[2])
+        for inst in extra_instances(s):
+            catalog.prune(backups_dir(inst), *limits, log=log)
+    return purge_pruned_backups(log, progress, cancelled) if purge else 0
 
 
 def safe_rel(path: str) -> str:
     return path.replace("\\", "/").strip("/")
 
 
-def apply_manifest(extract_dir: str, manifest: Dict[str, Any], dry_run: bool, log: Callable[[str], None]):
+def recover_pending(log: Callable[[str], None]) -> List[str]:
+    """Finish or undo an apply that was interrupted (crash, power loss, killed process)."""
     s = load_settings()
-    mc = s["minecraft_path"]
-    to_replace: List[str] = [safe_rel(p["path"]) for p in manifest.get("paths", [])]
-    to_replace = [p for p in to_replace if p.split("/")[0] not in NEVER_TOUCH]
+    mc = s.get("minecraft_path") or ""
+    if not os.path.isdir(mc):
+        return []
+    out = transaction.recover(mc, backups_dir(), log)
+    for inst in extra_instances(s):
+        out += transaction.recover(inst, backups_dir(inst), log)
+    return out
+
+
+def last_rollback_point(mc: str | None = None) -> str | None:
+    """Newest backup that was produced by a transactional apply (None if there is none)."""
+    d = backups_dir(mc)
+    for e in catalog.entries(d):
+        if transaction.is_transaction_backup(os.path.join(d, e["name"])):
+            return os.path.join(d, e["name"])
+    return None
+
+
+def rollback_last_update(log: Callable[[str], None]) -> str:
+    """Swap the newest pre_update backup back into .minecraft. Returns the restored version."""
+    point = last_rollback_point()
+    if not point:
+        raise RuntimeError("No rollback point found in Backups.")
+    s = load_settings()
+    log(f"[ROLLBACK] from {os.path.basename(point)}")
+    with open(os.path.join(point, transaction.TXN_FILE), "r", encoding="utf-8") as f:
+        version = json.load(f).get("version", "")
+    # other instances only roll back if their newest apply was the same update
+    for inst in extra_instances(s):
+        p = last_rollback_point(inst)
+        if p:
+            with open(os.path.join(p, transaction.TXN_FILE), "r", encoding="utf-8") as f:
+                same = json.load(f).get("version", "") == version
+            if same:
+                log(f"[ROLLBACK] {inst}")
+                transaction.rollback_backup(inst, p, backups_dir(inst), log)
+                state.invalidate(inst)
+    hdr = transaction.rollback_backup(s["minecraft_path"], point, backups_dir(), log)
+    state.invalidate(s["minecraft_path"])  # restored files carry their old mtimes
+    s["last_applied_version"] = hdr.get("prev_version", "")
+    save_settings(s)
+    return s["last_applied_version"]
+
+
+# Per-path apply modes (manifest "paths"[].mode):
+#   mirror      the folder ends up exactly like the pack (extras removed); "replace" is the old name
+#   overlay     pack files are added/updated, local extras are left alone
+#   keep-local  only missing files are added; existing local files are never overwritten
+MODES = ("mirror", "overlay", "keep-local")
+_MODE_ALIASES = {"replace": "mirror"}
+
+
+def path_modes(manifest: Dict[str, Any]) -> Dict[str, str]:
+    """Managed rel → normalized mode (protected top-level items dropped; unknown modes act as mirror)."""
+    out: Dict[str, str] = {}
+    for p in manifest.get("paths", []):
+        rel = safe_rel(p["path"])
+        if rel.split("/")[0] in NEVER_TOUCH:
+            continue
+        mode = _MODE_ALIASES.get(p.get("mode", "mirror"), p.get("mode", "mirror"))
+        out[rel] = mode if mode in MODES else "mirror"
+    return out
 
-    create_backup("pre_update", to_replace, log)
 
-    for rel in to_replace:
-        src = os.path.join(extract_dir, rel)
-        dst = os.path.join(mc, rel)
-        log(f"[REPLACE] {rel}")
-        if dry_run:
+def managed_paths(manifest: Dict[str, Any]) -> List[str]:
+    return list(path_modes(manifest))
+
+
+def _under(arc: str, rel: str) -> bool:
+    return arc == rel or arc.startswith(rel + "/")
+
+
+def plan_apply(mc: str, manifest: Dict[str, Any], log: Callable[[str], None]):
+    """
+    Work out which files actually differ from the manifest, honouring each path's mode.
+    Returns (rels, index): the per-file rels to swap (a whole path when a file/folder
+    changed type) and the refreshed state index. (None, None) for manifests without
+    per-file hashes, which are applied path by path as before.
+    """
+    files = manifest.get("files")
+    if not files:
+        return None, None
+    modes = path_modes(manifest)
+    desired = {f["path"]: f["sha256"] for f in files}
+    index = state.load(mc)
+    local = state.scan(mc, list(modes), index, log, rules.for_manifest(manifest))
+    rels: List[str] = []
+    for rel, mode in modes.items():
+        full = os.path.join(mc, rel)
+        want = sorted(a for a in desired if _under(a, rel))
+        if (os.path.isfile(full) and want != [rel] and want) or (os.path.isdir(full) and rel in desired):
+            if mode != "keep-local":
+                rels.append(rel)
             continue
-        if os.path.exists(dst):
-            if os.path.isdir(dst):
-                shutil.rmtree(dst, ignore_errors=True)
-            else:
-                try:
-                    os.remove(dst)
-                except Exception:
-                    pass
-        os.makedirs(os.path.dirname(dst), exist_ok=True)
-        if os.path.isdir(src):
-            shutil.copytree(src, dst, dirs_exist_ok=True)
-        else:
-            shutil.copy2(src, dst)
+        if mode == "keep-local":
+            rels += [a for a in want if a not in local]
+            continue
+        rels += [a for a in want if local.get(a) != desired[a]]
+        if mode == "mirror":
+            rels += sorted(a for a in local if _under(a, rel) and a not in desired)
+    return rels, index
 
-    if not dry_run:
-        s["last_applied_version"] = manifest.get("version", "")
-        save_settings(s)
-        prune_backups(int(s.get("keep_backups", 3)), log)
 
+def is_up_to_date(manifest: Dict[str, Any], log: Callable[[str], None]) -> bool:
+    """True when this version was applied last and every managed file still matches it."""
+    s = load_settings()
+    mc = s.get("minecraft_path") or ""
+    if not os.path.isdir(mc) or str(manifest.get("version", "")) != s.get("last_applied_version", ""):
+        return False
+    for root in [mc] + extra_instances(s):
+        rels, index = plan_apply(root, manifest, log)
+        if rels is None:
+            return False
+        state.save(root, index)
+        if rels:
+            return False
+    return True
+
+
+def _prune_empty_dirs(mc: str, rels: Iterable[str], roots: Iterable[str]):
+    """Remove folders emptied by file removals (never the manifest paths themselves)."""
+    stop = {os.path.normpath(os.path.join(mc, r)) for r in roots}
+    for rel in sorted(rels, reverse=True):
+        d = os.path.dirname(os.path.normpath(os.path.join(mc, rel)))
+        while d not in stop and d.startswith(os.path.normpath(mc) + os.sep):
+            try:
+                os.rmdir(d)
+            except OSError:
+                break
+            d = os.path.dirname(d)
 
-def _gather_files(mc_root: str, rel: str, log: Callable[[str], None]):
-    """Yield (abs_path, arcname) for a single file or all files under a folder."""
-    rel_clean = safe_rel(rel)
-    src = os.path.join(mc_root, rel_clean)
-    if not os.path.exists(src):
-        log(f"[SKIP missing] {rel_clean}")
-        return
 
-    if os.path.isdir(src):
-        cnt = 0
-        for base, _, files in os.walk(src):
-            for f in files:
-                cnt += 1
-                full = os.path.join(base, f)
-                arc = os.path.relpath(full, mc_root).replace("\\", "/")
-                yield full, arc
-        log(f"[SCAN] {rel_clean} → {cnt} file(s)")
-    else:
-        yield src, rel_clean
-        log(f"[SCAN] {rel_clean} → 1 file")
-
-
-def build_pack(include_paths, out_dir, log, progress=None):
+def apply_manifest(extract_dir: str, manifest: Dict[str, Any], dry_run: bool, log: Callable[[str], None]):
+    """
+    Bring .minecraft in line with the extracted pack as one transaction.
+    Only files whose hash differs from the manifest are backed up and swapped (the
+    local state index in .mcman makes the comparison a stat per unchanged file);
+    old content is moved (not copied) into Backups/<stamp>_pre_update and serves as
+    the rollback point. Extract onto the .minecraft volume (see
+    transaction.stage_root) so staging is a rename as well.
+    """
+    s = load_settings()
+    mc = s["minecraft_path"]
+    to_replace = managed_paths(manifest)
+    extras = extra_instances(s)
+
+    if not dry_run:
+        recover_pending(log)
+    with timing.span("apply", version=manifest.get("version", "")) as sp:
+        # Other instances first: the main apply moves the extracted files away.
+        store = objects.store_dir(mc) if extras and manifest.get("files") else None
+        if store and not dry_run:
+            _adopt_into_store(extract_dir, manifest, store, log)
+        for inst in extras:
+            _apply_instance(inst, extract_dir, manifest, store, dry_run, s.get("last_applied_version", ""), log)
+
+        rels, index = plan_apply(mc, manifest, log)
+        if rels is None:
+            rels = to_replace
+        else:
+            log(f"[PLAN] {len(rels)} file(s) differ from the pack")
+
+        if dry_run:
+            for rel in rels:
+                log(f"[REPLACE] {rel} (dry run)")
+            return
+
+        if rels:
+            transaction.apply_paths(
+                mc, extract_dir, rels, backups_dir(), log,
+                label="pre_update",
+                version=manifest.get("version", ""),
+                prev_version=s.get("last_applied_version", ""),
+            )
+            if index is not None:
+                wanted = {f["path"] for f in manifest["files"]}
+                _prune_empty_dirs(mc, [r for r in rels if r not in wanted], to_replace)
+        else:
+            log("[UP TO DATE] local files already match the pack; nothing to back up or replace")
+        if index is not None:
+            state.record(mc, index, {f["path"]: f["sha256"] for f in manifest["files"]}, rels)
+        sp.add(files=len(rels))
+
+    s["last_applied_version"] = manifest.get("version", "")
+    save_settings(s)
+    # what is installed now, so Verify & Repair compares with this version even after newer releases
+    compact_manifest.write(os.path.join(transaction.internal_dir(mc), APPLIED_MANIFEST), manifest)
+
+
+def _adopt_into_store(extract_dir: str, manifest: Dict[str, Any], store: str, log: Callable[[str], None]):
+    """Move the extracted shared files into the object store, leaving hardlinks behind."""
+    shared = objects.store_paths()
+    n = linked = 0
+    with timing.span("store") as sp:
+        for f in manifest["files"]:
+            src = os.path.join(extract_dir, f["path"])
+            if objects.is_shared(f["path"], shared) and os.path.isfile(src):
+                linked += objects.adopt(store, src, f["sha256"], f["size"])
+                n += 1
+                sp.add(bytes=f["size"], files=1)
+    log(f"[STORE] {n} shared file(s), {linked} hardlinked → {store}")
+
+
+def _apply_instance(inst: str, extract_dir: str, manifest: Dict[str, Any], store: str | None,
+                    dry_run: bool, prev_version: str, log: Callable[[str], None]):
+    """Bring one extra instance in line with the pack, linking shared files from the store."""
+    log(f"[INSTANCE] {inst}")
+    rels, index = plan_apply(inst, manifest, log)
+    if rels is None:
+        rels = managed_paths(manifest)
+    if dry_run:
+        for rel in rels:
+            log(f"[REPLACE] {rel} (dry run)")
+        return
+    if not rels:
+        log("[UP TO DATE] instance already matches the pack")
+        return
+    files = {f["path"]: f for f in manifest.get("files", [])}
+    shared = objects.store_paths()
+    stage = tempfile.mkdtemp(prefix=cache.TEMP_PREFIX, dir=transaction.stage_root(inst))
+    try:
+        linked = 0
+        for rel in rels:
+            src, dst = os.path.join(extract_dir, rel), os.path.join(stage, rel)
+            f = files.get(rel)
+            if store and f and objects.is_shared(rel, shared):
+                got = objects.link(store, f["sha256"], f["size"], dst)
+                if got is not None:
+                    linked += got
+                    continue
+            if os.path.isdir(src):
+                shutil.copytree(src, dst)
+            elif os.path.isfile(src):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+        log(f"[INSTANCE] {len(rels)} path(s) to apply, {linked} hardlinked from the store")
+        transaction.apply_paths(inst, stage, rels, backups_dir(inst), log, label="pre_update",
+                                version=manifest.get("version", ""), prev_version=prev_version)
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
+    if index is not None:
+        _prune_empty_dirs(inst, [r for r in rels if r not in files], managed_paths(manifest))
+        state.record(inst, index, {a: f["sha256"] for a, f in files.items()}, rels)
+
+
+def build_pack(include_paths, out_dir, log, progress=None, cancelled=None):
     """
-    Create minecraft-pack.zip with the selected items from .minecraft.
+    Create minecraft-pack.zip with the selected items from .minecraft (see packer.build).
     Returns (zip_path, manifest_path, manifest_dict)
     """
-    s = load_settings()
-    mc = (s.get("minecraft_path") or "").strip()
-    if not mc:
-        raise RuntimeError("minecraft_path is empty in settings.")
-    if not os.path.isdir(mc):
-        raise RuntimeError(f".minecraft path does not exist: {mc}")
-
-    os.makedirs(out_dir, exist_ok=True)
-    log(f"[MC ROOT] {mc}")
-    log(f"[OUT DIR] {out_dir}")
-
-    # Filter “never touch” at the top-level only
-    filtered = []
-    for rel in include_paths:
-        top = safe_rel(rel).split("/", 1)[0]
-        if top in NEVER_TOUCH:
-            log(f"[SKIP protected] {rel}")
-            continue
-        filtered.append(rel)
-
-    if not filtered:
-        raise RuntimeError("Selection is empty after filtering protected items.")
-
-    zip_path = os.path.join(out_dir, "minecraft-pack.zip")
-    mani_path = os.path.join(out_dir, "manifest.json")
-
-    # Gather files first (so progress is real)
-    all_files = []
-    for rel in filtered:
-        for pair in _gather_files(mc, rel, log):
-            all_files.append(pair)
-
-    if not all_files:
-        raise RuntimeError("No files resolved from selection.")
-
-    total = len(all_files)
-    log(f"[START] Zipping {total} file(s) → {zip_path}")
-    if progress:
-        progress(0.10)
-
-    # Zip with occasional progress updates
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        for i, (full, arc) in enumerate(all_files, start=1):
-            z.write(full, arcname=arc)
-            if progress and (i % 50 == 0 or i == total):
-                progress(0.10 + 0.80 * (i / total))
-
-    # Manifest
-    from .github_api import sha256_file
-    sha = sha256_file(zip_path)
-    manifest = {
-        "version": time.strftime("%Y.%m.%d.%H%M"),
-        "asset": "minecraft-pack.zip",
-        "sha256": sha,
-        "paths": [{"path": safe_rel(p), "mode": "replace"} for p in include_paths],
-    }
-    with open(mani_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, indent=2)
-
-    log(f"[SHA256] {sha}")
-    log("[DONE] Pack built.")
-    if progress:
-        progress(0.95)
-
-    return zip_path, mani_path, manifest
+    return tuple(packer.build(include_paths, out_dir, log=log, progress=progress, cancelled=cancelled))
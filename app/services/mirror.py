@@ -0,0 +1,207 @@
+#app\services\mirror.py
+"""
+Optional LAN mirror for pack downloads.
+
+Client: before going to GitHub, download_asset() asks the configured mirror
+(settings "mirror_url", e.g. http://192.168.1.20:8765) for /objects/<sha256>.
+The mirror is content-addressed and everything it returns is checked against the
+manifest's sha256, so it needs no trust: a bad or stale mirror just falls through
+to GitHub.
+
+Server: MirrorServer is a small built-in HTTP server the admin's copy of the app
+can run ("mirror_serve"). It only serves files whose sha256 is known from the
+manifests in the folders it was given (no directory listing, no arbitrary paths).
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Optional
+
+import requests
+
+from . import cache, throttle, timing
+
+DEFAULT_PORT = 8765
+_SHA_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+# ---------------- client ----------------
+def fetch_from_mirror(
+    mirror_url: str,
+    asset_name: str,
+    sha256: str,
+    to_dir: str,
+    progress: Optional[Callable[[float], None]] = None,
+    log: Optional[Callable[[str], None]] = None,
+    timeout: float = 5.0,
+) -> Optional[str]:
+    """
+    Try the mirror. Returns the downloaded path if it matched `sha256`, else None
+    (unreachable mirror, 404, or wrong content — the partial file is removed).
+    """
+    sha256 = (sha256 or "").lower()
+    if not mirror_url or not _SHA_RE.match(sha256):
+        return None
+    url = f"{mirror_url.rstrip('/')}/objects/{sha256}"
+    os.makedirs(to_dir, exist_ok=True)
+    out_path = os.path.join(to_dir, asset_name)
+    part = out_path + ".part"
+    h = hashlib.sha256()
+    try:
+        with timing.span("mirror_download", asset=asset_name) as sp, \
+                requests.get(url, stream=True, timeout=(timeout, 120)) as resp:
+            if resp.status_code != 200:
+                if log:
+                    log(f"[MIRROR] {asset_name}: HTTP {resp.status_code}; using GitHub")
+                return None
+            total = int(resp.headers.get("Content-Length", "0") or "0")
+            read = 0
+            with open(part, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=1024 * 1024):
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    h.update(chunk)
+                    read += len(chunk)
+                    throttle.net(len(chunk))
+                    throttle.disk(len(chunk))
+                    if progress and total:
+                        progress(read / total)
+            sp.add(bytes=read, files=1)
+    except (requests.RequestException, OSError) as e:
+        if log:
+            log(f"[MIRROR] {asset_name}: {e.__class__.__name__}; using GitHub")
+        _discard(part)
+        return None
+
+    if h.hexdigest() != sha256:
+        if log:
+            log(f"[MIRROR] {asset_name}: sha256 mismatch from mirror; using GitHub")
+        _discard(part)
+        return None
+    os.replace(part, out_path)
+    if log:
+        log(f"[MIRROR] {asset_name} from {mirror_url}")
+    return out_path
+
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ---------------- server ----------------
+def _index_dir(d: str) -> Dict[str, str]:
+    """sha256 → file for the pack/delta assets described by d/manifest.json (and d/published)."""
+    out: Dict[str, str] = {}
+    for folder in (d, os.path.join(d, "published")):
+        mp = os.path.join(folder, "manifest.json")
+        try:
+            with open(mp, "r", encoding="utf-8") as f:
+                mani = json.load(f)
+        except (OSError, ValueError):
+            continue
+        entries = [(mani.get("asset", "minecraft-pack.zip"), mani.get("sha256"))]
+        entries += [(x.get("asset"), x.get("sha256")) for x in mani.get("deltas", []) or []]
+        for name, sha in entries:
+            p = os.path.join(folder, name or "")
+            if sha and name and os.path.isfile(p):
+                out.setdefault(str(sha).lower(), p)
+    return out
+
+
+class MirrorServer:
+    """
+    Serves /objects/<sha256> for files known from manifests in `dirs`, register()ed
+    files and (with serve_cache) this machine's download cache, so any player's
+    copy of the app can act as a peer mirror.
+    """
+
+    def __init__(self, dirs: Iterable[str], host: str = "0.0.0.0", port: int = DEFAULT_PORT,
+                 log: Optional[Callable[[str], None]] = None, serve_cache: bool = False):
+        self._dirs = list(dirs)
+        self._serve_cache = serve_cache
+        self._extra: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._log = log
+        srv = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def _serve(self, head: bool):
+                m = re.match(r"^/objects/([0-9a-fA-F]{64})$", self.path)
+                path = srv.lookup(m.group(1).lower()) if m else None
+                if not path:
+                    self.send_error(404)
+                    return
+                try:
+                    size = os.path.getsize(path)
+                    f = open(path, "rb")
+                except OSError:
+                    self.send_error(404)
+                    return
+                with f:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(size))
+                    self.end_headers()
+                    if not head:
+                        shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+                if srv._log and not head:
+                    srv._log(f"[MIRROR] served {os.path.basename(path)} to {self.client_address[0]}")
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mirror", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def register(self, sha256: str, path: str):
+        with self._lock:
+            self._extra[sha256.lower()] = path
+
+    def lookup(self, sha256: str) -> Optional[str]:
+        with self._lock:
+            p = self._extra.get(sha256)
+        if p and os.path.isfile(p):
+            return p
+        for d in self._dirs:  # manifests are tiny; re-read so new builds are picked up
+            p = _index_dir(d).get(sha256)
+            if p:
+                return p
+        if self._serve_cache:
+            return cache.lookup(sha256)
+        return None
+
+    def start(self) -> "MirrorServer":
+        self._thread.start()
+        if self._log:
+            self._log(f"[MIRROR] serving on port {self.port}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,109 @@
+#app\services\objects.py
+"""
+Content-addressed object store shared by several .minecraft instances.
+
+Pack files under the shared paths (settings "store_paths", mods/ and libraries/
+by default) are kept once as <store>/<sha[:2]>/<sha> and every instance gets a
+hardlink to that object, so N instances cost the disk of one and an update
+writes each file once. Only folders whose files are replaced rather than edited
+in place are shared; a hardlinked config would leak edits between instances.
+
+Where a link is impossible (instance on another volume, FAT32) the object is
+copied instead. An object is garbage once the store holds its only link
+(st_nlink == 1): no instance and no backup refers to it any more.
+"""
+
+import os
+import shutil
+from typing import Callable, List, Optional
+
+from .config import load_settings
+from .transaction import internal_dir
+
+
+def store_dir(mc: Optional[str] = None) -> str:
+    """settings "object_store_dir", else <minecraft_path>/.mcman/objects (same volume, so adopting is a rename)."""
+    s = load_settings()
+    d = (s.get("object_store_dir") or "").strip() or \
+        os.path.join(internal_dir(mc or s.get("minecraft_path") or ""), "objects")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+def store_paths() -> List[str]:
+    return [p.replace("\\", "/").strip("/") for p in load_settings().get("store_paths", ["mods", "libraries"])]
+
+
+def is_shared(arc: str, paths: List[str]) -> bool:
+    return any(arc == p or arc.startswith(p + "/") for p in paths)
+
+
+def path_for(store: str, sha: str) -> str:
+    return os.path.join(store, sha[:2], sha)
+
+
+def _valid(obj: str, size: int) -> bool:
+    try:
+        return os.path.getsize(obj) == size
+    except OSError:
+        return False
+
+
+def adopt(store: str, src: str, sha: str, size: int) -> bool:
+    """
+    Make src (a freshly extracted pack file) a link to its store object, moving it into
+    the store first if the object is new or damaged. False if src stays a separate copy.
+    """
+    obj = path_for(store, sha)
+    os.makedirs(os.path.dirname(obj), exist_ok=True)
+    if not _valid(obj, size):
+        try:
+            os.replace(src, obj)
+        except OSError:           # other volume: keep a copy in the store
+            shutil.copy2(src, obj + ".part")
+            os.replace(obj + ".part", obj)
+            return False
+    elif os.path.samefile(src, obj):
+        return True
+    else:
+        os.remove(src)
+    try:
+        os.link(obj, src)
+        return True
+    except OSError:
+        shutil.copy2(obj, src)
+        return False
+
+
+def link(store: str, sha: str, size: int, dst: str) -> Optional[bool]:
+    """Place the object at dst: True linked, False copied, None when the store lacks it."""
+    obj = path_for(store, sha)
+    if not _valid(obj, size):
+        return None
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(obj, dst)
+        return True
+    except OSError:
+        shutil.copy2(obj, dst)
+        return False
+
+
+def gc(store: str, log: Optional[Callable[[str], None]] = None) -> int:
+    """Delete objects nothing links to any more. Returns how many were removed."""
+    n = freed = 0
+    for base, _, names in os.walk(store):
+        for name in names:
+            p = os.path.join(base, name)
+            try:
+                st = os.stat(p)
+                if st.st_nlink > 1:
+                    continue
+                os.remove(p)
+            except OSError:
+                continue
+            n += 1
+            freed += st.st_size
+    if n and log:
+        log(f"[STORE] removed {n} unreferenced object(s), {freed / 1e6:.1f} MB")
+    return n
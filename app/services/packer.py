@@ -1,66 +1,334 @@
+#app\services\packer.py
+"""
+The pack build engine. The admin tab (minecraft.build_pack), `--build` and the
+tests all go through build().
+
+iter_entries() walks the selection lazily with os.scandir and yields one Entry
+per file, pruning folders the "pack_rules" globs exclude (rules.py). build() feeds that generator straight into archive.write_archive,
+which compresses members in parallel and hashes each file from the same read,
+so the per-file manifest entries cost no second pass and memory stays flat
+however many files the pack holds (only the manifest's own list grows).
+
+Builds are incremental: build_index.json next to the pack remembers size,
+mtime and sha256 per file, and unchanged files are copied into the new zip as
+already-compressed bytes from the previous one (no read, no deflate, no hash).
+
+Identical files are stored once ("build_dedupe"): a file whose content matches
+one already packed becomes a manifest entry with "alias": <packed path> and no
+zip member; clients recreate it after extracting (updater.materialize_aliases).
+Only files that share their size with an earlier one are hashed up front, so a
+pack without duplicates is still read exactly once.
+
+Callbacks are all optional: log(str), progress(fraction 0..1), cancelled() → bool.
+"""
+
 from __future__ import annotations
-import zipfile, hashlib, time, os
+
+import json
+import os
+import time
+import zipfile
 from pathlib import Path
-from typing import Iterable, Tuple
-from .config import settings
-from .minecraft import NEVER_TOUCH
-
-DEFAULT_INCLUDE = [
-    "config", "journeymap", "libraries", "mods", "resourcepacks", "shaderpacks",
-    "options.txt", "optionsof.txt", "optionsshaders.txt", "servers.dat"
-]
-
-def _iter_paths(base: Path, entries: Iterable[str]):
-    for ent in entries:
-        p = base / ent
-        if p.is_dir():
-            for sub in p.rglob("*"):
-                if sub.is_file():
-                    yield sub, sub.relative_to(base)
-        elif p.is_file():
-            yield p, p.relative_to(base)
-
-def build_pack(include: Iterable[str] = DEFAULT_INCLUDE, out_dir: Path | None = None) -> Tuple[Path, dict, Path]:
-    mc = Path(settings.minecraft_path)
-    out = Path(out_dir or Path.home() / "Documents" / "mc-manager-out")
-    out.mkdir(parents=True, exist_ok=True)
-    zip_path = out / "minecraft-pack.zip"
-
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        for file_path, rel in _iter_paths(mc, include):
-            top = str(rel).split(os.sep)[0]
-            if top in NEVER_TOUCH:
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import archive, compact_manifest, delta, hashing, rules, timing, worlds
+from .config import DEFAULT_CHECKED, NEVER_TOUCH, load_settings
+
+DEFAULT_INCLUDE = list(DEFAULT_CHECKED)
+PACK_ASSET = "minecraft-pack.zip"
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "build_index.json"   # arc → [size, mtime_ns, sha256] of the pack in out_dir
+
+
+class Entry(NamedTuple):
+    full: str
+    arc: str
+    size: int
+    mtime_ns: int
+
+
+class BuildResult(NamedTuple):
+    zip_path: str
+    manifest_path: str
+    manifest: dict
+
+
+def _rel(path: str) -> str:
+    return path.replace("\\", "/").strip("/")
+
+
+def _quiet(_msg: str):
+    pass
+
+
+def select(include: Iterable[str], log: Callable[[str], None] = _quiet) -> List[str]:
+    """Normalized selection with protected top-level items (NEVER_TOUCH) dropped."""
+    out = []
+    for rel in include:
+        rel = _rel(rel)
+        if rel.split("/", 1)[0] in NEVER_TOUCH:
+            log(f"[SKIP protected] {rel}")
+            continue
+        out.append(rel)
+    return out
+
+
+def _walk(top: str, arc_top: str, matcher: Optional[rules.Matcher] = None) -> Iterator[Tuple[os.DirEntry, str]]:
+    """
+    (entry, arcname) for files under top, depth first, names sorted per folder so packs
+    are reproducible. Folders the matcher excludes are never listed.
+    """
+    stack = [(top, arc_top)]
+    while stack:
+        d, arc_d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                items = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for e in items:
+            arc = f"{arc_d}/{e.name}"
+            if e.is_dir(follow_symlinks=False):
+                if not matcher or matcher.allows(arc, True):
+                    subdirs.append((e.path, arc))
+            elif e.is_file() and (not matcher or matcher.allows(arc)):
+                yield e, arc
+        stack.extend(reversed(subdirs))
+
+
+def iter_entries(mc: str, rels: Iterable[str], log: Callable[[str], None] = _quiet,
+                 matcher: Optional[rules.Matcher] = None) -> Iterator[Entry]:
+    """Yield an Entry for every file in the selection, one folder listing at a time."""
+    for rel in rels:
+        src = os.path.join(mc, rel)
+        if matcher and not matcher.allows_path(rel, os.path.isdir(src)):
+            log(f"[SKIP rules] {rel}")
+        elif os.path.isdir(src):
+            cnt = 0
+            for e, arc in _walk(src, rel, matcher):
+                cnt += 1
+                st = e.stat()
+                yield Entry(e.path, arc, st.st_size, st.st_mtime_ns)
+            log(f"[SCAN] {rel} → {cnt} file(s)")
+        elif os.path.isfile(src):
+            st = os.stat(src)
+            yield Entry(src, rel, st.st_size, st.st_mtime_ns)
+            log(f"[SCAN] {rel} → 1 file")
+        else:
+            log(f"[SKIP missing] {rel}")
+
+
+def _walk_key(arc: str, rels: List[str]):
+    """Sort key that puts arcs in iter_entries() order: selection order, then files before subfolders."""
+    for i, rel in enumerate(rels):
+        if arc == rel or arc.startswith(rel + "/"):
+            parts = arc[len(rel):].strip("/").split("/") if arc != rel else []
+            return i, tuple((1, p) for p in parts[:-1]) + (((0, parts[-1]),) if parts else ())
+    return len(rels), ((0, arc),)
+
+
+def _known_entries(mc: str, rels: List[str], prev: Dict[str, List], changed: Iterable[str],
+                   matcher: rules.Matcher) -> List[Entry]:
+    """
+    The selection's entries when only `changed` paths (files or folders) can differ from
+    `prev`, the last build's index over the same selection and rules: those are stat'ed or
+    listed again, everything else comes from the index without touching the disk.
+    """
+    changed = {_rel(c) for c in changed}
+    folders = tuple(c + "/" for c in changed if c not in prev)   # new files, or folders
+    out = {a: Entry(os.path.join(mc, a), a, v[0], v[1]) for a, v in prev.items()
+           if a not in changed and not a.startswith(folders)}
+    roots = [c for c in changed if any(c == r or c.startswith(r + "/") for r in rels)]
+    for e in iter_entries(mc, roots, matcher=matcher):
+        out[e.arc] = e
+    return sorted(out.values(), key=lambda e: _walk_key(e.arc, rels))
+
+
+def _measure(mc: str, rels: List[str], matcher: rules.Matcher):
+    """(files, bytes) of the selection; a counting pass so progress is real without keeping a list."""
+    n = total = 0
+    with timing.span("scan") as sp:
+        for e in iter_entries(mc, rels, matcher=matcher):
+            n += 1
+            total += e.size
+        sp.add(files=n, bytes=total)
+    return n, total
+
+
+def _load_index(out_dir: str):
+    """
+    (index, stored) for the pack currently in out_dir: the build index, and the arcs
+    whose member in the zip can be copied as is. ({}, set()) when either file is missing.
+    """
+    zip_path = os.path.join(out_dir, PACK_ASSET)
+    try:
+        with open(os.path.join(out_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        names = archive.list_archive(zip_path)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return {}, set()
+    return index, {a for a, v in index.items() if names.get(a) == v[0]}
+
+
+def has_index(out_dir: str) -> bool:
+    """True when out_dir holds a pack the next build can be incremental against."""
+    return all(os.path.isfile(os.path.join(out_dir, n)) for n in (PACK_ASSET, INDEX_FILE))
+
+
+def _save_index(out_dir: str, index: Dict[str, List]):
+    p = os.path.join(out_dir, INDEX_FILE)
+    with open(p + ".part", "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(p + ".part", p)
+
+
+def build(
+    include: Iterable[str] = DEFAULT_INCLUDE,
+    out_dir: Optional[str] = None,
+    mc: Optional[str] = None,
+    log: Callable[[str], None] = _quiet,
+    progress: Optional[Callable[[float], None]] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    changed: Optional[Iterable[str]] = None,
+) -> BuildResult:
+    """
+    Build minecraft-pack.zip and manifest.json (per-file hashes, path modes, and a
+    delta against the last published pack; also as manifest.mcm) in out_dir. mc defaults to the
+    minecraft_path setting. Raises RuntimeError on a bad selection or when cancelled.
+    `changed` (watch mode) promises that only those paths moved since the last build of the
+    same selection in out_dir, so nothing else is listed or stat'ed.
+    """
+    with timing.run("build", log=log):
+        return _build(list(include), out_dir, mc, log, progress, cancelled, changed)
+
+
+def _build(include, out_dir, mc, log, progress, cancelled, changed=None) -> BuildResult:
+    s = load_settings()
+    mc = (mc or s.get("minecraft_path") or "").strip()
+    if not mc:
+        raise RuntimeError("minecraft_path is empty in settings.")
+    if not os.path.isdir(mc):
+        raise RuntimeError(f".minecraft path does not exist: {mc}")
+    out_dir = str(out_dir or Path.home() / "Documents" / "mc-manager-out")
+    os.makedirs(out_dir, exist_ok=True)
+    log(f"[MC ROOT] {mc}")
+    log(f"[OUT DIR] {out_dir}")
+
+    rels = select(include, log)
+    if not rels:
+        raise RuntimeError("Selection is empty after filtering protected items.")
+
+    zip_path = os.path.join(out_dir, PACK_ASSET)
+    mani_path = os.path.join(out_dir, MANIFEST_FILE)
+
+    matcher = rules.compile(s.get("pack_rules"))
+    prev, stored = _load_index(out_dir)
+    known = _known_entries(mc, rels, prev, changed, matcher) if changed is not None and prev else None
+    if known is not None:
+        log(f"[SCAN] {len(known)} file(s); only {len(changed)} changed path(s) re-checked")
+        total = sum(e.size for e in known)
+    else:
+        total = _measure(mc, rels, matcher)[1] if progress else 0
+    if progress:
+        progress(0.10)
+    dedupe = bool(s.get("build_dedupe", False))
+    index: Dict[str, List] = {}
+    files = []
+    aliases = []
+    first: Dict[str, str] = {}              # sha256 → packed arc holding that content
+    unhashed: Dict[int, List[Entry]] = {}   # size → packed entries whose sha256 isn't known yet
+    hashed_sizes = set()                    # sizes of packed entries whose sha256 is known
+
+    def items():
+        for e in known if known is not None else iter_entries(mc, rels, log, matcher):
+            p = prev.get(e.arc)
+            same = bool(p and p[0] == e.size and p[1] == e.mtime_ns)
+            sha = p[2] if same else None
+            # same size as an earlier file: compare contents (a sha known from the last build too)
+            if dedupe and (e.size in unhashed or (sha is None and e.size in hashed_sizes)):
+                for o in unhashed.pop(e.size, []):
+                    first.setdefault(index[o.arc][2] or hashing.sha256_file(o.full), o.arc)
+                hashed_sizes.add(e.size)  # the bucket is empty now; later files of this size must still hash
+                sha = sha or hashing.sha256_file(e.full)
+            index[e.arc] = [e.size, e.mtime_ns, sha]
+            if dedupe and sha and sha in first:
+                aliases.append({"path": e.arc, "size": e.size, "sha256": sha, "alias": first[sha]})
                 continue
-            z.write(file_path, arcname=str(rel))
+            if sha:
+                first[sha] = e.arc
+                hashed_sizes.add(e.size)
+            elif dedupe:
+                unhashed.setdefault(e.size, []).append(e)
+            yield e.full, e.arc, same and e.arc in stored
+
+    def on_member(arc: str, size: int, sha: Optional[str]):
+        sha = sha or prev[arc][2]
+        index[arc][2] = sha
+        files.append({"path": arc, "size": size, "sha256": sha})
+
+    def on_bytes(done: int):
+        if total:
+            progress(0.10 + 0.80 * min(1.0, done / total))
+
+    # Written to .part and swapped in, so the hardlinked copy kept in published/
+    # (delta base) is never truncated.
+    log(f"[START] Packing → {zip_path}")
+    stats = archive.write_archive(
+        zip_path, items(), progress=on_bytes if progress else None, on_member=on_member,
+        cancelled=cancelled, base=zip_path if stored else None)
+    if not files:
+        os.remove(zip_path)
+        raise RuntimeError("No files resolved from selection.")
+    _save_index(out_dir, index)
+    log(f"[ZIP] {stats['files']} file(s), {stats['bytes'] / 1e6:.1f} MB → {stats['compressed'] / 1e6:.1f} MB"
+        f" ({stats['reused']} unchanged, copied from the last build)")
+    if aliases:
+        log(f"[DEDUPE] {len(aliases)} duplicate file(s) stored once "
+            f"({sum(a['size'] for a in aliases) / 1e6:.1f} MB not packed)")
+        files += aliases
 
-    # sha256
-    h = hashlib.sha256()
-    with open(zip_path, "rb") as f:
-        for chunk in iter(lambda: f.read(1024*1024), b""):
-            h.update(chunk)
-    sha = h.hexdigest()
+    with timing.span("hash") as sp:
+        sha = hashing.sha256_file(zip_path)
+        sp.add(bytes=os.path.getsize(zip_path), files=1)
 
+    modes = s.get("path_modes") or {}
     manifest = {
         "version": time.strftime("%Y.%m.%d.%H%M"),
-        "asset": "minecraft-pack.zip",
+        "asset": PACK_ASSET,
         "sha256": sha,
-        "paths": [{"path": p, "mode": "replace"} for p in include],
+        "paths": [{"path": _rel(p), "mode": modes.get(_rel(p), "mirror")} for p in include],
+        "rules": matcher.rules,
+        "files": files,
     }
-    manifest_path = out / "manifest.json"
-    import json
-    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
-    return zip_path, manifest, manifest_path
-
-def backup_worlds_only(out_dir: Path | None = None) -> Path:
-    mc = Path(settings.minecraft_path)
-    saves = mc / "saves"
-    out = Path(out_dir or Path.home() / "Documents" / "mc-manager-backups")
-    out.mkdir(parents=True, exist_ok=True)
-    stamp = time.strftime("%Y%m%d_%H%M%S")
-    zip_path = out / f"worlds_{stamp}.zip"
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        if saves.exists():
-            for sub in saves.rglob("*"):
-                if sub.is_file():
-                    z.write(sub, arcname=str(sub.relative_to(saves.parent)))
-    return zip_path
+
+    if cancelled and cancelled():
+        raise RuntimeError("Cancelled")
+
+    # Delta against the last published pack (players on that version download only this)
+    delta_path = os.path.join(out_dir, delta.DELTA_ASSET)
+    prev = delta.load_published(out_dir) if s.get("build_deltas", True) else None
+    if prev and str(prev[1].get("version", "")) not in ("", manifest["version"]):
+        entry = delta.build_delta(prev[0], prev[1], zip_path, manifest, delta_path, log)
+        entry["sha256"] = hashing.sha256_file(delta_path)
+        manifest["deltas"] = [entry]
+    elif os.path.exists(delta_path):
+        os.remove(delta_path)  # stale delta from an older base
+
+    with open(mani_path + ".part", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(mani_path + ".part", mani_path)
+    compact_manifest.write(os.path.join(out_dir, compact_manifest.ASSET), manifest)
+
+    log(f"[SHA256] {sha}")
+    log("[DONE] Pack built.")
+    if progress:
+        progress(0.95)
+    return BuildResult(zip_path, mani_path, manifest)
+
+
+def backup_worlds_only(out_dir: Path | None = None) -> Path | None:
+    """Incremental backup of saves/ (see worlds.py). Returns the new increment's archive, or None if unchanged."""
+    store = str(Path(out_dir) / "worlds") if out_dir else worlds.store_dir()
+    entry = worlds.backup(load_settings().get("minecraft_path") or "", log=_quiet, store=store)
+    return Path(store) / f"{entry['id']}.zip" if entry else None
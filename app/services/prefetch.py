@@ -0,0 +1,161 @@
+#app\services\prefetch.py
+"""
+Download and stage the next update ahead of time, so applying it at the next
+launch is just the rename-based apply.
+
+run_once() polls the latest release with a conditional request (the ETag of the
+last answer; an unchanged release costs one 304). For a new version it runs
+the usual prepare_update (delta or full pack, sha256 check, extract) and moves
+the result to <mc>/.mcman/stage/prefetch, saves the manifest next to it as
+prefetch.mcm and marks it ready in .mcman/prefetch.json. Nothing in
+.minecraft changes.
+
+take() hands that folder to an update whose manifest matches (same version and
+pack sha256) and clears the marker first, so a stage is never applied twice.
+staged_manifest() lets an update apply offline from the stage.
+
+run_once() takes the .minecraft lock (transaction.busy) without waiting: while
+an update or verify holds it, the poll is skipped ("busy") rather than staging
+under an apply.
+
+Meant to run in the background: `--prefetch [--every MINUTES]` from a startup
+entry or a scheduled task, under the background network/disk limits (throttle.py).
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, Optional
+
+from . import compact_manifest
+from .config import load_settings
+from .github_api import get_latest_release, manifest_from_release
+from .transaction import BusyError, busy, internal_dir, stage_root
+from .updater import prepare_update
+
+STATE_FILE = "prefetch.json"
+MANIFEST_FILE = "prefetch.mcm"
+STAGE_DIR = "prefetch"
+
+
+def _state_path(mc: str) -> str:
+    return os.path.join(internal_dir(mc), STATE_FILE)
+
+
+def _stage_dir(mc: str) -> str:
+    return os.path.join(stage_root(mc), STAGE_DIR)
+
+
+def _load(mc: str) -> Dict[str, Any]:
+    try:
+        with open(_state_path(mc), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(mc: str, st: Dict[str, Any]):
+    p = _state_path(mc)
+    with open(p + ".part", "w", encoding="utf-8") as f:
+        json.dump(st, f, indent=2)
+    os.replace(p + ".part", p)
+
+
+def discard(mc: str):
+    """Forget a staged update (the poll ETag is kept)."""
+    st = _load(mc)
+    if st.pop("ready", None) is not None:
+        _save(mc, st)
+    shutil.rmtree(_stage_dir(mc), ignore_errors=True)
+    try:
+        os.remove(os.path.join(internal_dir(mc), MANIFEST_FILE))
+    except OSError:
+        pass
+
+
+def staged_manifest(mc: str) -> Optional[Dict[str, Any]]:
+    """Manifest of the update that is staged and ready, or None."""
+    st = _load(mc)
+    if not st.get("ready") or not os.path.isdir(_stage_dir(mc)):
+        return None
+    try:
+        return compact_manifest.load(os.path.join(internal_dir(mc), MANIFEST_FILE))
+    except (OSError, ValueError):
+        return None
+
+
+def _matches(st: Dict[str, Any], manifest: Dict[str, Any]) -> bool:
+    return st.get("version") == str(manifest.get("version", "")) and st.get("sha256") == manifest.get("sha256")
+
+
+def take(mc: str, manifest: Dict[str, Any], log: Callable[[str], None]) -> Optional[str]:
+    """
+    The staged extract folder if it holds exactly this manifest's pack, else None.
+    The folder is the caller's from here on (apply it, then delete it).
+    """
+    st = _load(mc)
+    src = _stage_dir(mc)
+    if not st.get("ready") or not _matches(st, manifest) or not os.path.isdir(src):
+        return None
+    st.pop("ready")
+    _save(mc, st)
+    ex = os.path.join(stage_root(mc), f"extract_prefetch_{int(time.time())}")
+    os.replace(src, ex)
+    log(f"[PREFETCH] using the update staged in the background ({st['version']}); nothing to download")
+    return ex
+
+
+def run_once(log: Callable[[str], None], progress: Optional[Callable[[float], None]] = None) -> str:
+    """
+    One poll: returns "unchanged" (304), "current" (already applied), "ready"
+    (this version is already staged), "staged" (downloaded and staged now) or
+    "busy" (an update or verify is running; try again next poll).
+    """
+    s = load_settings()
+    mc = s.get("minecraft_path") or ""
+    if not os.path.isdir(mc):
+        raise RuntimeError(f".minecraft path does not exist: {mc}")
+    try:
+        with busy(mc, wait=False):
+            return _poll(mc, s, log, progress)
+    except BusyError:
+        log("[PREFETCH] an update or verify is running; skipping this poll")
+        return "busy"
+
+
+def _poll(mc: str, s: Dict[str, Any], log: Callable[[str], None],
+          progress: Optional[Callable[[float], None]]) -> str:
+    st = _load(mc)
+    rel, etag = get_latest_release(st.get("etag"))
+    if rel is None:
+        log("[PREFETCH] no new release")
+        return "unchanged"
+    mani = manifest_from_release(rel, log)
+    ver = str(mani.get("version", ""))
+    status = None
+    if ver == s.get("last_applied_version", ""):
+        discard(mc)
+        log(f"[PREFETCH] {ver} is already installed")
+        status = "current"
+    elif st.get("ready") and _matches(st, mani) and os.path.isdir(_stage_dir(mc)):
+        log(f"[PREFETCH] {ver} is already staged")
+        status = "ready"
+    if status:
+        _save(mc, {**_load(mc), "etag": etag})
+        return status
+
+    discard(mc)
+    log(f"[PREFETCH] staging {ver}")
+    ex = prepare_update(mani, mc, s.get("last_applied_version", ""), log, progress)
+    try:
+        compact_manifest.write(os.path.join(internal_dir(mc), MANIFEST_FILE), mani)
+        os.replace(ex, _stage_dir(mc))
+    except BaseException:
+        shutil.rmtree(ex, ignore_errors=True)
+        raise
+    # the ETag is only remembered once the stage is complete, so a failed run retries next poll
+    _save(mc, {"etag": etag, "version": ver, "sha256": mani.get("sha256"), "ready": True,
+               "staged_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+    log(f"[PREFETCH] {ver} ready; the next update applies it from disk")
+    return "staged"
@@ -0,0 +1,86 @@
+#app\services\rules.py
+"""
+Ordered include/exclude globs for what goes into a pack (settings "pack_rules",
+copied into manifest["rules"]).
+
+Each rule is "-pattern" (exclude) or "+pattern" (include); the last rule that
+matches a path decides, as in .gitignore. Patterns are relative to .minecraft
+and use "/" separators:
+
+    *       anything except "/"         **      any number of folders
+    ?       one character except "/"    dir/    only matches folders
+    no "/"  matches the name at any depth ("*.log", ".cache/")
+
+An excluded folder is pruned from the walk, so nothing under it is listed,
+hashed or packed, and (like .gitignore) an include rule can't bring back a
+file inside it. All rules compile into one regex per kind (file/folder), so
+checking a path is a single match. The build (packer) drops excluded files;
+clients skip them when comparing, so excluded local junk is never treated as
+an extra file and removed in mirror mode.
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+
+def _glob_to_re(glob: str) -> str:
+    out, i = [], 0
+    while i < len(glob):
+        c = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        out.append("[^/]*" if c == "*" else "[^/]" if c == "?" else re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def _compile(rules: List[str], dirs: bool):
+    alts = []
+    # newest rule first: alternation stops at the first branch that matches
+    for i in reversed(range(len(rules))):
+        sign, pat = rules[i][0], rules[i][1:].strip().replace("\\", "/")
+        dir_only = pat.endswith("/")
+        pat = pat.strip("/")
+        if not pat or (dir_only and not dirs):
+            continue
+        body = _glob_to_re(pat) if "/" in pat else "(?:.*/)?" + _glob_to_re(pat)
+        alts.append(f"(?P<{'i' if sign == '+' else 'x'}{i}>{body})")
+    return re.compile("|".join(alts)) if alts else None
+
+
+class Matcher:
+    def __init__(self, rules: Iterable[str]):
+        self.rules = [r.strip() for r in rules if r.strip() and r.strip()[0] in "+-"]
+        self._files = _compile(self.rules, dirs=False)
+        self._dirs = _compile(self.rules, dirs=True)
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def allows(self, rel: str, is_dir: bool = False) -> bool:
+        """Decision for this path alone (callers walking a tree have already checked its parents)."""
+        rx = self._dirs if is_dir else self._files
+        m = rx.fullmatch(rel) if rx else None
+        return m is None or m.lastgroup[0] == "i"
+
+    def allows_path(self, rel: str, is_dir: bool = False) -> bool:
+        """allows() for rel and every folder above it."""
+        parts = rel.strip("/").split("/")
+        for k in range(1, len(parts)):
+            if not self.allows("/".join(parts[:k]), True):
+                return False
+        return self.allows(rel.strip("/"), is_dir)
+
+
+def compile(rules: Optional[Iterable[str]]) -> Matcher:
+    return Matcher(rules or [])
+
+
+def for_manifest(manifest) -> Matcher:
+    return Matcher(manifest.get("rules") or [])
@@ -0,0 +1,122 @@
+#app\services\state.py
+"""
+Local state index: what the last apply left in .minecraft.
+
+<mc>/.mcman/state.json maps every managed file to [size, mtime_ns, sha256].
+Checking a file is a stat(); it is only re-hashed when size or mtime moved, so
+comparing a whole pack against disk costs one stat per file on a re-run.
+"""
+
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import hashing, rules, timing
+from .transaction import internal_dir
+
+STATE_FILE = "state.json"
+
+Entry = List  # [size, mtime_ns, sha256]
+
+
+def _path(mc: str) -> str:
+    return os.path.join(internal_dir(mc), STATE_FILE)
+
+
+def load(mc: str) -> Dict[str, Entry]:
+    try:
+        with open(_path(mc), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return dict(data.get("files", {}))
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def save(mc: str, files: Dict[str, Entry]):
+    p = _path(mc)
+    with open(p + ".part", "w", encoding="utf-8") as f:
+        json.dump({"files": files}, f, separators=(",", ":"))
+    os.replace(p + ".part", p)
+
+
+def invalidate(mc: str):
+    """Forget everything (e.g. after a rollback swapped in files with old mtimes)."""
+    try:
+        os.remove(_path(mc))
+    except OSError:
+        pass
+
+
+def _walk(mc: str, rel: str, matcher: Optional[rules.Matcher] = None) -> Iterable[Tuple[str, os.stat_result]]:
+    full = os.path.join(mc, rel)
+    if matcher and not matcher.allows_path(rel, os.path.isdir(full)):
+        return
+    if os.path.isfile(full):
+        yield rel, os.stat(full)
+        return
+    for base, dirs, names in os.walk(full):
+        arc_base = os.path.relpath(base, mc).replace("\\", "/")
+        if matcher:
+            dirs[:] = [d for d in dirs if matcher.allows(f"{arc_base}/{d}", True)]
+        for n in names:
+            arc = f"{arc_base}/{n}"
+            if matcher and not matcher.allows(arc):
+                continue
+            try:
+                yield arc, os.stat(os.path.join(base, n))
+            except OSError:
+                continue
+
+
+def scan(mc: str, rels: Iterable[str], index: Dict[str, Entry],
+         log: Optional[Callable[[str], None]] = None,
+         matcher: Optional[rules.Matcher] = None) -> Dict[str, str]:
+    """
+    sha256 of every file under `rels`, keyed by pack path. Files whose size and
+    mtime match `index` reuse the recorded hash; the rest are hashed (in parallel)
+    and `index` is updated in place. Paths the pack's rules exclude are skipped
+    (their folders are not even listed).
+    """
+    out: Dict[str, str] = {}
+    stale: Dict[str, Tuple[str, os.stat_result]] = {}
+    with timing.span("state_scan") as sp:
+        for rel in rels:
+            for arc, st in _walk(mc, rel, matcher):
+                e = index.get(arc)
+                if e and e[0] == st.st_size and e[1] == st.st_mtime_ns:
+                    out[arc] = e[2]
+                else:
+                    stale[os.path.join(mc, arc)] = (arc, st)
+                sp.add(files=1)
+        if stale:
+            for full, sha in hashing.hash_files(list(stale)).items():
+                arc, st = stale[full]
+                out[arc] = sha
+                index[arc] = [st.st_size, st.st_mtime_ns, sha]
+            if log:
+                log(f"[STATE] hashed {len(stale)} changed/unknown file(s)")
+    return out
+
+
+def record(mc: str, index: Dict[str, Entry], desired: Dict[str, str], changed: Iterable[str]):
+    """
+    After an apply: every rel in `changed` now holds the pack's content (`desired`
+    path → sha256) or was removed. Everything else keeps what scan() found.
+    """
+    for rel in changed:
+        if os.path.isdir(os.path.join(mc, rel)):  # a whole path swapped in
+            for arc in [a for a in index if a.startswith(rel + "/")]:
+                del index[arc]
+            arcs = [a for a in desired if a.startswith(rel + "/")]
+        else:
+            arcs = [rel]
+        index.pop(rel, None)
+        for arc in arcs:
+            if arc not in desired:
+                continue
+            try:
+                st = os.stat(os.path.join(mc, arc))
+            except OSError:
+                continue
+            index[arc] = [st.st_size, st.st_mtime_ns, desired[arc]]
+    save(mc, index)
@@ -1,32 +1,206 @@
+#app\services\telemetry.py
+"""
+Opt-in usage counters (settings "telemetry_enabled").
+
+track() only bumps an in-memory Counter under a lock. A background timer
+appends the counts gathered since the last tick to events.jsonl (append-only,
+one small line per batch) and folds the journal into events.json when it grows.
+flush() uploads the totals as a GitHub issue on a worker thread; nothing here
+ever blocks an update or a build.
+"""
+
 from __future__ import annotations
+
+import atexit
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter
 from pathlib import Path
-import json, datetime
-from .config import settings, settings_dir
-from .github_api import create_issue
+from typing import Optional
+
+from .config import load_settings, settings_dir
+
+SAVE_INTERVAL = 60.0          # seconds between journal appends
+COMPACT_LINES = 200           # fold the journal into the snapshot past this many batches
+FLUSH_EVERY = 24 * 3600       # seconds between uploaded snapshots
+
 
 class Telemetry:
-    def __init__(self):
-        self.store = Path(settings_dir()) / "telemetry" / "events.json"
-        self.store.parent.mkdir(parents=True, exist_ok=True)
-        if not self.store.exists():
-            self.store.write_text("{}", encoding="utf-8")
-
-    def track(self, name: str):
-        if not settings.telemetry_enabled: return
-        data = json.loads(self.store.read_text(encoding="utf-8"))
-        data[name] = int(data.get(name, 0)) + 1
-        self.store.write_text(json.dumps(data, indent=2), encoding="utf-8")
-
-    def flush(self) -> bool:
-        if not settings.telemetry_enabled: return False
-        data = json.loads(self.store.read_text(encoding="utf-8"))
-        if not data: return True
-        lines = ["### Telemetry snapshot", "", f"Client: `{settings.telemetry_client_id}`", f"Version: `{settings.last_applied_version or '(unknown)'}`", "", "| event | count |", "|---|---:|"]
-        for k,v in data.items():
-            lines.append(f"| {k} | {v} |")
-        title = f"Telemetry {datetime.datetime.utcnow():%Y-%m-%d %H:%M} UTC • {settings.telemetry_client_id}"
-        create_issue(title, "\n".join(lines))
-        archive = self.store.with_name(f"events-{datetime.datetime.utcnow():%Y%m%d_%H%M%S}.json")
-        archive.write_text(json.dumps(data, indent=2), encoding="utf-8")
-        self.store.write_text("{}", encoding="utf-8")
+    def __init__(self, store: Optional[Path] = None, interval: float = SAVE_INTERVAL):
+        self.dir = Path(store or Path(settings_dir()) / "telemetry")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot = self.dir / "events.json"
+        self.journal = self.dir / "events.jsonl"
+        self.interval = interval
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()          # guards _pending
+        self._io = threading.Lock()            # serializes file work
+        self._timer: Optional[threading.Timer] = None
+        self._journal_lines = self._count_lines()
+        self.reload_settings()
+
+    # ----- hot path -----
+    def track(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending[name] += n
+
+    # ----- settings -----
+    def reload_settings(self):
+        s = load_settings()
+        self.enabled = bool(s.get("telemetry_enabled", False))
+        self.version = s.get("last_applied_version", "")
+        meta = self._meta()
+        if not meta.get("client_id"):
+            meta["client_id"] = uuid.uuid4().hex[:12]
+            self._save_meta(meta)
+        self.client_id = meta["client_id"]
+
+    # client id / last upload live next to the events, not in settings.json, so the
+    # settings tab saving its own copy of the settings can never roll them back
+    def _meta(self) -> dict:
+        try:
+            return json.loads((self.dir / "client.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta(self, meta: dict):
+        (self.dir / "client.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    # ----- persistence -----
+    def _count_lines(self) -> int:
+        try:
+            with open(self.journal, "rb") as f:
+                return sum(1 for _ in f)
+        except OSError:
+            return 0
+
+    def save(self):
+        """Append pending counts to the journal (one line) and compact if it got long."""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return
+        with self._io:
+            with open(self.journal, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"t": int(time.time()), "e": dict(batch)}) + "\n")
+            self._journal_lines += 1
+            if self._journal_lines >= COMPACT_LINES:
+                self._compact()
+
+    def _read_snapshot(self) -> Counter:
+        try:
+            return Counter(json.loads(self.snapshot.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return Counter()
+
+    def _compact(self):
+        totals = self._totals_locked()
+        tmp = self.snapshot.with_suffix(".part")
+        tmp.write_text(json.dumps(dict(totals), indent=2), encoding="utf-8")
+        os.replace(tmp, self.snapshot)
+        self.journal.write_text("", encoding="utf-8")
+        self._journal_lines = 0
+
+    def _totals_locked(self) -> Counter:
+        totals = self._read_snapshot()
+        try:
+            with open(self.journal, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        totals.update(json.loads(line)["e"])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # torn tail from a crash
+        except OSError:
+            pass
+        return totals
+
+    def totals(self) -> Counter:
+        self.save()
+        with self._io:
+            return self._totals_locked()
+
+    # ----- background batching -----
+    def start(self):
+        """Start the periodic journal writer and save once more at interpreter exit."""
+        if self._timer is None:
+            atexit.register(self.save)
+            self._schedule()
+        return self
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.interval, self._tick)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _tick(self):
+        try:
+            self.save()
+        finally:
+            self._schedule()
+
+    def stop(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self.save()
+
+    # ----- upload -----
+    def flush_due(self) -> bool:
+        last = float(self._meta().get("last_flush", 0) or 0)
+        return self.enabled and time.time() - last >= FLUSH_EVERY
+
+    def flush(self) -> threading.Thread:
+        """Upload a snapshot on a background thread; returns the thread. Failures are dropped."""
+        def run():
+            try:
+                self.flush_now()
+            except Exception:
+                pass  # best effort; the counts stay on disk for the next try
+
+        th = threading.Thread(target=run, name="telemetry-flush", daemon=True)
+        th.start()
+        return th
+
+    def flush_now(self) -> bool:
+        if not self.enabled:
+            return False
+        from .github_api import create_issue
+
+        self.save()
+        with self._io:
+            data = self._totals_locked()
+            if not data:
+                return True
+            now = datetime.datetime.utcnow()
+            lines = ["### Telemetry snapshot", "", f"Client: `{self.client_id}`",
+                     f"Version: `{self.version or '(unknown)'}`", "", "| event | count |", "|---|---:|"]
+            lines += [f"| {k} | {v} |" for k, v in sorted(data.items())]
+            create_issue(f"Telemetry {now:%Y-%m-%d %H:%M} UTC • {self.client_id}", "\n".join(lines))
+            archive = self.dir / f"events-{now:%Y%m%d_%H%M%S}.json"
+            archive.write_text(json.dumps(dict(data), indent=2), encoding="utf-8")
+            self.snapshot.write_text("{}", encoding="utf-8")
+            self.journal.write_text("", encoding="utf-8")
+            self._journal_lines = 0
+            self._save_meta({**self._meta(), "last_flush": time.time()})
         return True
+
+
+_instance: Optional[Telemetry] = None
+
+
+def get() -> Telemetry:
+    """Process-wide instance (created and started on first use)."""
+    global _instance
+    if _instance is None:
+        _instance = Telemetry().start()
+    return _instance
+
+
+def track(name: str, n: int = 1):
+    get().track(name, n)
@@ -0,0 +1,181 @@
+#app\services\throttle.py
+"""
+Keep background (auto) updates from getting in the player's way.
+
+Inside `with background(log):` downloads and disk writes are paced by two
+token buckets (settings "background_net_kbps" / "background_disk_kbps", KB/s,
+0 = unlimited) and, with "background_low_priority", the calling thread drops to
+Windows background mode (lower CPU, I/O and memory priority; nice +10
+elsewhere). Only the job that entered the block is affected: the limits live in
+a context variable, so the mirror server, admin builds, user-started downloads
+and the GUI thread run at full speed meanwhile. Pool threads working for the job
+join it through timing.bind(). Outside the block net()/disk() cost nothing.
+
+The limits adapt: while the PC has had no keyboard/mouse input for
+"background_idle_seconds", nobody is waiting on it and the buckets run
+unlimited; input switches them back on within a couple of seconds.
+
+Buckets allow debt: consume(n) takes the tokens at once and sleeps off any
+shortfall, so a large chunk (a whole zip member) is paced as accurately as many
+small ones and concurrent callers queue up behind each other's debt.
+"""
+
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from .config import load_settings
+
+ADAPT_EVERY = 2.0   # seconds between idle checks
+
+
+def _quiet(_m: str):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 clock: Optional[Callable[[], float]] = None, sleep: Optional[Callable[[float], None]] = None):
+        self.rate = float(rate)                  # bytes/s; 0 = unlimited
+        self.burst = float(burst or rate)        # one second's worth by default
+        self.tokens = self.burst
+        self._clock, self._sleep = clock or time.monotonic, sleep or time.sleep
+        self._last = self._clock()
+        self._lock = threading.Lock()
+
+    def consume(self, n: int) -> float:
+        """Take n tokens, sleeping off any debt; returns the time slept."""
+        with self._lock:
+            now = self._clock()
+            if self.rate <= 0:
+                self._last = now
+                return 0.0
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate) - n
+            self._last = now
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+def user_idle_seconds() -> Optional[float]:
+    """Seconds since the last keyboard/mouse input (Windows), None where unknown."""
+    if sys.platform != "win32":
+        return None
+    import ctypes
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+
+    lii = LASTINPUTINFO(ctypes.sizeof(LASTINPUTINFO), 0)
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lii)):
+        return None
+    return ((ctypes.windll.kernel32.GetTickCount() - lii.dwTime) & 0xFFFFFFFF) / 1000.0
+
+
+class _Limits:
+    def __init__(self, net_bps: float, disk_bps: float, idle_after: float,
+                 idle: Callable[[], Optional[float]], log: Callable[[str], None]):
+        self.net = TokenBucket(net_bps)
+        self.disk = TokenBucket(disk_bps)
+        self._base = (float(net_bps), float(disk_bps))
+        self._idle_after, self._idle, self._log = idle_after, idle, log
+        self._checked = 0.0
+        self.lifted = False
+
+    def adapt(self):
+        now = time.monotonic()
+        if not self._idle_after or now - self._checked < ADAPT_EVERY:
+            return
+        self._checked = now
+        idle = self._idle()
+        lifted = idle is not None and idle >= self._idle_after
+        if lifted != self.lifted:
+            self.lifted = lifted
+            self.net.rate, self.disk.rate = (0.0, 0.0) if lifted else self._base
+            self._log("[THROTTLE] PC idle: full speed" if lifted else "[THROTTLE] PC in use: limits back on")
+
+
+_active: contextvars.ContextVar[Optional[_Limits]] = contextvars.ContextVar("throttle_limits", default=None)
+
+
+def net(n: int):
+    """Account n bytes received (blocks while over the background network limit)."""
+    lim = _active.get()
+    if lim:
+        lim.adapt()
+        lim.net.consume(n)
+
+
+def disk(n: int):
+    """Account n bytes written (blocks while over the background disk limit)."""
+    lim = _active.get()
+    if lim:
+        lim.adapt()
+        lim.disk.consume(n)
+
+
+@contextmanager
+def low_priority():
+    """
+    Lower the calling thread's CPU and I/O priority for the duration (best effort); the
+    rest of the app, the GUI thread included, keeps its priority. On Linux the thread's
+    nice value cannot be raised again without privileges, so use it on threads that end
+    with the job (a worker thread, the headless process).
+    """
+    if sys.platform == "win32":
+        import ctypes
+        k32 = ctypes.windll.kernel32
+        # THREAD_MODE_BACKGROUND_BEGIN / _END
+        ok = k32.SetThreadPriority(k32.GetCurrentThread(), 0x00010000)
+        try:
+            yield
+        finally:
+            if ok:
+                k32.SetThreadPriority(k32.GetCurrentThread(), 0x00020000)
+        return
+    try:
+        tid = threading.get_native_id()   # Linux: setpriority on a thread id affects that thread only
+        before = os.getpriority(os.PRIO_PROCESS, tid)
+        os.setpriority(os.PRIO_PROCESS, tid, min(19, before + 10))
+    except (AttributeError, OSError):
+        before = None
+    try:
+        yield
+    finally:
+        if before is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, before)
+            except OSError:
+                pass   # raising priority again needs privileges; stays low until the thread ends
+
+
+def _fmt(kbps: float) -> str:
+    return f"{kbps:g} KB/s" if kbps else "unlimited"
+
+
+@contextmanager
+def background(log: Callable[[str], None] = _quiet, s=None,
+               idle: Callable[[], Optional[float]] = user_idle_seconds):
+    """Apply the background limits and priority from settings to the job run inside (this thread only)."""
+    s = s or load_settings()
+    net_kbps = float(s.get("background_net_kbps", 0) or 0)
+    disk_kbps = float(s.get("background_disk_kbps", 0) or 0)
+    token = None
+    if net_kbps or disk_kbps:
+        token = _active.set(_Limits(net_kbps * 1024, disk_kbps * 1024,
+                                    float(s.get("background_idle_seconds", 0) or 0), idle, log))
+        log(f"[THROTTLE] background update: network {_fmt(net_kbps)}, disk {_fmt(disk_kbps)}")
+    try:
+        if s.get("background_low_priority", True):
+            with low_priority():
+                yield
+        else:
+            yield
+    finally:
+        if token is not None:
+            _active.reset(token)
@@ -0,0 +1,213 @@
+#app\services\timing.py
+"""
+Lightweight span/timer API for the service layer.
+
+    with timing.run("update", log=log):          # one user-visible operation
+        with timing.span("download", asset=name) as sp:
+            ...
+            sp.add(bytes=n, files=1)
+
+Every finished span is appended as one JSON line to logs/<date>.spans.jsonl
+(next to the text log). When the outermost run() exits, a summary table of
+its phases is written through the given log callback.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import datetime
+import functools
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from .logging_util import log_dir
+
+_lock = threading.Lock()
+_local = threading.local()
+_runs: Dict[str, List["Span"]] = {}
+
+
+class Span:
+    """One timed phase. `bytes`/`files` are counters the caller adds to while it runs."""
+
+    __slots__ = ("name", "run", "parent", "fields", "bytes", "files", "start", "duration", "ok")
+
+    def __init__(self, name: str, run: Optional[str], parent: Optional[str], fields: dict):
+        self.name = name
+        self.run = run
+        self.parent = parent
+        self.fields = dict(fields)
+        self.bytes = 0
+        self.files = 0
+        self.start = 0.0
+        self.duration = 0.0
+        self.ok = True
+
+    def add(self, bytes: int = 0, files: int = 0):
+        self.bytes += int(bytes)
+        self.files += int(files)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def as_dict(self) -> dict:
+        d = {
+            "ts": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "run": self.run,
+            "span": self.name,
+            "parent": self.parent,
+            "duration_s": round(self.duration, 6),
+            "bytes": self.bytes,
+            "files": self.files,
+            "ok": self.ok,
+        }
+        d.update(self.fields)
+        return d
+
+
+def spans_path() -> str:
+    """JSON-lines file for today's spans, alongside the text log."""
+    return os.path.join(log_dir(), datetime.datetime.now().strftime("%Y%m%d") + ".spans.jsonl")
+
+
+def _write(sp: Span):
+    try:
+        line = json.dumps(sp.as_dict(), default=str)
+        with _lock:
+            with open(spans_path(), "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except Exception:
+        pass  # instrumentation must never break a build or update
+
+
+def _stack() -> list:
+    st = getattr(_local, "stack", None)
+    if st is None:
+        st = _local.stack = []
+    return st
+
+
+def current() -> Optional[Span]:
+    st = _stack()
+    return st[-1] if st else None
+
+
+def _current_run() -> Optional[str]:
+    return getattr(_local, "run", None)
+
+
+@contextmanager
+def span(name: str, **fields):
+    """Time a phase. Yields the Span so the caller can add bytes/files."""
+    parent = current()
+    sp = Span(name, _current_run(), parent.name if parent else None, fields)
+    st = _stack()
+    st.append(sp)
+    sp.start = time.perf_counter()
+    try:
+        yield sp
+    except BaseException:
+        sp.ok = False
+        raise
+    finally:
+        sp.duration = time.perf_counter() - sp.start
+        st.pop()
+        _write(sp)
+        if sp.run:
+            with _lock:
+                _runs.setdefault(sp.run, []).append(sp)
+
+
+def record(name: str, seconds: float, **fields) -> Span:
+    """Write a span timed elsewhere, e.g. app startup, which begins before anything could open a span."""
+    sp = Span(name, _current_run(), None, fields)
+    sp.duration = float(seconds)
+    _write(sp)
+    return sp
+
+
+def bind(fn):
+    """
+    Wrap fn so spans it opens on another thread (e.g. a pool) join the caller's run,
+    and it sees the caller's context variables (e.g. the background throttle).
+    """
+    run_id = _current_run()
+    parent = current()
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        prev_run = _current_run()
+        st = _stack()
+        _local.run = run_id
+        if parent is not None:
+            st.append(parent)
+        try:
+            return ctx.copy().run(fn, *args, **kwargs)   # a copy per call: pool threads run it concurrently
+        finally:
+            if parent is not None:
+                st.pop()
+            _local.run = prev_run
+    return wrapper
+
+
+def timed(name: Optional[str] = None):
+    """Decorator form of span()."""
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+@contextmanager
+def run(name: str, log: Optional[Callable[[str], None]] = None, **fields):
+    """
+    Group spans under one run id (e.g. a single update or build) and print a summary
+    table through `log` when it ends. Nested run() calls just join the outer run.
+    """
+    if _current_run():
+        with span(name, **fields) as sp:
+            yield sp
+        return
+
+    run_id = f"{name}-{time.strftime('%Y%m%d_%H%M%S')}-{threading.get_ident() % 10000:04d}"
+    _local.run = run_id
+    try:
+        with span(name, **fields) as sp:
+            yield sp
+    finally:
+        _local.run = None
+        with _lock:
+            spans = _runs.pop(run_id, [])
+        if log:
+            for line in summary_table(spans):
+                log(line)
+
+
+def summary_table(spans: List[Span]) -> List[str]:
+    """Aggregate spans by name (in first-seen order) into printable lines."""
+    if not spans:
+        return []
+    rows: Dict[str, list] = {}
+    for sp in sorted(spans, key=lambda s: s.start):
+        r = rows.setdefault(sp.name, [0, 0.0, 0, 0])
+        r[0] += 1
+        r[1] += sp.duration
+        r[2] += sp.bytes
+        r[3] += sp.files
+
+    lines = [
+        "[TIMING] phase                 n     seconds         MB    files     MB/s",
+    ]
+    for nm, (n, secs, b, files) in rows.items():
+        mb = b / 1e6
+        rate = f"{mb / secs:8.1f}" if b and secs > 0 else "       -"
+        lines.append(f"[TIMING] {nm:<20} {n:>3} {secs:>11.3f} {mb:>10.1f} {files:>8} {rate}")
+    return lines
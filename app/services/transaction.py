@@ -0,0 +1,420 @@
+#app\services\transaction.py
+"""
+Journaled, rename-based apply for .minecraft.
+
+New content is staged under <mc>/.mcman/txn/<id>/new (same volume as .minecraft),
+then every target path is swapped with two renames:
+
+    <mc>/<rel>        -> <txn>/old/<rel>     (skipped if it did not exist)
+    <txn>/new/<rel>   -> <mc>/<rel>          (skipped for pure removals)
+
+Before each rename an intent record is appended to <txn>/journal.jsonl and
+fsynced, and a done record follows it. Recovery does not trust the done records
+alone (a crash can land between a rename and its record): it decides from what
+exists on disk. The staged file is gone only once the "new" rename happened,
+and <txn>/old/<rel> exists only once the "old" rename happened. A crash or a
+locked file therefore always leaves enough to roll forward or back on the next
+launch. After commit the `old` folder is renamed into Backups/ as the
+pre_update backup, which makes rollback another set of renames (no copy I/O).
+
+busy() is the lock every process takes before it changes .minecraft or the
+stage (update, verify & repair, the background prefetch): an OS lock on
+<mc>/.mcman/busy.lock, so it is released even when its holder crashes.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import msvcrt  # type: ignore
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+from . import catalog, timing
+
+INTERNAL_DIR = ".mcman"
+TXN_FILE = "txn.json"          # written into a backup made from a transaction
+BUSY_FILE = "busy.lock"
+
+
+class TransactionError(RuntimeError):
+    pass
+
+
+class BusyError(TransactionError):
+    """Another update, verify or prefetch holds .minecraft (busy(wait=False))."""
+
+
+def internal_dir(mc: str) -> str:
+    d = os.path.join(mc, INTERNAL_DIR)
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+def stage_root(mc: str) -> str:
+    """Scratch area on the .minecraft volume; extract packs here so staging is a rename."""
+    d = os.path.join(internal_dir(mc), "stage")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+def _try_lock(f) -> bool:
+    try:
+        if msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    try:
+        if msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def busy(
+    mc: str,
+    log: Optional[Callable[[str], None]] = None,
+    wait: bool = True,
+    cancelled: Optional[Callable[[], bool]] = None,
+):
+    """
+    Hold the .minecraft lock for the block. With wait, poll until it is free (a running
+    prefetch finishes its stage, which the update can then take); else raise BusyError.
+    """
+    f = open(os.path.join(internal_dir(mc), BUSY_FILE), "a+b")
+    try:
+        said = False
+        while not _try_lock(f):
+            if not wait:
+                raise BusyError("another update, verify or prefetch is running")
+            if cancelled and cancelled():
+                raise TransactionError("cancelled while waiting for another update, verify or prefetch")
+            if log and not said:
+                log("[BUSY] another update, verify or prefetch is running; waiting for it")
+                said = True
+            time.sleep(0.5)
+        try:
+            yield
+        finally:
+            _unlock(f)
+    finally:
+        f.close()
+
+
+def _txn_root(mc: str) -> str:
+    d = os.path.join(internal_dir(mc), "txn")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+def _same_volume(a: str, b: str) -> bool:
+    try:
+        return os.stat(a).st_dev == os.stat(b).st_dev
+    except OSError:
+        return False
+
+
+def _remove(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _move(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(src, dst)
+
+
+class Transaction:
+    """One apply. Use begin() → stage() → commit(); rollback() on any failure."""
+
+    def __init__(self, mc: str, path: str, header: dict):
+        self.mc = mc
+        self.path = path
+        self.header = header
+        self.ops: List[dict] = header["ops"]
+        self.steps: Dict[int, set] = {}
+        self.state = "staging"
+
+    # ----- paths -----
+    @property
+    def new_dir(self) -> str:
+        return os.path.join(self.path, "new")
+
+    @property
+    def old_dir(self) -> str:
+        return os.path.join(self.path, "old")
+
+    @property
+    def journal(self) -> str:
+        return os.path.join(self.path, "journal.jsonl")
+
+    # ----- journal -----
+    def _append(self, rec: dict, sync: bool = False):
+        with open(self.journal, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+
+    def _mark(self, state: str):
+        self.state = state
+        self._append({"state": state}, sync=True)
+
+    @classmethod
+    def begin(cls, mc: str, rels: Iterable[str], label: str = "pre_update",
+              version: str = "", prev_version: str = "") -> "Transaction":
+        tid = time.strftime("%Y%m%d_%H%M%S") + f"_{os.getpid()}"
+        path = os.path.join(_txn_root(mc), tid)
+        os.makedirs(path)
+        header = {
+            "id": tid,
+            "label": label,
+            "version": version,
+            "prev_version": prev_version,
+            "created": time.time(),
+            "ops": [{"rel": r, "new": True} for r in rels],
+        }
+        t = cls(mc, path, header)
+        t._append({"header": header}, sync=True)
+        return t
+
+    @classmethod
+    def load(cls, path: str, mc: str) -> "Transaction":
+        header = None
+        steps: Dict[int, set] = {}
+        state = "staging"
+        with open(os.path.join(path, "journal.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break  # torn write at the tail: everything before it is valid
+                if "header" in rec:
+                    header = rec["header"]
+                elif "state" in rec:
+                    state = rec["state"]
+                elif "op" in rec:
+                    if "new" in rec:
+                        header["ops"][rec["op"]]["new"] = rec["new"]
+                    elif "step" in rec:   # "intent" records are for humans; the disk decides
+                        steps.setdefault(rec["op"], set()).add(rec["step"])
+        if header is None:
+            raise TransactionError(f"Unreadable journal in {path}")
+        t = cls(mc, path, header)
+        t.steps = steps
+        t.state = state
+        return t
+
+    # ----- phases -----
+    def stage(self, source_root: str, log: Callable[[str], None]):
+        """Move (or copy, across volumes) each op's new content into new/."""
+        rename = _same_volume(source_root, self.path)
+        with timing.span("stage", rename=rename) as sp:
+            for i, op in enumerate(self.ops):
+                src = os.path.join(source_root, op["rel"])
+                dst = os.path.join(self.new_dir, op["rel"])
+                if not os.path.lexists(src):
+                    op["new"] = False
+                    self._append({"op": i, "new": False})
+                    continue
+                if rename:
+                    _move(src, dst)
+                elif os.path.isdir(src):
+                    shutil.copytree(src, dst)
+                else:
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    shutil.copy2(src, dst)
+                sp.add(files=1)
+        self._mark("staged")
+        log(f"[STAGE] {len(self.ops)} path(s) staged")
+
+    def swap(self, log: Callable[[str], None]):
+        self._mark("swapping")
+        with timing.span("swap") as sp:
+            for i, op in enumerate(self.ops):
+                self._swap_one(i, op)
+                log(f"[REPLACE] {op['rel']}")
+                sp.add(files=1)
+
+    def _step(self, i: int, step: str, src: str, dst: str):
+        self._append({"op": i, "intent": step}, sync=True)
+        _move(src, dst)
+        self._append({"op": i, "step": step})
+
+    def _swap_one(self, i: int, op: dict):
+        """Idempotent: safe to re-run after a crash at any point, whatever the journal says."""
+        done = self.steps.setdefault(i, set())
+        dst = os.path.join(self.mc, op["rel"])
+        old = os.path.join(self.old_dir, op["rel"])
+        staged = os.path.join(self.new_dir, op["rel"])
+        if "new" in done or (op.get("new") and not os.path.lexists(staged)):
+            done.update(("old", "new"))   # new content is in place; dst must not be moved to old/
+            return
+        if "old" not in done:
+            if not os.path.lexists(old) and os.path.lexists(dst):
+                self._step(i, "old", dst, old)
+            done.add("old")
+        if op.get("new"):
+            self._step(i, "new", staged, dst)
+        done.add("new")
+
+    def commit(self, backups_root: str, log: Callable[[str], None]) -> Optional[str]:
+        """Mark committed and turn old/ into a backup folder. Returns the backup path."""
+        self._mark("committed")
+        return self._finish(backups_root, log)
+
+    def _finish(self, backups_root: str, log: Callable[[str], None]) -> Optional[str]:
+        backup = None
+        if os.path.isdir(self.old_dir):
+            os.makedirs(backups_root, exist_ok=True)
+            stamp = self.header["id"].rsplit("_", 1)[0]
+            backup = os.path.join(backups_root, f"{stamp}_{self.header.get('label', 'pre_update')}")
+            if os.path.exists(backup):
+                backup += f"_{self.header['id'].rsplit('_', 1)[1]}"
+            os.replace(self.old_dir, backup)
+            hdr = dict(self.header)
+            hdr["ops"] = [{"rel": op["rel"], "had_old": os.path.lexists(os.path.join(backup, op["rel"]))}
+                          for op in self.ops]
+            with open(os.path.join(backup, TXN_FILE), "w", encoding="utf-8") as f:
+                json.dump(hdr, f, indent=2)
+            catalog.add(backups_root, backup, hdr.get("label", "pre_update"),
+                        [op["rel"] for op in self.ops], hdr.get("version", ""), hdr.get("prev_version", ""))
+            log(f"[BACKUP] {os.path.basename(backup)} (moved, no copy)")
+        shutil.rmtree(self.path, ignore_errors=True)
+        return backup
+
+    def rollback(self, log: Callable[[str], None]):
+        """
+        Undo the swap (newest op first) and discard the transaction. Works from what is
+        actually on disk, so a step whose journal line was lost in a crash is still undone.
+        """
+        if self.state != "staging":
+            with timing.span("rollback") as sp:
+                for i in reversed(range(len(self.ops))):
+                    op = self.ops[i]
+                    dst = os.path.join(self.mc, op["rel"])
+                    old = os.path.join(self.old_dir, op["rel"])
+                    staged = os.path.join(self.new_dir, op["rel"])
+                    touched = False
+                    if op.get("new") and not os.path.lexists(staged) and os.path.lexists(dst):
+                        _move(dst, staged)  # new content went in; take it back out
+                        touched = True
+                    if os.path.lexists(old):
+                        if os.path.lexists(dst):
+                            _remove(dst)
+                        _move(old, dst)
+                        touched = True
+                    if touched:
+                        sp.add(files=1)
+                        log(f"[ROLLBACK] {op['rel']}")
+        self._mark("rolled_back")
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def apply_paths(
+    mc: str,
+    source_root: str,
+    rels: List[str],
+    backups_root: str,
+    log: Callable[[str], None],
+    label: str = "pre_update",
+    version: str = "",
+    prev_version: str = "",
+) -> Optional[str]:
+    """
+    Replace each rel under `mc` with the same rel from `source_root`, atomically per run.
+    A rel missing from source_root is removed from mc (moved into the backup).
+    Returns the backup folder holding the previous content (None if nothing existed).
+    """
+    txn = Transaction.begin(mc, rels, label=label, version=version, prev_version=prev_version)
+    try:
+        txn.stage(source_root, log)
+        txn.swap(log)
+    except BaseException as ex:
+        log(f"[ERROR] apply failed ({ex}); rolling back")
+        txn.rollback(log)
+        raise
+    return txn.commit(backups_root, log)
+
+
+def recover(mc: str, backups_root: str, log: Callable[[str], None]) -> List[str]:
+    """
+    Resolve transactions interrupted by a crash or power loss.
+    Fully staged ones are rolled forward (the update was verified); anything
+    interrupted while staging is discarded, since .minecraft was not touched yet.
+    Returns the states reached, one per transaction found.
+    """
+    root = os.path.join(mc, INTERNAL_DIR, "txn")
+    if not os.path.isdir(root):
+        return []
+    out = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if not os.path.isfile(os.path.join(path, "journal.jsonl")):
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        try:
+            txn = Transaction.load(path, mc)
+        except (OSError, TransactionError) as ex:
+            log(f"[RECOVER] {name}: {ex}")
+            continue
+        if txn.state == "staging":
+            log(f"[RECOVER] {name}: interrupted while staging; discarding")
+            shutil.rmtree(path, ignore_errors=True)
+            out.append("discarded")
+        elif txn.state in ("staged", "swapping"):
+            log(f"[RECOVER] {name}: interrupted during swap; rolling forward")
+            try:
+                txn.swap(log)
+                txn.commit(backups_root, log)
+                out.append("committed")
+            except OSError as ex:
+                log(f"[RECOVER] roll forward failed ({ex}); rolling back")
+                txn.rollback(log)
+                out.append("rolled_back")
+        elif txn.state == "committed":
+            txn._finish(backups_root, log)
+            out.append("committed")
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+            out.append(txn.state)
+    return out
+
+
+def is_transaction_backup(backup_dir: str) -> bool:
+    return os.path.isfile(os.path.join(backup_dir, TXN_FILE))
+
+
+def rollback_backup(mc: str, backup_dir: str, backups_root: str, log: Callable[[str], None]) -> dict:
+    """
+    Restore a pre_update backup made by apply_paths by swapping it back in with renames.
+    The content being replaced becomes a new "rolled_back" backup. Returns the backup header.
+    """
+    with open(os.path.join(backup_dir, TXN_FILE), "r", encoding="utf-8") as f:
+        hdr = json.load(f)
+    rels = [op["rel"] for op in hdr.get("ops", [])]
+    apply_paths(mc, backup_dir, rels, backups_root, log, label="rolled_back",
+                version=hdr.get("prev_version", ""), prev_version=hdr.get("version", ""))
+    shutil.rmtree(backup_dir, ignore_errors=True)
+    return hdr
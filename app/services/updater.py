@@ -0,0 +1,108 @@
+#app\services\updater.py
+"""
+User-side update pipeline: fetch the pack for a manifest and leave it extracted,
+verified and ready for minecraft.apply_manifest().
+"""
+
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from . import cache, delta, objects, throttle, timing
+from .github_api import download_asset, sha256_file
+from .transaction import stage_root
+
+
+def _verify(path: str, expected: str, what: str, log: Callable[[str], None]):
+    with timing.span("verify", asset=os.path.basename(path)):
+        sha = sha256_file(path)
+    if sha.lower() != str(expected or "").lower():
+        raise RuntimeError(f"SHA256 mismatch for {what}; expected {expected}, got {sha}")
+    log(f"[SHA256] {what} OK")
+
+
+def materialize_aliases(root: str, mani: Dict[str, Any], names: Optional[Iterable[str]] = None) -> int:
+    """
+    Recreate the files a deduplicated pack stores once (manifest "alias") under root
+    from their packed twin: hardlinked inside store_paths (never edited in place),
+    copied elsewhere. `names` limits it to those paths. Returns how many were made.
+    """
+    only = set(names) if names is not None else None
+    shared = objects.store_paths()
+    n = 0
+    for f in mani.get("files", []):
+        src_arc = f.get("alias")
+        if not src_arc or (only is not None and f["path"] not in only):
+            continue
+        src, dst = os.path.join(root, src_arc), os.path.join(root, f["path"])
+        if not os.path.isfile(src):
+            raise RuntimeError(f"Pack is missing {src_arc} (content of {f['path']})")
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if objects.is_shared(src_arc, shared) and objects.is_shared(f["path"], shared):
+            try:
+                os.link(src, dst)
+                n += 1
+                continue
+            except OSError:
+                pass
+        shutil.copy2(src, dst)
+        n += 1
+    return n
+
+
+def _try_delta(mani: Dict[str, Any], mc: str, local_version: str, tmp: str, ex: str,
+               progress, log: Callable[[str], None]) -> bool:
+    d = delta.pick_delta(mani, local_version)
+    if not d:
+        return False
+    log(f"[DELTA] {d['from_version']} → {d['to_version']} ({int(d.get('size', 0)) / 1e6:.2f} MB)")
+    try:
+        dz = download_asset(d["asset"], tmp, progress, log, sha256=d.get("sha256"))
+        _verify(dz, d.get("sha256"), d["asset"], log)
+        delta.reconstruct(dz, mc, ex, log, mani)
+        return True
+    except Exception as e:
+        log(f"[DELTA] {e}; falling back to the full pack")
+        shutil.rmtree(ex, ignore_errors=True)
+        os.makedirs(ex, exist_ok=True)
+        return False
+
+
+def prepare_update(
+    mani: Dict[str, Any],
+    mc: str,
+    local_version: str,
+    log: Callable[[str], None],
+    progress: Optional[Callable[[float], None]] = None,
+) -> str:
+    """
+    Download (delta when possible, otherwise the full pack), verify and extract.
+    Returns the extract folder; it lives on the .minecraft volume so applying it
+    is a rename. The caller removes it after apply.
+    """
+    tmp = tempfile.mkdtemp(prefix=cache.TEMP_PREFIX)
+    ex = tempfile.mkdtemp(prefix="extract_", dir=stage_root(mc))
+    try:
+        if not _try_delta(mani, mc, local_version, tmp, ex, progress, log):
+            asset = mani.get("asset", "minecraft-pack.zip")
+            log(f"[DOWNLOAD] {asset}")
+            zpath = download_asset(asset, tmp, progress, log, sha256=mani.get("sha256"))
+            _verify(zpath, mani.get("sha256"), asset, log)
+
+            with timing.span("extract") as sp, zipfile.ZipFile(zpath) as z:
+                for info in z.infolist():   # extractall, paced by the background disk limit
+                    z.extract(info, ex)
+                    throttle.disk(info.file_size)
+                sp.add(bytes=sum(i.file_size for i in z.infolist()), files=len(z.infolist()))
+        n = materialize_aliases(ex, mani)
+        if n:
+            log(f"[DEDUPE] {n} duplicate file(s) recreated locally")
+    except BaseException:
+        shutil.rmtree(ex, ignore_errors=True)
+        raise
+    finally:
+        # downloads are kept in the shared cache; the temp folder is not needed anymore
+        shutil.rmtree(tmp, ignore_errors=True)
+    return ex
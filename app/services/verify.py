@@ -0,0 +1,179 @@
+#app\services\verify.py
+"""
+Verify and repair a player's .minecraft against a pack manifest.
+
+verify() compares every managed file with the manifest's per-file sha256 (stat
+fast path through the state index, parallel hashing for anything that changed)
+and reports missing, modified and extra files. repair() fetches only the broken
+files — from the cached pack, or with HTTP Range reads of the release zip, and
+only as a last resort by downloading the whole pack — and swaps them in as one
+transaction (Backups/<stamp>_repair).
+
+Both work on the manifest of the *installed* version (manifest_to_check()):
+repairing against a newer release would silently mix two pack versions.
+"""
+
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import cache, compact_manifest, hashing, rules, state, timing, transaction
+from .config import load_settings
+from .minecraft import APPLIED_MANIFEST, backups_dir, path_modes
+
+
+def installed_manifest(mc: str, log: Callable[[str], None]) -> Optional[Dict[str, Any]]:
+    """
+    Manifest of the version recorded as installed (last_applied_version): the copy
+    saved by the last apply, else its release on GitHub. None when neither exists.
+    """
+    version = load_settings().get("last_applied_version", "")
+    if not version:
+        return None
+    try:
+        mani = compact_manifest.load(os.path.join(transaction.internal_dir(mc), APPLIED_MANIFEST))
+        if str(mani.get("version", "")) == version:
+            return mani
+    except (OSError, ValueError):
+        pass
+    from .github_api import get_manifest_for_version
+    try:
+        return get_manifest_for_version(version, log)
+    except Exception as e:
+        log(f"[VERIFY] could not fetch the manifest of {version}: {e}")
+        return None
+
+
+def manifest_to_check(mc: str, log: Callable[[str], None],
+                      progress: Optional[Callable[[float], None]] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    (manifest, repair allowed). Verify compares with the installed version; repairing
+    against a different version would mix two packs, so without the installed
+    manifest the latest one is used for a report only.
+    """
+    mani = installed_manifest(mc, log)
+    if mani is not None:
+        return mani, True
+    from .github_api import get_latest_manifest
+    latest = get_latest_manifest(progress, log)
+    log(f"[VERIFY] no manifest for the installed version ({load_settings().get('last_applied_version') or 'unknown'});"
+        f" comparing with the latest ({latest.get('version')}) as a report only."
+        " Use Update to Latest to fix differences.")
+    return latest, False
+
+
+def verify(
+    mc: str,
+    manifest: Dict[str, Any],
+    log: Callable[[str], None],
+    full: bool = False,
+) -> Dict[str, List[str]]:
+    """
+    Returns {"missing", "modified", "extra", "kept", "ok"} → pack paths. Path modes
+    apply: extras only count in mirror paths, and local edits in keep-local paths
+    are "kept" rather than modified. `full` ignores the state index and re-hashes.
+    """
+    files = manifest.get("files")
+    if not files:
+        raise RuntimeError("This manifest has no per-file hashes; rebuild the pack to enable Verify.")
+    desired = {f["path"]: f["sha256"] for f in files}
+    modes = path_modes(manifest)
+    index = {} if full else state.load(mc)
+    with timing.span("verify_local") as sp:
+        local = state.scan(mc, list(modes), index, log, rules.for_manifest(manifest))
+        sp.add(files=len(local))
+    state.save(mc, index)
+
+    def mode_of(arc: str) -> str:
+        return next((m for r, m in modes.items() if arc == r or arc.startswith(r + "/")), "mirror")
+
+    report: Dict[str, List[str]] = {"missing": [], "modified": [], "extra": [], "kept": [], "ok": []}
+    for arc, sha in sorted(desired.items()):
+        if arc not in local:
+            report["missing"].append(arc)
+        elif local[arc] == sha:
+            report["ok"].append(arc)
+        elif mode_of(arc) == "keep-local":
+            report["kept"].append(arc)
+        else:
+            report["modified"].append(arc)
+    report["extra"] = sorted(a for a in local if a not in desired and mode_of(a) == "mirror")
+
+    for kind in ("missing", "modified", "extra"):
+        for arc in report[kind]:
+            log(f"[VERIFY] {kind}: {arc}")
+    log(f"[VERIFY] {len(report['ok'])} ok, {len(report['missing'])} missing, "
+        f"{len(report['modified'])} modified, {len(report['extra'])} extra")
+    return report
+
+
+def _open_pack(manifest: Dict[str, Any], tmp: str, log: Callable[[str], None]):
+    """(zipfile source, description): cached pack, ranged remote reads, or a full download."""
+    from .github_api import download_asset, open_asset_ranged
+
+    asset = manifest.get("asset", "minecraft-pack.zip")
+    hit = cache.lookup(manifest.get("sha256"))
+    if hit:
+        return hit, "cache"
+    tag = str(manifest.get("version") or "") or None   # the release this manifest belongs to
+    try:
+        return open_asset_ranged(asset, tag), "ranged"
+    except Exception as e:
+        log(f"[REPAIR] ranged download unavailable ({e}); downloading the full pack")
+    return download_asset(asset, tmp, log=log, sha256=manifest.get("sha256"), tag=tag), "download"
+
+
+def _fetch(manifest: Dict[str, Any], names: List[str], out_dir: str, tmp: str,
+           log: Callable[[str], None], progress: Optional[Callable[[float], None]]):
+    from .updater import materialize_aliases
+
+    src, how = _open_pack(manifest, tmp, log)
+    aliases = {f["path"]: f["alias"] for f in manifest["files"] if f.get("alias")}
+    members = sorted({aliases.get(n, n) for n in names})  # a deduplicated file comes from its twin
+    with timing.span("repair_fetch", source=how) as sp, zipfile.ZipFile(src) as z:
+        for i, name in enumerate(members, start=1):
+            z.extract(name, out_dir)
+            sp.add(bytes=z.getinfo(name).file_size, files=1)
+            if progress:
+                progress(i / len(members))
+    materialize_aliases(out_dir, manifest, [n for n in names if n in aliases])
+    if how == "ranged":
+        log(f"[REPAIR] fetched {src.fetched / 1e6:.2f} MB of {src.size / 1e6:.2f} MB pack")
+
+
+def repair(
+    mc: str,
+    manifest: Dict[str, Any],
+    report: Dict[str, List[str]],
+    log: Callable[[str], None],
+    progress: Optional[Callable[[float], None]] = None,
+    remove_extra: bool = False,
+) -> int:
+    """Restore missing/modified files (and drop extras if asked). Returns how many paths changed."""
+    names = report["missing"] + report["modified"]
+    rels = names + (report["extra"] if remove_extra else [])
+    if not rels:
+        log("[REPAIR] nothing to repair")
+        return 0
+
+    desired = {f["path"]: f["sha256"] for f in manifest["files"]}
+    tmp = tempfile.mkdtemp(prefix=cache.TEMP_PREFIX)
+    ex = tempfile.mkdtemp(prefix="extract_", dir=transaction.stage_root(mc))
+    try:
+        if names:
+            _fetch(manifest, names, ex, tmp, log, progress)
+            got = hashing.hash_files([os.path.join(ex, n) for n in names])
+            bad = [n for n in names if got[os.path.join(ex, n)] != desired[n]]
+            if bad:
+                raise RuntimeError(f"Fetched file(s) failed their sha256 check: {', '.join(bad[:5])}")
+        ver = str(manifest.get("version", ""))
+        transaction.apply_paths(mc, ex, rels, backups_dir(), log, label="repair",
+                                version=ver, prev_version=load_settings().get("last_applied_version", ""))
+    finally:
+        shutil.rmtree(ex, ignore_errors=True)
+        shutil.rmtree(tmp, ignore_errors=True)
+    state.record(mc, state.load(mc), desired, rels)
+    log(f"[REPAIR] restored {len(names)} file(s)" + (f", removed {len(rels) - len(names)}" if remove_extra else ""))
+    return len(rels)
@@ -0,0 +1,269 @@
+#app\services\watch.py
+"""
+Admin watch mode: wait for changes under the selected paths and, once they have
+been quiet for a few seconds, rebuild the pack and optionally publish it.
+
+Changes come from the OS where it can tell us: on Windows (pywin32) each
+selected folder is watched with ReadDirectoryChangesW, and a poll only collects
+the file names it reported. Elsewhere the watcher polls folder mtimes (one stat
+per folder; a folder is listed again only when an entry was added, removed or
+renamed) and sweeps the whole selection every FULL_RESCAN_SECONDS to catch
+files edited in place, which leave their folder's mtime alone.
+
+Rebuilds get the changed paths (packer.build(changed=...)), so after the first
+build of a session only those are stat'ed and read; everything else is copied
+from the last zip as is.
+"""
+
+import os
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import packer, rules
+from .config import load_settings
+
+try:
+    import pywintypes  # type: ignore
+    import win32event  # type: ignore
+    import win32file  # type: ignore
+except Exception:
+    win32file = None
+
+Snapshot = Dict[str, Tuple[int, int]]   # arc → (size, mtime_ns)
+
+FULL_RESCAN_SECONDS = 60.0   # polling fallback: sweep for in-place edits this often
+_NOTIFY_BUFFER = 64 * 1024
+
+
+def diff(old: Snapshot, new: Snapshot) -> List[str]:
+    """Files added, removed or modified between two snapshots."""
+    return sorted({a for a, v in new.items() if old.get(a) != v} | (set(old) - set(new)))
+
+
+class _FolderPoller:
+    """Change source without OS notifications: folder mtimes every poll, a full sweep now and then."""
+
+    def __init__(self, mc: str, rels: List[str], matcher: rules.Matcher):
+        self.mc, self.rels, self.matcher = mc, rels, matcher
+        self._sweep()
+
+    def _sweep(self):
+        self.files: Snapshot = {}
+        self.dirs: Dict[str, int] = {}
+        for rel in self.rels:
+            if os.path.isdir(os.path.join(self.mc, rel)) and self.matcher.allows_path(rel, True):
+                self._list_tree(rel)
+        self._stat_files()
+        self._swept = time.monotonic()
+
+    def _stat_files(self):
+        """Selected single files: one stat each."""
+        for rel in self.rels:
+            full = os.path.join(self.mc, rel)
+            if rel in self.dirs or not self.matcher.allows_path(rel):
+                continue
+            try:
+                st = os.stat(full)
+                if os.path.isfile(full):
+                    self.files[rel] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                self.files.pop(rel, None)
+
+    def _mtime(self, arc: str) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.mc, arc)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _list_tree(self, arc_d: str):
+        """Record arc_d, every folder below it and their files."""
+        stack = [arc_d]
+        while stack:
+            d = stack.pop()
+            m = self._mtime(d)
+            if m is not None:
+                self.dirs[d] = m
+                self._list(d, stack)
+
+    def _list(self, arc_d: str, subdirs: List[str]) -> Set[str]:
+        """Files directly in arc_d (their stat lands in self.files); subfolders go to `subdirs`."""
+        out: Set[str] = set()
+        try:
+            with os.scandir(os.path.join(self.mc, arc_d)) as it:
+                entries = list(it)
+        except OSError:
+            return out
+        for e in entries:
+            arc = f"{arc_d}/{e.name}"
+            if e.is_dir(follow_symlinks=False):
+                if self.matcher.allows(arc, True):
+                    subdirs.append(arc)
+            elif e.is_file() and self.matcher.allows(arc):
+                st = e.stat()
+                self.files[arc] = (st.st_size, st.st_mtime_ns)
+                out.add(arc)
+        return out
+
+    def poll(self) -> List[str]:
+        if time.monotonic() - self._swept >= FULL_RESCAN_SECONDS:
+            old = self.files
+            self._sweep()
+            return diff(old, self.files)
+        before = dict(self.files)
+        self._stat_files()
+        for d, m in list(self.dirs.items()):
+            now = self._mtime(d)
+            if now == m:
+                continue
+            if now is None:   # folder gone: forget it and everything under it
+                for arc in [a for a in self.dirs if a == d or a.startswith(d + "/")]:
+                    del self.dirs[arc]
+                for arc in [a for a in self.files if a.startswith(d + "/")]:
+                    del self.files[arc]
+                continue
+            self.dirs[d] = now
+            subdirs: List[str] = []
+            listed = self._list(d, subdirs)
+            for arc in [a for a in self.files if a.startswith(d + "/") and "/" not in a[len(d) + 1:]]:
+                if arc not in listed:
+                    del self.files[arc]
+            for sub in subdirs:
+                if sub not in self.dirs:
+                    self._list_tree(sub)
+        return diff(before, self.files)
+
+    def close(self):
+        pass
+
+
+class _Notifier:
+    """Change source on Windows: one overlapped ReadDirectoryChangesW per selected folder."""
+
+    FLAGS = 0x1 | 0x2 | 0x8 | 0x10   # FILE_NOTIFY_CHANGE_FILE_NAME | DIR_NAME | SIZE | LAST_WRITE
+
+    def __init__(self, mc: str, rels: List[str], matcher: rules.Matcher):
+        self.matcher = matcher
+        self.watches = []
+        for rel in rels:
+            full = os.path.join(mc, rel)
+            if os.path.isdir(full):
+                self._watch(full, rel, True, None)
+            elif os.path.isfile(full):   # a selected single file: its folder, that name only
+                parent = os.path.dirname(rel)
+                self._watch(os.path.dirname(full), parent, False, os.path.basename(rel))
+
+    def _watch(self, path: str, arc: str, recursive: bool, only: Optional[str]):
+        h = win32file.CreateFile(
+            path, 0x0001,   # FILE_LIST_DIRECTORY
+            win32file.FILE_SHARE_READ | win32file.FILE_SHARE_WRITE | win32file.FILE_SHARE_DELETE,
+            None, win32file.OPEN_EXISTING,
+            win32file.FILE_FLAG_BACKUP_SEMANTICS | win32file.FILE_FLAG_OVERLAPPED, None)
+        ov = pywintypes.OVERLAPPED()
+        ov.hEvent = win32event.CreateEvent(None, True, False, None)
+        w = {"h": h, "ov": ov, "buf": win32file.AllocateReadBuffer(_NOTIFY_BUFFER),
+             "arc": arc, "recursive": recursive, "only": only}
+        self._arm(w)
+        self.watches.append(w)
+
+    def _arm(self, w):
+        win32event.ResetEvent(w["ov"].hEvent)
+        win32file.ReadDirectoryChangesW(w["h"], w["buf"], w["recursive"], self.FLAGS, w["ov"])
+
+    def poll(self) -> List[str]:
+        changed: Set[str] = set()
+        for w in self.watches:
+            if win32event.WaitForSingleObject(w["ov"].hEvent, 0) != win32event.WAIT_OBJECT_0:
+                continue
+            n = win32file.GetOverlappedResult(w["h"], w["ov"], True)
+            if not n:   # the buffer overflowed: re-check the whole folder
+                changed.add(w["arc"] if not w["only"] else f"{w['arc']}/{w['only']}".lstrip("/"))
+            else:
+                for _action, name in win32file.FILE_NOTIFY_INFORMATION(w["buf"], n):
+                    name = name.replace("\\", "/")
+                    if w["only"] and name != w["only"]:
+                        continue
+                    arc = f"{w['arc']}/{name}".lstrip("/")
+                    if self.matcher.allows_path(arc):   # excluded junk never triggers a rebuild
+                        changed.add(arc)
+            self._arm(w)
+        return sorted(changed)
+
+    def close(self):
+        for w in self.watches:
+            try:
+                win32file.CancelIo(w["h"])
+                w["h"].Close()
+                w["ov"].hEvent.Close()
+            except Exception:
+                pass
+        self.watches = []
+
+
+def watcher(mc: str, rels: List[str], matcher: rules.Matcher):
+    """Change notifications where available, else the folder poller. Call .poll() for changed arcs."""
+    if win32file is not None and sys.platform == "win32":
+        try:
+            return _Notifier(mc, rels, matcher)
+        except Exception:
+            pass
+    return _FolderPoller(mc, rels, matcher)
+
+
+def run(
+    include: Iterable[str],
+    out_dir: str,
+    log: Callable[[str], None],
+    cancelled: Callable[[], bool],
+    after_build: Optional[Callable[["packer.BuildResult"], None]] = None,
+    mc: Optional[str] = None,
+    interval: Optional[float] = None,
+    quiet: Optional[float] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """
+    Watch until cancelled() is true. Builds once first if out_dir holds no pack, then
+    after every burst of changes; after_build(result) runs after each build (e.g. publish).
+    A failed build is logged and watching goes on. Returns the number of builds.
+    """
+    s = load_settings()
+    mc = mc or s.get("minecraft_path") or ""
+    interval = float(s.get("watch_interval_seconds", 1.0)) if interval is None else interval
+    quiet = float(s.get("watch_quiet_seconds", 3.0)) if quiet is None else quiet
+    rels = packer.select(include)
+    matcher = rules.compile(s.get("pack_rules"))   # excluded junk (logs, caches) never triggers a rebuild
+    source = watcher(mc, rels, matcher)
+    how = "change notifications" if isinstance(source, _Notifier) else "folder polling"
+    log(f"[WATCH] watching {len(rels)} path(s) ({how}); rebuild after {quiet:g}s of quiet")
+    dirty_since = None if packer.has_index(out_dir) else time.monotonic() - quiet
+    pending: Set[str] = set()
+    incremental = False   # the first build of a session walks the selection once
+    builds = 0
+    try:
+        while not cancelled():
+            if dirty_since is not None and time.monotonic() - dirty_since >= quiet:
+                dirty_since = None
+                try:
+                    res = packer.build(include, out_dir, mc=mc, log=log, cancelled=cancelled,
+                                       changed=sorted(pending) if incremental else None)
+                    pending.clear()
+                    incremental = True
+                    builds += 1
+                    if after_build:
+                        after_build(res)
+                except Exception as ex:
+                    if cancelled():
+                        break
+                    log(f"[WATCH] rebuild failed: {ex}")
+                continue
+            sleep(interval)
+            changed = source.poll()
+            if changed:
+                more = f" (+{len(changed) - 3} more)" if len(changed) > 3 else ""
+                log(f"[WATCH] {len(changed)} change(s): {', '.join(changed[:3])}{more}")
+                pending.update(changed)
+                dirty_since = time.monotonic()
+    finally:
+        source.close()
+    log(f"[WATCH] stopped after {builds} rebuild(s)")
+    return builds
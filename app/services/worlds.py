@@ -0,0 +1,179 @@
+#app\services\worlds.py
+"""
+Incremental world-save backups.
+
+Each backup run stores only the files under saves/ that changed since the
+previous run (size/mtime first, sha256 when those moved) in one archive
+(<store>/<id>.zip, see archive.py). chain.json lists every increment with the
+full file list at that point, and for each file the increment whose archive
+holds its content, so any point in time restores directly without replaying
+the chain.
+
+Retention merges the oldest increment into the next one: the files that are
+still needed are repacked into the survivor and the old archive is deleted.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from . import archive, hashing, timing
+from .config import load_settings
+
+CHAIN_FILE = "chain.json"
+SAVES = "saves"
+
+
+def store_dir() -> str:
+    s = load_settings()
+    base = (s.get("world_backup_dir") or "").strip() or str(Path.home() / "Documents" / "mc-manager-backups")
+    d = os.path.join(base, "worlds")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+def load_chain(store: str) -> List[Dict]:
+    try:
+        with open(os.path.join(store, CHAIN_FILE), "r", encoding="utf-8") as f:
+            return list(json.load(f).get("increments", []))
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def _save_chain(store: str, chain: List[Dict]):
+    p = os.path.join(store, CHAIN_FILE)
+    with open(p + ".part", "w", encoding="utf-8") as f:
+        json.dump({"increments": chain}, f, separators=(",", ":"))
+    os.replace(p + ".part", p)
+
+
+def _archive(store: str, inc_id: str) -> str:
+    return os.path.join(store, f"{inc_id}.zip")
+
+
+def backup(mc: str, log: Callable[[str], None], store: Optional[str] = None,
+           keep: Optional[int] = None) -> Optional[Dict]:
+    """
+    Add an increment for <mc>/saves. Returns the new chain entry, or None when nothing
+    changed since the last one. Applies retention (settings "world_backup_keep") after.
+    """
+    store = store or store_dir()
+    os.makedirs(store, exist_ok=True)
+    chain = load_chain(store)
+    prev: Dict[str, List] = chain[-1]["files"] if chain else {}
+    inc_id = time.strftime("%Y%m%d_%H%M%S")
+    if chain and chain[-1]["id"] >= inc_id:
+        inc_id = f"{chain[-1]['id']}_1"
+
+    files: Dict[str, List] = {}
+    stale: Dict[str, tuple] = {}
+    with timing.span("world_scan") as sp:
+        for base, _, names in os.walk(os.path.join(mc, SAVES)):
+            for n in names:
+                full = os.path.join(base, n)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                rel = os.path.relpath(full, mc).replace("\\", "/")
+                p = prev.get(rel)
+                if p and p[0] == st.st_size and p[1] == st.st_mtime_ns:
+                    files[rel] = p
+                else:
+                    stale[full] = (rel, st)
+                sp.add(files=1)
+    changed = []
+    for full, sha in hashing.hash_files(list(stale)).items():
+        rel, st = stale[full]
+        p = prev.get(rel)
+        if p and p[2] == sha:  # touched but identical: keep pointing at the old copy
+            files[rel] = [st.st_size, st.st_mtime_ns, sha, p[3]]
+        else:
+            files[rel] = [st.st_size, st.st_mtime_ns, sha, inc_id]
+            changed.append((full, rel))
+
+    removed = len(set(prev) - set(files))
+    if chain and not changed and not removed:
+        log("[WORLDS] no changes since the last backup")
+        return None
+
+    stats = archive.write_archive(_archive(store, inc_id), changed)
+    entry = {"id": inc_id, "created": time.time(), "files": files,
+             "stored": stats["files"], "bytes": stats["compressed"]}
+    chain.append(entry)
+    _save_chain(store, chain)
+    log(f"[WORLDS] {inc_id}: {len(changed)} changed, {removed} removed, "
+        f"{len(files) - len(changed)} unchanged ({stats['compressed'] / 1e6:.1f} MB stored)")
+
+    keep = int(load_settings().get("world_backup_keep", 10)) if keep is None else keep
+    if keep:
+        merge_old(store, keep, log)
+    return entry
+
+
+def restore(store: str, inc_id: str, dst_root: str, log: Callable[[str], None],
+            rels: Optional[List[str]] = None) -> int:
+    """Recreate the saves/ tree as of increment `inc_id` (or just `rels` from it) under dst_root."""
+    entry = next((e for e in load_chain(store) if e["id"] == inc_id), None)
+    if entry is None:
+        raise RuntimeError(f"No world backup {inc_id}")
+    want = entry["files"] if rels is None else {r: entry["files"][r] for r in rels if r in entry["files"]}
+    by_archive: Dict[str, List[str]] = {}
+    for rel, meta in want.items():
+        by_archive.setdefault(meta[3], []).append(rel)
+    n = 0
+    with timing.span("world_restore") as sp:
+        for src_id, names in by_archive.items():
+            with zipfile.ZipFile(_archive(store, src_id)) as z:
+                for name in names:
+                    z.extract(name, dst_root)
+                    os.utime(os.path.join(dst_root, name), ns=(want[name][1], want[name][1]))
+                    n += 1
+                    sp.add(bytes=want[name][0], files=1)
+    log(f"[WORLDS] restored {n} file(s) from {inc_id}")
+    return n
+
+
+def merge_old(store: str, keep: int, log: Callable[[str], None]) -> int:
+    """Fold the oldest increments into their successors until at most `keep` remain."""
+    chain = load_chain(store)
+    merged = 0
+    while len(chain) > max(1, keep):
+        first, second = chain[0], chain[1]
+        # Later increments only reference first's files through second (every entry
+        # lists the full tree), so second's own list says what must survive.
+        moved = {rel for rel, meta in second["files"].items() if meta[3] == first["id"]}
+        if moved:
+            tmp = tempfile.mkdtemp(prefix="mcman_merge_")
+            try:
+                with zipfile.ZipFile(_archive(store, first["id"])) as z:
+                    for rel in moved:
+                        z.extract(rel, tmp)
+                mine = [rel for rel, meta in second["files"].items() if meta[3] == second["id"]]
+                if mine:
+                    with zipfile.ZipFile(_archive(store, second["id"])) as z:
+                        for rel in mine:
+                            z.extract(rel, tmp)
+                stats = archive.write_archive(_archive(store, second["id"]),
+                                              [(os.path.join(tmp, r), r) for r in sorted(moved) + mine])
+                second["stored"], second["bytes"] = stats["files"], stats["compressed"]
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+            for e in chain[1:]:
+                for meta in e["files"].values():
+                    if meta[3] == first["id"]:
+                        meta[3] = second["id"]
+        chain.pop(0)
+        _save_chain(store, chain)
+        try:
+            os.remove(_archive(store, first["id"]))
+        except OSError:
+            pass
+        merged += 1
+        log(f"[WORLDS] merged {first['id']} into {second['id']}")
+    return merged
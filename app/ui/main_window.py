@@ -1,14 +1,15 @@
+import contextlib
 import os
+import shutil
 import sys
-import tempfile
-import zipfile
+import time
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QLabel, QTextEdit, QProgressBar, QLineEdit, QSpinBox, QCheckBox, QTreeWidget, QTreeWidgetItem,
-    QMessageBox, QComboBox,
+    QMessageBox, QComboBox, QPlainTextEdit,
 )
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QThread, QTimer
 
 # No tri-state: only Checked/Unchecked
 TRI_STATE = None
@@ -19,13 +20,17 @@ from ..services.config import (
     set_pat, get_include_selection, set_include_selection,
     pat_store_location, settings_store_location,
 )
-from ..services.github_api import get_latest_manifest, download_asset, sha256_file, publish_pack
-from ..services.minecraft import apply_manifest, build_pack, backups_dir
+from ..services.cache import cleanup_temp_dirs
+from ..services.transaction import stage_root
 from ..services.threading_worker import run_in_thread
+from ..services import telemetry, timing
+# Everything that pulls in requests, zipfile or the pack engine (github_api, minecraft,
+# updater, verify, watch, worlds, mirror, prefetch, throttle) is imported where it is
+# used, so none of it is loaded before the window has painted.
 
 # Palette
 PALE_FOREST   = "#8FBC8F"  # user tab "Update"
-MUTED_RED     = "#b87979"  # user tab "Cancel"
+MUTED_RED     = "#b87979"  # "Cancel" (user and admin tabs)
 
 # Admin muted colors
 MUTED_BLUE    = "#6c8ebf"  # Build
@@ -41,9 +46,20 @@ def _btn_style(bg_hex: str, fg_hex: str = "white"):
     )
 
 
+# (key, label); only the start tab is built up front, the others on first use
+_TABS = (("user", "User"), ("admin", "Admin"), ("settings", "Settings"))
+
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, started: float | None = None, on_ready=None):
+        """
+        `started`: time.perf_counter() at process start; the time to the first paint is
+        recorded as a "startup" span. `on_ready(window)` replaces the startup actions
+        (used by --startup-time).
+        """
         super().__init__()
+        self._started, self._on_ready = started, on_ready
+        self.startup_seconds: float | None = None
         self.setWindowTitle("Minecraft Manager")
         self.resize(980, 660)
         self.s = load_settings()
@@ -56,31 +72,131 @@ class MainWindow(QMainWindow):
         self._publish_worker = None
         self._publish_thread = None
         self._last_pack = None  # (zip_path, manifest_path)
+        self._prune_thread = None
+        self._prune_worker = None
+        self._prune_again = False   # a full cleanup was asked for while a purge was running
+        self._quitting = False
+        self._worlds_thread = None
+        self._worlds_worker = None
+        self._watch_thread = None
+        self._watch_worker = None
 
         # ---- tiny action queue for startup automation ----
         # actions: "user_update", "admin_build", "admin_publish", "close"
         self._action_queue: list[str] = []
         self._current_action: str | None = None
 
+        # placeholders; the start tab is built now, the others when first shown
+        # (the Admin tab walks all of .minecraft for its tree)
+        self._built: set[str] = set()
+        self._admin_pending: list[str] = []
         tabs = QTabWidget()
-        tabs.addTab(self._user_tab(), "User")
-        tabs.addTab(self._admin_tab(), "Admin")
-        tabs.addTab(self._settings_tab(), "Settings")
+        for _, label in _TABS:
+            tabs.addTab(QWidget(), label)
 
         # remember tabs and honor preferred start screen
         self.tabs = tabs
-        start = str(self.s.get("start_tab", "user")).lower()
+        start = "admin" if str(self.s.get("start_tab", "user")).lower() == "admin" else "user"
         self.tabs.setCurrentIndex(1 if start == "admin" else 0)
+        self._ensure_tab(start)
+        tabs.currentChanged.connect(lambda i: self._ensure_tab(_TABS[i][0]))
 
         self.setCentralWidget(tabs)
 
+        # optional LAN mirror serving this machine's built/published packs (started after the first paint)
+        self._mirror = None
+        self._first_shown = False
+
+    def _ensure_tab(self, key: str):
+        """Build a tab the first time it is needed (shown, or used by an automatic action)."""
+        if key in self._built:
+            return
+        self._built.add(key)
+        i = next(n for n, (k, _) in enumerate(_TABS) if k == key)
+        with timing.span("ui_tab", tab=key):
+            w = getattr(self, f"_{key}_tab")()
+        cur = self.tabs.currentIndex()
+        self.tabs.blockSignals(True)
+        old = self.tabs.widget(i)
+        self.tabs.removeTab(i)
+        self.tabs.insertTab(i, w, _TABS[i][1])
+        self.tabs.setCurrentIndex(cur)
+        self.tabs.blockSignals(False)
+        old.deleteLater()
+        if key == "admin":
+            for msg in self._admin_pending:
+                self.adminLog.append(msg)
+            self._admin_pending.clear()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._first_shown:
+            self._first_shown = True
+            QTimer.singleShot(0, self._after_first_paint)
+
+    def _after_first_paint(self):
+        """Runs on the first event-loop turn after the window is shown; deferred startup work goes here."""
+        if self._started is not None:
+            self.startup_seconds = time.perf_counter() - self._started
+            timing.record("startup", self.startup_seconds, tab=_TABS[self.tabs.currentIndex()][0])
+        if self._on_ready:
+            self._on_ready(self)
+            return
+        self._restart_mirror()
+        QApplication.instance().aboutToQuit.connect(self._stop_background_threads)
+        self._cleanup_backups_later(purge_only=True)  # backups pruned by the last auto-closed update
         # build & run startup queue after UI is ready
         QTimer.singleShot(250, self._schedule_startup_actions)
 
+    def _admin_log(self, msg: str):
+        """Admin log line that may arrive before the Admin tab exists (kept until it is built)."""
+        if "admin" in self._built:
+            self.adminLog.append(msg)
+        else:
+            self._admin_pending.append(msg)
+
+    def _restart_mirror(self):
+        from ..services.mirror import MirrorServer
+
+        if self._mirror:
+            self._mirror.stop()
+            self._mirror = None
+        if not bool(self.s.get("mirror_serve", False)):
+            return
+        try:
+            self._mirror = MirrorServer(
+                [self._out_dir()], port=int(self.s.get("mirror_port", 8765)), serve_cache=True,
+            ).start()
+            self._admin_log(f"[MIRROR] Serving packs on port {self._mirror.port}")
+        except OSError as e:
+            self._admin_log(f"[MIRROR] Could not start: {e}")
+
     # ---------------- Action queue ----------------
     def _schedule_startup_actions(self):
+        from ..services.minecraft import extra_instances, recover_pending
+
         self._action_queue.clear()
 
+        # finish/undo an apply that a crash or power loss interrupted last time
+        try:
+            recover_pending(self._append_log)
+        except Exception as e:
+            self._append_log(f"[RECOVER] failed: {e}")
+        # temp/extract folders orphaned by killed or crashed runs
+        try:
+            mc = self.s.get("minecraft_path") or ""
+            stage = [stage_root(m) for m in [mc] + extra_instances(self.s) if os.path.isdir(m)]
+            cleanup_temp_dirs(stage, log=self._append_log)
+        except Exception as e:
+            self._append_log(f"[CLEANUP] failed: {e}")
+
+        # opt-in usage counters: at most one snapshot a day, uploaded off the UI thread
+        try:
+            if telemetry.get().flush_due():
+                telemetry.get().flush()
+        except Exception as e:
+            self._append_log(f"[TELEMETRY] {e}")
+
         if bool(self.s.get("auto_update", False)):
             self._action_queue.append("user_update")
         else:
@@ -153,66 +269,233 @@ class MainWindow(QMainWindow):
         v.addWidget(self.log, 1)
 
         hb = QHBoxLayout()
+        self.btnVerify = QPushButton("Verify && Repair")
+        self.btnVerify.setToolTip("Check .minecraft against the pack and restore only missing or modified files")
+        self.btnVerify.clicked.connect(self._user_verify)
+        hb.addWidget(self.btnVerify)
+        self.btnWorlds = QPushButton("Back Up Worlds")
+        self.btnWorlds.setToolTip("Incremental backup of saves/ (only changed files are stored)")
+        self.btnWorlds.clicked.connect(self._user_backup_worlds)
+        hb.addWidget(self.btnWorlds)
+        self.btnRollback = QPushButton("Rollback Last Update")
+        self.btnRollback.clicked.connect(self._user_rollback)
         btnOpenBackups = QPushButton("Open Backups Folder")
-        btnOpenBackups.clicked.connect(lambda: os.startfile(backups_dir()))
-        hb.addStretch(1); hb.addWidget(btnOpenBackups)
+        btnOpenBackups.clicked.connect(self._user_open_backups)
+        hb.addStretch(1); hb.addWidget(self.btnRollback); hb.addWidget(btnOpenBackups)
         v.addLayout(hb)
         return w
 
-    def _append_log(self, msg: str): self.log.append(msg)
+    def _set_user_busy(self, busy: bool):
+        """One user action at a time: Update, Verify and Rollback wait while Cancel is live."""
+        for b in (self.btnUpdate, self.btnVerify, self.btnRollback):
+            b.setEnabled(not busy)
+        self.btnCancel.setEnabled(busy)
+
+    def _append_log(self, msg: str):
+        self._ensure_tab("user")
+        self.log.append(msg)
+
+    def _user_open_backups(self):
+        from ..services.minecraft import backups_dir
+        os.startfile(backups_dir())
+
+    def _user_rollback(self):
+        from ..services.minecraft import rollback_last_update
+
+        reply = QMessageBox.question(
+            self, "Confirm Rollback", "Restore .minecraft to the state before the last update?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            ver = rollback_last_update(self._append_log)
+        except Exception as e:
+            self._append_log(f"[ERROR] {e}"); return
+        self.s = load_settings()
+        self.lblLocal.setText(f"Local: {ver or '(unknown)'}")
+        self._append_log("Rollback Complete!")
+        telemetry.track("rollback")
+        self._cleanup_backups_later()
+
+    def _user_verify(self):
+        from ..services.transaction import busy
+        from ..services.verify import manifest_to_check, repair, verify
+
+        self.log.clear()
+        mc = self.s.get("minecraft_path") or ""
+
+        def job(progress=None, log=None, cancelled=None):
+            with timing.run("verify", log=log), busy(mc, log, cancelled=cancelled):
+                mani, can_repair = manifest_to_check(mc, log, progress)
+                report = verify(mc, mani, log)
+                repaired = can_repair and bool(report["missing"] or report["modified"])
+                if repaired:
+                    repair(mc, mani, report, log, progress)
+            return report, repaired
+
+        th, worker = run_in_thread(job)
+        self._task, self._worker = th, worker
+        self._set_user_busy(True)
+        worker.message.connect(self._append_log)
+        worker.progressed.connect(lambda p: self.progress.setValue(int(p*100)))
+        worker.failed.connect(lambda e: (self._append_log(f"[ERROR] {e}"), self._set_user_busy(False)))
+
+        def done(result):
+            if result is not None:
+                report, repaired = result
+                telemetry.track("verify")
+                broken = len(report["missing"]) + len(report["modified"])
+                if repaired:
+                    self._append_log(f"Verify Complete! {broken} file(s) repaired.")
+                    self._cleanup_backups_later()
+                elif broken:
+                    self._append_log(f"Verify Complete! {broken} file(s) differ; not repaired (see above).")
+                else:
+                    self._append_log("Verify Complete! All files OK.")
+            self._set_user_busy(False)
+            self.progress.setValue(0)
+
+        worker.finished.connect(done)
+        th.finished.connect(lambda: th.deleteLater())
+        th.start()
+
+    def _user_backup_worlds(self):
+        mc = self.s.get("minecraft_path") or ""
+
+        from ..services import worlds
+
+        def job(progress=None, log=None, cancelled=None):
+            telemetry.track("worlds_backup")
+            with timing.run("worlds", log=log):
+                return worlds.backup(mc, log)
+
+        th, worker = run_in_thread(job)
+        self._worlds_thread, self._worlds_worker = th, worker
+        self.btnWorlds.setEnabled(False)
+        worker.message.connect(self._append_log)
+        worker.failed.connect(lambda e: self._append_log(f"[ERROR] {e}"))
+        worker.finished.connect(th.quit)
+        worker.failed.connect(th.quit)
+        th.finished.connect(lambda: self.btnWorlds.setEnabled(True))
+        th.start(QThread.LowPriority)
+
+    def _cleanup_backups_later(self, purge_only: bool = False):
+        """Prune/delete old backups on a lowest-priority thread so the update is never held up."""
+        from ..services.minecraft import cleanup_backups, purge_pruned_backups
+
+        if self._prune_thread is not None:
+            self._prune_again = self._prune_again or not purge_only
+            return
+        if self._quitting:
+            return
+        th, worker = run_in_thread(purge_pruned_backups if purge_only else cleanup_backups)
+        self._prune_thread, self._prune_worker = th, worker
+        worker.message.connect(self._append_log)
+        worker.failed.connect(lambda e: self._append_log(f"[PRUNE] failed: {e}"))
+        worker.finished.connect(th.quit)
+        worker.failed.connect(th.quit)
+
+        def gone():
+            self._prune_thread = self._prune_worker = None
+            th.deleteLater()
+            if self._prune_again:
+                self._prune_again = False
+                self._cleanup_backups_later()
+
+        th.finished.connect(gone)
+        th.start(QThread.LowestPriority)
+
+    def closeEvent(self, event):
+        self._stop_background_threads()
+        super().closeEvent(event)
+
+    def _stop_background_threads(self):
+        """Cancel and join the watch loop and the backup purge so Qt never tears down a running thread."""
+        self._quitting = True
+        for worker, th in ((self._watch_worker, self._watch_thread), (self._prune_worker, self._prune_thread)):
+            if worker:
+                worker.cancel()
+                th.wait(5000)
+
     def _cancel_task(self):
         if self._worker: self._worker.cancel()
+        if self._build_worker: self._build_worker.cancel()
 
     def _user_update_latest(self):
+        from ..services import prefetch, throttle
+        from ..services.github_api import get_latest_manifest
+        from ..services.minecraft import apply_manifest, is_up_to_date
+        from ..services.transaction import busy
+        from ..services.updater import prepare_update
+
+        self._ensure_tab("user")   # may run from the startup queue with the Admin tab in front
         self.log.clear()
         dry = bool(self.s.get("dry_run", False))
+        # started by Automatic Update Mode: stay out of the way of whatever the player is doing
+        background = self._current_action == "user_update"
 
         def job(progress=None, log=None, cancelled=None):
-            mani = get_latest_manifest(progress, log)
-            ver = mani.get("version") or "(missing)"
-            log(f"[MANIFEST] version {ver}")
-            self.lblLatest.setText(f"Latest: {ver}")
-
-            tmp = tempfile.mkdtemp(prefix="mcman_")
-            asset = mani.get("asset", "minecraft-pack.zip")
-            log(f"[DOWNLOAD] {asset}")
-            zpath = download_asset(asset, tmp, progress, log)
-
-            sha = sha256_file(zpath)
-            if sha.lower() != str(mani.get("sha256", "")).lower():
-                raise RuntimeError(f"SHA256 mismatch; expected {mani.get('sha256')}, got {sha}")
-            log("[SHA256] OK")
-
-            ex = os.path.join(tmp, "extracted")
-            with zipfile.ZipFile(zpath) as z:
-                z.extractall(ex)
-
-            apply_manifest(ex, mani, dry_run=dry, log=log)
+            mc = self.s["minecraft_path"]
+            with timing.run("update", log=log), busy(mc, log, cancelled=cancelled), \
+                    (throttle.background(log, self.s) if background else contextlib.nullcontext()):
+                try:
+                    with timing.span("manifest"):
+                        mani = get_latest_manifest(progress, log)
+                except OSError:  # offline: a stage from --prefetch can still be applied
+                    mani = None if dry else prefetch.staged_manifest(mc)
+                    if mani is None:
+                        raise
+                    log("[PREFETCH] GitHub unreachable; applying the staged update")
+                ver = mani.get("version") or "(missing)"
+                log(f"[MANIFEST] version {ver}")
+                self.lblLatest.setText(f"Latest: {ver}")
+                if not dry and is_up_to_date(mani, log):
+                    log("[UP TO DATE] local files already match this version; nothing to download")
+                    return mani
+
+                ex = (None if dry else prefetch.take(mc, mani, log)) or prepare_update(
+                    mani, mc, self.s.get("last_applied_version", ""), log, progress,
+                )
+                try:
+                    apply_manifest(ex, mani, dry_run=dry, log=log)
+                finally:
+                    shutil.rmtree(ex, ignore_errors=True)
             return mani
 
         th, worker = run_in_thread(job)
         self._task, self._worker = th, worker
         worker.message.connect(self._append_log)
         worker.progressed.connect(lambda p: self.progress.setValue(int(p*100)))
-        worker.failed.connect(lambda e: (self._append_log(f"[ERROR] {e}"), self._action_done(False)))
-        worker.started.connect(lambda: self.btnCancel.setEnabled(True))
+        self._set_user_busy(True)
+        worker.failed.connect(lambda e: (self._append_log(f"[ERROR] {e}"), self._set_user_busy(False),
+                                         self._action_done(False)))
 
         def done(mani):
             if mani and not dry:
                 self.s = load_settings()
                 self.lblLocal.setText(f"Local: {self.s.get('last_applied_version') or '(unknown)'}")
                 self._append_log("Update Complete!")
+                telemetry.track("update")
                 if bool(self.s.get("auto_close", False)) and not self._action_queue:
+                    # prune now (renames only); deleting the trash is left to the next start
+                    from ..services.minecraft import cleanup_backups
+                    try:
+                        cleanup_backups(self._append_log, purge=False)
+                    except Exception as e:
+                        self._append_log(f"[PRUNE] failed: {e}")
                     self._append_log("[Info] Auto Close enabled — exiting…")
                     QTimer.singleShot(1200, QApplication.instance().quit)
+                else:
+                    self._cleanup_backups_later()
                 if self._current_action == "user_update":
                     self._action_done(True)
-            self.btnCancel.setEnabled(False)
+            self._set_user_busy(False)
             self.progress.setValue(0)
 
         worker.finished.connect(done)
         th.finished.connect(lambda: th.deleteLater())
-        th.start()
+        th.start(QThread.LowPriority if background else QThread.InheritPriority)
 
     # ========================= ADMIN =========================
     def _admin_tab(self):
@@ -232,26 +515,41 @@ class MainWindow(QMainWindow):
         self.btnPublish = QPushButton("Publish to GitHub Release")
         self.btnSaveSel = QPushButton("Save Selection")
         self.btnResetSel= QPushButton("Reset Pack")
+        self.btnAdminCancel = QPushButton("Cancel")
 
         # Styles
         self.btnBuild.setStyleSheet(_btn_style(MUTED_BLUE))
         self.btnPublish.setStyleSheet(_btn_style(MUTED_PURPLE))
         self.btnSaveSel.setStyleSheet(_btn_style(MUTED_GREEN))
         self.btnResetSel.setStyleSheet(_btn_style(MUTED_ORANGE))
+        self.btnAdminCancel.setStyleSheet(_btn_style(MUTED_RED))
+        self.btnAdminCancel.setEnabled(False)  # only while a build runs
 
         # Wiring
         self.btnBuild.clicked.connect(self._admin_build_pack)
         self.btnPublish.clicked.connect(self._admin_publish)
         self.btnSaveSel.clicked.connect(self._admin_save_selection)
         self.btnResetSel.clicked.connect(self._admin_reset_selection)
+        self.btnAdminCancel.clicked.connect(self._admin_cancel_build)
 
         # Add in requested order
         row2.addWidget(self.btnBuild)
         row2.addWidget(self.btnPublish)
         row2.addWidget(self.btnSaveSel)
         row2.addWidget(self.btnResetSel)
+        row2.addWidget(self.btnAdminCancel)
         v.addLayout(row2)
 
+        # Watch mode: rebuild (incrementally) a few seconds after the selection stops changing
+        rowWatch = QHBoxLayout()
+        self.cbWatch = QCheckBox("Watch && rebuild on change")
+        self.cbWatchPublish = QCheckBox("publish each rebuild")
+        self.cbWatchPublish.setChecked(bool(self.s.get("watch_publish", False)))
+        self.cbWatch.toggled.connect(self._admin_watch_toggled)
+        self.cbWatchPublish.toggled.connect(self._admin_watch_publish_toggled)
+        rowWatch.addWidget(self.cbWatch); rowWatch.addWidget(self.cbWatchPublish); rowWatch.addStretch(1)
+        v.addLayout(rowWatch)
+
         # Shared progress bar
         self.adminProgress = QProgressBar(); self.adminProgress.setValue(0)
         v.addWidget(self.adminProgress)
@@ -386,6 +684,9 @@ class MainWindow(QMainWindow):
         self.adminLog.append("[OK] Selection reset (all unchecked).")
 
     def _admin_build_pack(self):
+        from ..services.minecraft import build_pack
+
+        self._ensure_tab("admin")
         include = self._selected_paths()
         if not include:
             self.adminLog.append("[WARN] Nothing selected."); return
@@ -410,17 +711,19 @@ class MainWindow(QMainWindow):
             log(f"[START] Building pack to: {out_dir}")
             log(f"[INFO] Items selected: {len(include)}")
             if progress: progress(0.05)
-            z, mani, meta = build_pack(include, out_dir, log, progress)
+            z, mani, meta = build_pack(include, out_dir, log, progress, cancelled)
             self._last_pack = (z, mani)
             if progress: progress(0.98)
             log(f"[DONE] Pack: {z}")
             log(f"[DONE] Manifest: {mani} (sha256 {meta['sha256']})")
+            telemetry.track("build")
             if progress: progress(1.0)
             return True
 
         th, worker = run_in_thread(job)
         self._build_thread, self._build_worker = th, worker
 
+        worker.started.connect(lambda: self.btnAdminCancel.setEnabled(True))
         worker.message.connect(lambda s: self.adminLog.append(s))
         worker.progressed.connect(self._admin_progress)
         worker.failed.connect(lambda e: self._admin_build_cleanup(error=str(e)))
@@ -428,6 +731,62 @@ class MainWindow(QMainWindow):
         th.finished.connect(lambda: (self._admin_build_cleanup(), th.deleteLater()))
         th.start()
 
+    def _admin_cancel_build(self):
+        if self._build_worker:
+            self._build_worker.cancel()
+            self.btnAdminCancel.setEnabled(False)
+            self.adminLog.append("[UI] Cancelling build...")
+
+    def _admin_watch_publish_toggled(self, on: bool):
+        self.s["watch_publish"] = bool(on)
+        save_settings(self.s)
+
+    def _admin_watch_toggled(self, on: bool):
+        from ..services import watch
+        from ..services.github_api import publish_pack
+
+        if not on:
+            if self._watch_worker:
+                self._watch_worker.cancel()
+            return
+        include = self._selected_paths()
+        if not include:
+            self.adminLog.append("[WARN] Nothing selected.")
+            self.cbWatch.setChecked(False)
+            return
+        out_dir = self._out_dir()
+        self.btnBuild.setEnabled(False)
+        self.btnPublish.setEnabled(False)
+
+        def job(progress=None, log=None, cancelled=None):
+            def after_build(res):
+                self._last_pack = (res.zip_path, res.manifest_path)
+                telemetry.track("build")
+                if self.s.get("watch_publish"):  # read per build, so the box can be flipped while watching
+                    tag = publish_pack(res.manifest_path, res.zip_path, log=log)
+                    log(f"[DONE] Release tag: {tag}")
+                    telemetry.track("publish")
+            return watch.run(include, out_dir, log, cancelled, after_build)
+
+        th, worker = run_in_thread(job)
+        self._watch_thread, self._watch_worker = th, worker
+        worker.message.connect(lambda s: self.adminLog.append(s))
+        worker.failed.connect(lambda e: self.adminLog.append(f"[ERROR] {e}"))
+        worker.finished.connect(th.quit)
+        worker.failed.connect(th.quit)
+
+        def gone():
+            self._watch_thread = self._watch_worker = None
+            self.btnBuild.setEnabled(True)
+            self.btnPublish.setEnabled(True)
+            self.cbWatch.blockSignals(True)
+            self.cbWatch.setChecked(False)
+            self.cbWatch.blockSignals(False)
+            th.deleteLater()
+
+        th.finished.connect(gone)
+        th.start(QThread.LowPriority)
+
     def _admin_progress(self, p: float):
         if self.adminProgress.maximum() == 0:  # switch from busy to determinate
             self.adminProgress.setRange(0, 100)
@@ -439,6 +798,7 @@ class MainWindow(QMainWindow):
         self.btnBuild.setEnabled(True)
         self.btnPublish.setEnabled(True)
         self.btnResetSel.setEnabled(True)
+        self.btnAdminCancel.setEnabled(False)
         self.adminProgress.setRange(0, 100)
         self.adminProgress.setValue(0)
         self._build_thread = None
@@ -449,6 +809,9 @@ class MainWindow(QMainWindow):
             self._action_done(success=(error is None))
 
     def _admin_publish(self):
+        from ..services.github_api import publish_pack
+
+        self._ensure_tab("admin")
         z_m = self._last_pack
         if not z_m:
             z = os.path.join(self._out_dir(), "minecraft-pack.zip")
@@ -487,6 +850,7 @@ class MainWindow(QMainWindow):
             self.adminLog.append(f"[ERROR] {error}")
         else:
             self.adminLog.append("[DONE] Publish Complete.")
+            telemetry.track("publish")
         self.btnPublish.setEnabled(True)
         self.btnBuild.setEnabled(True)
         self.btnResetSel.setEnabled(True)
@@ -512,6 +876,16 @@ class MainWindow(QMainWindow):
         row2.addWidget(self.edPath); row2.addWidget(btnFind)
         v.addLayout(row2)
 
+        v.addWidget(QLabel("Other instances kept in sync (one .minecraft folder per line; mods/libraries are hardlinked, not copied):"))
+        self.edInstances = QPlainTextEdit("\n".join(self.s.get("instances") or []))
+        self.edInstances.setFixedHeight(60)
+        v.addWidget(self.edInstances)
+
+        v.addWidget(QLabel("Pack rules (one per line, -glob excludes, +glob includes, last match wins):"))
+        self.edRules = QPlainTextEdit("\n".join(self.s.get("pack_rules") or []))
+        self.edRules.setFixedHeight(60)
+        v.addWidget(self.edRules)
+
         # NEW: Start screen preference
         rowStart = QHBoxLayout()
         rowStart.addWidget(QLabel("Start screen:"))
@@ -526,6 +900,9 @@ class MainWindow(QMainWindow):
         self.cbDry = QCheckBox("Dry run (preview actions)")
         self.cbDry.setChecked(bool(self.s.get("dry_run", False)))
         v.addWidget(self.cbDry)
+        self.cbTelemetry = QCheckBox("Share anonymous usage counts (one GitHub issue per day)")
+        self.cbTelemetry.setChecked(bool(self.s.get("telemetry_enabled", False)))
+        v.addWidget(self.cbTelemetry)
 
         # Automatic Update Mode (User)
         self.cbAuto = QCheckBox("Automatic Update Mode (run update on startup)")
@@ -545,11 +922,33 @@ class MainWindow(QMainWindow):
         v.addWidget(self.cbAutoBuild)
         v.addWidget(self.cbAutoPublish)
 
+        # --- LAN mirror ---
+        v.addWidget(QLabel("LAN mirror URL (optional, tried before GitHub):"))
+        self.edMirror = QLineEdit(self.s.get("mirror_url", ""))
+        self.edMirror.setPlaceholderText("http://192.168.1.20:8765")
+        v.addWidget(self.edMirror)
+        rowMirror = QHBoxLayout()
+        self.cbMirrorServe = QCheckBox("Serve my packs to the LAN on port")
+        self.cbMirrorServe.setChecked(bool(self.s.get("mirror_serve", False)))
+        self.mirrorPort = QSpinBox(); self.mirrorPort.setRange(1024, 65535)
+        self.mirrorPort.setValue(int(self.s.get("mirror_port", 8765)))
+        self.mirrorPort.setFixedHeight(28); self.mirrorPort.setMinimumWidth(90)
+        rowMirror.addWidget(self.cbMirrorServe); rowMirror.addWidget(self.mirrorPort); rowMirror.addStretch(1)
+        v.addLayout(rowMirror)
+
         row3 = QHBoxLayout()
         row3.addWidget(QLabel("Keep backups (count):"))
         self.keepSpin = QSpinBox(); self.keepSpin.setRange(1,50); self.keepSpin.setValue(int(self.s.get("keep_backups",3)))
         self.keepSpin.setFixedHeight(28); self.keepSpin.setMinimumWidth(90)
-        row3.addWidget(self.keepSpin); row3.addStretch(1)
+        row3.addWidget(self.keepSpin)
+        row3.addWidget(QLabel("max age (days, 0 = off):"))
+        self.ageSpin = QSpinBox(); self.ageSpin.setRange(0, 3650); self.ageSpin.setValue(int(self.s.get("backup_max_age_days", 0)))
+        self.ageSpin.setFixedHeight(28); self.ageSpin.setMinimumWidth(70)
+        row3.addWidget(self.ageSpin)
+        row3.addWidget(QLabel("max total (MB, 0 = off):"))
+        self.sizeSpin = QSpinBox(); self.sizeSpin.setRange(0, 1_000_000); self.sizeSpin.setValue(int(self.s.get("backup_max_total_mb", 0)))
+        self.sizeSpin.setFixedHeight(28); self.sizeSpin.setMinimumWidth(90)
+        row3.addWidget(self.sizeSpin); row3.addStretch(1)
         v.addLayout(row3)
 
         self.edPAT = QLineEdit(); self.edPAT.setPlaceholderText("GitHub PAT"); self.edPAT.setEchoMode(QLineEdit.Password)
@@ -583,7 +982,10 @@ class MainWindow(QMainWindow):
         self.s["repo_owner"]     = self.edOwner.text().strip()
         self.s["repo_name"]      = self.edRepo.text().strip()
         self.s["minecraft_path"] = self.edPath.text().strip()
+        self.s["instances"]      = [p.strip() for p in self.edInstances.toPlainText().splitlines() if p.strip()]
+        self.s["pack_rules"]     = [r.strip() for r in self.edRules.toPlainText().splitlines() if r.strip()]
         self.s["dry_run"]        = self.cbDry.isChecked()
+        self.s["telemetry_enabled"] = self.cbTelemetry.isChecked()
         # User automation
         self.s["auto_update"]    = self.cbAuto.isChecked()
         self.s["auto_close"]     = self.cbAutoClose.isChecked()
@@ -591,12 +993,20 @@ class MainWindow(QMainWindow):
         self.s["auto_build"]     = self.cbAutoBuild.isChecked()
         self.s["auto_publish"]   = self.cbAutoPublish.isChecked()
         self.s["keep_backups"]   = int(self.keepSpin.value())
+        self.s["backup_max_age_days"] = int(self.ageSpin.value())
+        self.s["backup_max_total_mb"] = int(self.sizeSpin.value())
+        # LAN mirror
+        self.s["mirror_url"]     = self.edMirror.text().strip()
+        self.s["mirror_serve"]   = self.cbMirrorServe.isChecked()
+        self.s["mirror_port"]    = int(self.mirrorPort.value())
 
         # NEW: start tab
         self.s["start_tab"] = "admin" if self.startTab.currentText().lower() == "admin" else "user"
 
         save_settings(self.s)
         self._flash_status(f"Saved settings to: {settings_store_location()}")
+        self._restart_mirror()
+        telemetry.get().reload_settings()
 
         # reflect immediately
         if hasattr(self, "tabs"):
@@ -0,0 +1,96 @@
+#bench\hashing.py
+"""
+Micro-benchmark: shared hashing utility vs the previous implementation.
+
+    python -m bench.hashing --mb 512 --files 2000
+
+Times the old `iter(f.read(1 MiB))` loop against readinto/mmap sha256, the crc32
+pre-check, and sequential vs thread-pool hashing of many small files.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from app.services import hashing
+
+
+def legacy_sha256(path: str) -> str:
+    """The pre-hashing.py implementation (fresh bytes object per 1 MiB chunk)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(b)
+    return h.hexdigest()
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.hashing", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--mb", type=int, default=256, help="size of the large file")
+    ap.add_argument("--files", type=int, default=2000, help="number of small files")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", help="write results JSON here")
+    args = ap.parse_args(argv)
+
+    work = tempfile.mkdtemp(prefix="mcman_hashbench_")
+    try:
+        rng = random.Random(42)
+        big = os.path.join(work, "big.zip")
+        with open(big, "wb") as f:
+            for _ in range(args.mb):
+                f.write(rng.randbytes(1024 * 1024))
+        small = []
+        for i in range(args.files):
+            p = os.path.join(work, "small", f"{i % 50}", f"f{i}.toml")
+            os.makedirs(os.path.dirname(p), exist_ok=True)
+            with open(p, "wb") as f:
+                f.write(rng.randbytes(rng.randint(512, 64 * 1024)))
+            small.append(p)
+        small_bytes = sum(os.path.getsize(p) for p in small)
+
+        expect = legacy_sha256(big)
+        assert hashing.sha256_file(big, use_mmap=False) == expect
+        assert hashing.sha256_file(big, use_mmap=True) == expect
+
+        big_bytes = os.path.getsize(big)
+        cases = {
+            "sha256_legacy": (lambda: legacy_sha256(big), big_bytes),
+            "sha256_readinto": (lambda: hashing.sha256_file(big, use_mmap=False), big_bytes),
+            "sha256_mmap": (lambda: hashing.sha256_file(big, use_mmap=True), big_bytes),
+            "crc32_precheck": (lambda: hashing.crc32_file(big), big_bytes),
+            "many_legacy_sequential": (lambda: [legacy_sha256(p) for p in small], small_bytes),
+            "many_hash_files_pool": (lambda: hashing.hash_files(small), small_bytes),
+        }
+        results = {}
+        for name, (fn, nbytes) in cases.items():
+            secs = _best(fn, args.repeat)
+            results[name] = {"best_s": round(secs, 6), "bytes": nbytes, "mb_per_s": round(nbytes / secs / 1e6, 1)}
+            print(f"  {name:<24} {secs:8.3f}s  {nbytes / secs / 1e6:9.1f} MB/s")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"mb": args.mb, "files": args.files, "workers": hashing.default_workers(),
+                       "results": results}, f, indent=2)
+        print(f"[RESULTS] {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#bench\run.py
+"""
+Offline benchmark suite for the pack pipeline.
+
+    python -m bench.run --shape small
+    python -m bench.run --shape medium --repeat 3 --compare bench_results/old.json
+
+Generates a synthetic .minecraft tree, then times build_pack, sha256_file,
+create_backup, download_asset (against a local HTTP stand-in) and apply_manifest.
+Results are written as JSON so runs from different versions can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+
+from app.version import APP_VERSION
+from app.services import config, github_api, minecraft, transaction
+
+from .synth import SHAPES, PACK_PATHS, generate_tree
+from .standin import StandInServer
+
+
+def _quiet(_msg: str):
+    pass
+
+
+def _dir_stats(root: str):
+    files = 0
+    total = 0
+    for base, _, names in os.walk(root):
+        for n in names:
+            files += 1
+            total += os.path.getsize(os.path.join(base, n))
+    return files, total
+
+
+class Bench:
+    def __init__(self, workdir: str, repeat: int):
+        self.workdir = workdir
+        self.repeat = max(1, repeat)
+        self.results = {}
+
+    def use_minecraft(self, path: str, **extra):
+        s = config.load_settings()
+        s["minecraft_path"] = path
+        s.update(extra)
+        config.save_settings(s)
+
+    def time(self, name: str, fn, *, bytes_=0, files=0, setup=None):
+        runs = []
+        out = None
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            t0 = time.perf_counter()
+            out = fn()
+            runs.append(time.perf_counter() - t0)
+        best = min(runs)
+        self.results[name] = {
+            "runs": [round(r, 6) for r in runs],
+            "best_s": round(best, 6),
+            "median_s": round(statistics.median(runs), 6),
+            "bytes": bytes_,
+            "files": files,
+            "mb_per_s": round(bytes_ / best / 1e6, 2) if bytes_ and best else None,
+        }
+        print(f"  {name:<18} best {best:8.3f}s  median {statistics.median(runs):8.3f}s")
+        return out
+
+
+def _isolate_settings(workdir: str):
+    """Point config at a throwaway settings folder so a real install is never touched."""
+    sdir = os.path.join(workdir, "settings")
+    os.makedirs(sdir, exist_ok=True)
+    config.SETTINGS_DIR = sdir
+    config.SETTINGS_FILE = os.path.join(sdir, "settings.json")
+    os.environ.pop("GITHUB_TOKEN", None)
+
+
+def run(shape_name: str, workdir: str, repeat: int) -> dict:
+    shape = SHAPES[shape_name]
+    _isolate_settings(workdir)
+
+    src_mc = os.path.join(workdir, "src", ".minecraft")
+    dst_mc = os.path.join(workdir, "dst", ".minecraft")
+    out_dir = os.path.join(workdir, "out")
+    dl_dir = os.path.join(workdir, "download")
+
+    marker = os.path.join(workdir, "src", "shape.json")
+    if os.path.exists(marker) and json.load(open(marker, encoding="utf-8")) == shape.as_dict():
+        print(f"[TREE] reusing {src_mc}")
+    else:
+        shutil.rmtree(os.path.join(workdir, "src"), ignore_errors=True)
+        print(f"[TREE] generating '{shape_name}' tree in {src_mc}")
+        generate_tree(src_mc, shape)
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump(shape.as_dict(), f)
+
+    files, total = 0, 0
+    for rel in PACK_PATHS:
+        p = os.path.join(src_mc, rel)
+        if os.path.isdir(p):
+            f, b = _dir_stats(p)
+        else:
+            f, b = 1, os.path.getsize(p)
+        files += f
+        total += b
+    print(f"[TREE] {files} file(s), {total / 1e6:.1f} MB selected")
+
+    b = Bench(workdir, repeat)
+    b.use_minecraft(src_mc, keep_backups=1)
+
+    zip_path, mani_path, manifest = b.time(
+        "build_pack",
+        lambda: minecraft.build_pack(PACK_PATHS, out_dir, _quiet),
+        bytes_=total, files=files,
+    )
+    zip_size = os.path.getsize(zip_path)
+
+    b.time("sha256_file", lambda: github_api.sha256_file(zip_path), bytes_=zip_size, files=1)
+
+    def _clear_backups():
+        shutil.rmtree(os.path.join(src_mc, "Backups"), ignore_errors=True)
+
+    b.time(
+        "create_backup",
+        lambda: minecraft.create_backup("bench", PACK_PATHS, _quiet),
+        bytes_=total, files=files, setup=_clear_backups,
+    )
+    _clear_backups()
+
+    with StandInServer(out_dir, owner="bench", repo="pack") as srv:
+        github_api.API_BASE = srv.base_url
+        s = config.load_settings()
+        s["repo_owner"], s["repo_name"] = "bench", "pack"
+        config.save_settings(s)
+
+        def _clear_dl():
+            shutil.rmtree(dl_dir, ignore_errors=True)
+
+        b.time(
+            "download_asset",
+            lambda: github_api.download_asset("minecraft-pack.zip", dl_dir),
+            bytes_=zip_size, files=1, setup=_clear_dl,
+        )
+
+    extract_dir = os.path.join(workdir, "extracted")
+
+    def _clear_extract():
+        shutil.rmtree(extract_dir, ignore_errors=True)
+
+    def _extract():
+        with zipfile.ZipFile(zip_path) as z:
+            z.extractall(extract_dir)
+
+    b.time("extract", _extract, bytes_=total, files=files, setup=_clear_extract)
+
+    # apply consumes its input (staged by rename), so re-extract onto the target volume
+    apply_src = {}
+
+    def _stage_extract():
+        ex = tempfile.mkdtemp(prefix="extract_", dir=transaction.stage_root(dst_mc))
+        with zipfile.ZipFile(zip_path) as z:
+            z.extractall(ex)
+        apply_src["dir"] = ex
+
+    def _fresh_target():
+        shutil.rmtree(os.path.dirname(dst_mc), ignore_errors=True)
+        os.makedirs(dst_mc)
+        _stage_extract()
+
+    def _apply():
+        minecraft.apply_manifest(apply_src["dir"], manifest, dry_run=False, log=_quiet)
+
+    b.use_minecraft(dst_mc, keep_backups=1)
+    b.time("apply_fresh", _apply, bytes_=total, files=files, setup=_fresh_target)
+    # same version again on an already up-to-date install
+    b.time("apply_rerun", _apply, bytes_=total, files=files, setup=_stage_extract)
+
+    return {
+        "app_version": APP_VERSION,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "shape": shape_name,
+        "params": shape.as_dict(),
+        "selected": {"files": files, "bytes": total},
+        "repeat": b.repeat,
+        "results": b.results,
+    }
+
+
+def compare(current: dict, baseline: dict):
+    print()
+    print(f"Compared with {baseline.get('app_version')} ({baseline.get('timestamp')}):")
+    print(f"  {'benchmark':<18} {'before':>10} {'after':>10} {'change':>9}")
+    for name, cur in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"  {name:<18} {'-':>10} {cur['best_s']:>9.3f}s {'new':>9}")
+            continue
+        ratio = (cur["best_s"] / old["best_s"]) if old["best_s"] else float("inf")
+        print(f"  {name:<18} {old['best_s']:>9.3f}s {cur['best_s']:>9.3f}s {(ratio - 1) * 100:>+8.1f}%")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--shape", choices=sorted(SHAPES), default="small")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--workdir", help="reuse a work folder (keeps the generated tree between runs)")
+    ap.add_argument("--out", help="results JSON path (default: bench_results/<version>_<shape>_<stamp>.json)")
+    ap.add_argument("--compare", help="previous results JSON to compare against")
+    args = ap.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="mcman_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        result = run(args.shape, workdir, args.repeat)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = args.out or os.path.join(
+        "bench_results", f"{APP_VERSION}_{args.shape}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"[RESULTS] {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
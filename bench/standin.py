@@ -0,0 +1,64 @@
+#bench\standin.py
+"""
+Tiny local HTTP stand-in for the GitHub release endpoints used by download_asset.
+Serves `/repos/<owner>/<repo>/releases/latest` and the asset files from one folder.
+"""
+
+import json
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, owner: str, repo: str, **kwargs):
+        self._owner = owner
+        self._repo = repo
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):  # keep benchmark output clean
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") == f"/repos/{self._owner}/{self._repo}/releases/latest":
+            host = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+            assets = [
+                {"name": n, "browser_download_url": f"{host}/download/{n}"}
+                for n in sorted(os.listdir(self.directory))
+                if os.path.isfile(os.path.join(self.directory, n))
+            ]
+            body = json.dumps({"tag_name": "bench", "assets": assets}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path.startswith("/download/"):
+            self.path = "/" + self.path[len("/download/"):]
+            return super().do_GET()
+        self.send_error(404)
+
+
+class StandInServer:
+    """Context manager running the stand-in on 127.0.0.1 in a daemon thread."""
+
+    def __init__(self, asset_dir: str, owner: str = "bench", repo: str = "pack"):
+        handler = partial(_Handler, directory=asset_dir, owner=owner, repo=repo)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join(timeout=5)
@@ -0,0 +1,56 @@
+#bench\startup.py
+"""
+GUI startup time: process start to the window's first paint.
+
+    python -m bench.startup --repeat 5
+
+Launches `python -m app.main --startup-time` (which exits right after the first
+paint, without running any startup actions, so your settings and .minecraft
+are only read) and reports the best/median of the times it prints. Each launch
+also lands as a "startup" span in logs/<date>.spans.jsonl.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+_LINE = re.compile(r"\[STARTUP\] (\d+) ms")
+
+
+def measure_once(env=None) -> float:
+    out = subprocess.run(
+        [sys.executable, "-m", "app.main", "--startup-time"],
+        capture_output=True, text=True, timeout=120, env=env,
+    )
+    m = _LINE.search(out.stdout)
+    if not m:
+        raise RuntimeError(f"no startup time reported (exit {out.returncode}): {out.stderr.strip()[-500:]}")
+    return int(m.group(1)) / 1000.0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.startup", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out", help="write results JSON here")
+    args = ap.parse_args(argv)
+
+    env = dict(os.environ)
+    if sys.platform.startswith("linux") and not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    runs = [measure_once(env) for _ in range(max(1, args.repeat))]
+    best, median = min(runs), statistics.median(runs)
+    print(f"  startup            best {best:8.3f}s  median {median:8.3f}s")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs, "best_s": best, "median_s": median}, f, indent=2)
+        print(f"[RESULTS] {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#bench\synth.py
+"""
+Synthetic .minecraft trees shaped like a real modpack:
+thousands of small text configs, hundreds of jars and a few huge resourcepacks.
+Content is deterministic (seeded) so runs are comparable between versions.
+"""
+
+import os
+import random
+from dataclasses import dataclass, asdict
+
+
+@dataclass
+class TreeShape:
+    configs: int = 3000
+    config_bytes: int = 2048
+    jars: int = 300
+    jar_kb: int = 256
+    resourcepacks: int = 3
+    resourcepack_mb: int = 64
+    seed: int = 1234
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+SHAPES = {
+    # quick sanity run (seconds)
+    "small": TreeShape(configs=400, jars=40, jar_kb=128, resourcepacks=1, resourcepack_mb=8),
+    # a typical modded install
+    "medium": TreeShape(),
+    # a heavy pack: big shaders/resourcepacks
+    "large": TreeShape(configs=8000, jars=600, jar_kb=512, resourcepacks=4, resourcepack_mb=256),
+}
+
+_WORDS = [
+    "enabled", "true", "false", "spawnRate", "maxHeight", "biome", "ore", "chance",
+    "renderDistance", "particles", "# comment", "tooltip", "keybind", "volume",
+]
+
+
+def _text(rng: random.Random, size: int) -> bytes:
+    out = []
+    n = 0
+    while n < size:
+        line = f"{rng.choice(_WORDS)}={rng.randint(0, 99999)}\n"
+        out.append(line)
+        n += len(line)
+    return "".join(out).encode("utf-8")[:size]
+
+
+def _write_blob(path: str, rng: random.Random, size: int, chunk: int = 1024 * 1024):
+    # jars/zips are already compressed, so use incompressible bytes
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        left = size
+        while left > 0:
+            n = min(chunk, left)
+            f.write(rng.randbytes(n))
+            left -= n
+
+
+def generate_tree(root: str, shape: TreeShape) -> dict:
+    """Populate `root` with a modpack-shaped tree. Returns file/byte counts."""
+    rng = random.Random(shape.seed)
+    files = 0
+    total = 0
+
+    for i in range(shape.configs):
+        sub = f"config/mod{i % 97:02d}"
+        p = os.path.join(root, sub, f"settings_{i}.toml")
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        data = _text(rng, max(64, int(rng.gauss(shape.config_bytes, shape.config_bytes / 4))))
+        with open(p, "wb") as f:
+            f.write(data)
+        files += 1
+        total += len(data)
+
+    for i in range(shape.jars):
+        size = max(1024, int(rng.uniform(0.25, 1.75) * shape.jar_kb * 1024))
+        _write_blob(os.path.join(root, "mods", f"mod-{i:04d}-1.0.jar"), rng, size)
+        files += 1
+        total += size
+
+    for i in range(shape.resourcepacks):
+        size = shape.resourcepack_mb * 1024 * 1024
+        _write_blob(os.path.join(root, "resourcepacks", f"pack-{i}.zip"), rng, size)
+        files += 1
+        total += size
+
+    for name in ("options.txt", "servers.dat"):
+        data = _text(rng, 4096)
+        with open(os.path.join(root, name), "wb") as f:
+            f.write(data)
+        files += 1
+        total += len(data)
+
+    # protected folders that must never be packed or touched
+    os.makedirs(os.path.join(root, "saves", "World1", "region"), exist_ok=True)
+    _write_blob(os.path.join(root, "saves", "World1", "region", "r.0.0.mca"), rng, 256 * 1024)
+
+    return {"files": files, "bytes": total}
+
+
+PACK_PATHS = ["config", "mods", "resourcepacks", "options.txt", "servers.dat"]
@@ -0,0 +1,12 @@
+import pytest
+from app.services import config
+
+
+@pytest.fixture(autouse=True)
+def _isolated_settings(tmp_path, monkeypatch):
+    """Keep settings.json, logs and span files out of the real user profile."""
+    d = tmp_path / "_settings"
+    d.mkdir()
+    monkeypatch.setattr(config, "SETTINGS_DIR", str(d))
+    monkeypatch.setattr(config, "SETTINGS_FILE", str(d / "settings.json"))
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
@@ -0,0 +1,102 @@
+import hashlib
+import os
+
+import pytest
+
+from app.services import config, minecraft
+
+
+def _tree(root, files):
+    for rel, text in files.items():
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(text, encoding="utf-8")
+
+
+def _manifest(version, files):
+    return {
+        "version": version,
+        "paths": [{"path": "mods", "mode": "replace"}, {"path": "options.txt", "mode": "replace"}],
+        "files": [{"path": rel, "size": len(t), "sha256": hashlib.sha256(t.encode()).hexdigest()}
+                  for rel, t in files.items()],
+    }
+
+
+def _use_mc(mc):
+    s = config.load_settings()
+    s["minecraft_path"] = str(mc)
+    config.save_settings(s)
+
+
+def test_only_changed_files_are_backed_up_and_replaced(tmp_path):
+    mc = tmp_path / ".minecraft"
+    _tree(mc, {"mods/a.jar": "a", "mods/b.jar": "b", "mods/gone.jar": "x", "options.txt": "o"})
+    _use_mc(mc)
+    pack = {"mods/a.jar": "a", "mods/b.jar": "b2", "mods/new/c.jar": "c", "options.txt": "o"}
+    ex = tmp_path / "ex"
+    _tree(ex, pack)
+
+    logs = []
+    minecraft.apply_manifest(str(ex), _manifest("v1", pack), dry_run=False, log=logs.append)
+
+    assert (mc / "mods/b.jar").read_text() == "b2"
+    assert (mc / "mods/new/c.jar").read_text() == "c"
+    assert not (mc / "mods/gone.jar").exists()
+    backup = minecraft.last_rollback_point()
+    backed = {os.path.relpath(os.path.join(b, f), backup).replace("\\", "/")
+              for b, _, fs in os.walk(backup) for f in fs if f != "txn.json"}
+    assert backed == {"mods/b.jar", "mods/gone.jar"}
+
+
+def test_rerun_of_same_version_is_a_no_op(tmp_path):
+    mc = tmp_path / ".minecraft"
+    pack = {"mods/a.jar": "a", "options.txt": "o"}
+    _tree(mc, pack)
+    _use_mc(mc)
+    mani = _manifest("v1", pack)
+    ex = tmp_path / "ex"
+    _tree(ex, pack)
+    minecraft.apply_manifest(str(ex), mani, dry_run=False, log=lambda _m: None)
+    assert minecraft.is_up_to_date(mani, lambda _m: None)
+
+    logs = []
+    minecraft.apply_manifest(str(ex), mani, dry_run=False, log=logs.append)
+    assert any("[UP TO DATE]" in line for line in logs)
+    assert not any("[STATE] hashed" in line for line in logs)  # stat-only comparison
+    assert not os.listdir(mc / "Backups")
+
+    (mc / "mods/a.jar").write_text("edited locally")
+    assert not minecraft.is_up_to_date(mani, lambda _m: None)
+
+
+def test_overlay_and_keep_local_modes(tmp_path):
+    mc = tmp_path / ".minecraft"
+    _tree(mc, {"config/a.toml": "player-a", "config/mine.toml": "m",
+               "shaderpacks/s.txt": "player-s", "mods/x.jar": "x"})
+    _use_mc(mc)
+    pack = {"config/a.toml": "pack-a", "shaderpacks/s.txt": "pack-s", "shaderpacks/new.txt": "n"}
+    mani = _manifest("v1", pack)
+    mani["paths"] = [{"path": "config", "mode": "overlay"}, {"path": "shaderpacks", "mode": "keep-local"}]
+    ex = tmp_path / "ex"
+    _tree(ex, pack)
+
+    minecraft.apply_manifest(str(ex), mani, dry_run=False, log=lambda _m: None)
+    assert (mc / "config/a.toml").read_text() == "pack-a"      # overlay updates pack files
+    assert (mc / "config/mine.toml").exists()                   # ...but keeps extras
+    assert (mc / "shaderpacks/s.txt").read_text() == "player-s"  # keep-local never overwrites
+    assert (mc / "shaderpacks/new.txt").read_text() == "n"      # ...but adds missing files
+    assert minecraft.is_up_to_date(mani, lambda _m: None)
+
+
+def test_apply_keeps_a_copy_of_the_installed_manifest(tmp_path, monkeypatch):
+    from app.services import github_api, verify
+
+    mc = tmp_path / ".minecraft"
+    _tree(mc, {"mods/a.jar": "a", "options.txt": "o"})
+    _use_mc(mc)
+    pack = {"mods/a.jar": "a2", "options.txt": "o"}
+    _tree(tmp_path / "ex", pack)
+    minecraft.apply_manifest(str(tmp_path / "ex"), _manifest("v7", pack), dry_run=False, log=lambda _m: None)
+    monkeypatch.setattr(github_api, "get_manifest_for_version", lambda *a, **k: pytest.fail("fetched"))
+    got = verify.installed_manifest(str(mc), lambda _m: None)
+    assert got["version"] == "v7" and {f["path"] for f in got["files"]} == set(pack)
@@ -0,0 +1,73 @@
+import os
+import zipfile
+
+from app.services import archive, catalog, config, minecraft
+
+
+def _files(root):
+    data = {
+        "saves/w/level.dat": b"level" * 2000,                  # compressible
+        "saves/w/region/r.0.0.mca": os.urandom(50_000),        # already compressed → stored
+        "saves/w/big.bin": b"0123456789abcdef" * 20_000,       # streamed (see PARALLEL_MAX below)
+        "saves/w/empty.txt": b"",
+        "saves/w/ünïcode.json": b"{}",
+    }
+    for rel, b in data.items():
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b)
+    return data
+
+
+def test_archive_roundtrip_and_single_file_restore(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "PARALLEL_MAX", 100_000)
+    src = tmp_path / "mc"
+    data = _files(src)
+    out = tmp_path / "b.zip"
+    stats = archive.write_archive(str(out), [(str(src / r), r) for r in data], workers=3)
+
+    assert stats["files"] == len(data) and stats["compressed"] < stats["bytes"]
+    with zipfile.ZipFile(out) as z:
+        assert z.testzip() is None
+        assert {n: z.read(n) for n in z.namelist()} == data
+        assert z.getinfo("saves/w/region/r.0.0.mca").compress_type == zipfile.ZIP_STORED
+    assert archive.list_archive(str(out))["saves/w/big.bin"] == len(data["saves/w/big.bin"])
+
+    dst = tmp_path / "restore"
+    assert archive.restore_files(str(out), ["saves/w/level.dat"], str(dst)) == 1
+    assert (dst / "saves/w/level.dat").read_bytes() == data["saves/w/level.dat"]
+    assert not (dst / "saves/w/big.bin").exists()
+
+
+def test_pending_members_are_bounded_by_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "PENDING_MAX", 60_000)   # room for one 40 KB file at a time
+    src = tmp_path / "mc"
+    names = [f"f{i}.bin" for i in range(6)]
+    src.mkdir()
+    for n in names:
+        (src / n).write_bytes(os.urandom(40_000))
+    written, ahead = [], []
+    compress = archive._compress
+
+    def spy(full, level, want_sha):
+        ahead.append(names.index(os.path.basename(full)) - len(written))
+        return compress(full, level, want_sha)
+
+    monkeypatch.setattr(archive, "_compress", spy)
+    archive.write_archive(str(tmp_path / "b.zip"), [(str(src / n), n) for n in names], workers=4,
+                          on_member=lambda arc, size, sha: written.append(arc))
+    assert written == names
+    assert max(ahead) == 0   # each file was only read once the one before it was written
+
+
+def test_create_backup_archive_format_is_catalogued(tmp_path):
+    mc = tmp_path / ".minecraft"
+    _files(mc)
+    s = config.load_settings()
+    s["minecraft_path"], s["backup_format"] = str(mc), "archive"
+    config.save_settings(s)
+
+    dest = minecraft.create_backup("worlds", ["saves"], lambda _m: None)
+    assert dest.endswith(".zip") and zipfile.is_zipfile(dest)
+    e = catalog.entries(minecraft.backups_dir())[0]
+    assert e["name"] == os.path.basename(dest) and e["size"] == os.path.getsize(dest)
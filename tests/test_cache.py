@@ -0,0 +1,98 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from app.services import cache, github_api
+
+
+def _obj(tmp_path, name, data):
+    p = tmp_path / name
+    p.write_bytes(data)
+    return str(p)
+
+
+def test_put_lookup_and_materialize(tmp_path):
+    src = _obj(tmp_path, "pack.zip", b"pack bytes")
+    sha = hashlib.sha256(b"pack bytes").hexdigest()
+    assert cache.lookup(sha) is None
+    cache.put(src, sha)
+    assert open(cache.lookup(sha), "rb").read() == b"pack bytes"
+
+    (tmp_path / "dl").mkdir()
+    out = cache.materialize(sha, str(tmp_path / "dl"), "minecraft-pack.zip")
+    assert open(out, "rb").read() == b"pack bytes"
+
+
+def test_object_written_through_a_link_is_not_handed_out(tmp_path):
+    sha = hashlib.sha256(b"pack bytes").hexdigest()
+    cache.put(_obj(tmp_path, "pack.zip", b"pack bytes"), sha)
+    (tmp_path / "dl").mkdir()
+    out = cache.materialize(sha, str(tmp_path / "dl"), "minecraft-pack.zip")
+    with open(out, "r+b") as f:   # an in-place write through the hardlink reaches the object
+        f.write(b"PACK")
+    assert cache.materialize(sha, str(tmp_path / "dl2"), "minecraft-pack.zip") is None
+    assert cache.lookup(sha) is None   # dropped, so the next download refills it
+
+
+def test_download_never_truncates_a_cached_object_in_place(tmp_path, monkeypatch):
+    sha = hashlib.sha256(b"pack bytes").hexdigest()
+    cache.put(_obj(tmp_path, "pack.zip", b"pack bytes"), sha)
+    dl = tmp_path / "dl"
+    dl.mkdir()
+    cache.materialize(sha, str(dl), "minecraft-pack.zip")
+
+    class Resp:
+        headers = {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *a):
+            pass
+
+        def raise_for_status(self):
+            pass
+
+        def iter_content(self, chunk_size):
+            yield b"other release"
+
+    monkeypatch.setattr(github_api, "_latest_asset", lambda name, tag=None: {"browser_download_url": "u"})
+    monkeypatch.setattr(github_api.requests, "get", lambda *a, **k: Resp())
+    out = github_api.download_asset("minecraft-pack.zip", str(dl))
+    assert open(out, "rb").read() == b"other release"
+    assert open(cache.lookup(sha), "rb").read() == b"pack bytes"
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    shas = ["a1" * 32, "b2" * 32, "c3" * 32]
+    for i, sha in enumerate(shas):
+        dst = cache.put(_obj(tmp_path, f"f{i}", b"x" * 1000), sha)
+        os.utime(dst, (1000 + i, 1000 + i))
+    cache.lookup(shas[0])  # touch the oldest: now most recently used
+
+    freed = cache.evict(2000)
+    assert freed == 1000
+    assert cache.lookup(shas[1]) is None
+    assert cache.lookup(shas[0]) and cache.lookup(shas[2])
+
+
+def test_cleanup_removes_only_old_orphans(tmp_path, monkeypatch):
+    temp = tmp_path / "temp"
+    temp.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp))   # never touch the real %TEMP%
+    stage = tmp_path / "stage"
+    old_extract = stage / "extract_old"
+    new_extract = stage / "extract_new"
+    old_extract.mkdir(parents=True)
+    new_extract.mkdir()
+    old_tmp = tempfile.mkdtemp(prefix=cache.TEMP_PREFIX)
+    new_tmp = tempfile.mkdtemp(prefix=cache.TEMP_PREFIX)
+    not_ours = tempfile.mkdtemp(prefix="other_")
+    aged = time.time() - cache.ORPHAN_AGE - 60
+    for p in (old_extract, old_tmp, not_ours):
+        os.utime(p, (aged, aged))
+
+    assert cache.cleanup_temp_dirs([str(stage)]) == 2
+    assert not old_extract.exists() and not os.path.exists(old_tmp)
+    assert new_extract.exists() and os.path.exists(new_tmp) and os.path.exists(not_ours)
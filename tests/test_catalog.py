@@ -0,0 +1,63 @@
+import os
+
+from app.services import catalog
+
+
+def _backup(root, name, size):
+    d = root / name
+    d.mkdir(parents=True)
+    (d / "f.bin").write_bytes(b"x" * size)
+    return str(d)
+
+
+def test_order_comes_from_catalog_not_names(tmp_path):
+    root = tmp_path / "Backups"
+    catalog.add(str(root), _backup(root, "20240101_000000_zz_label", 10), "zz_label", ["mods"])
+    catalog.add(str(root), _backup(root, "20240101_000000_aa_label", 10), "aa_label", ["mods"])
+    old = _backup(root, "manual_copy", 5)  # not in the catalog: picked up once, dated by mtime
+    os.utime(old, (0, 0))
+
+    names = [e["name"] for e in catalog.entries(str(root))]
+    assert names == ["20240101_000000_aa_label", "20240101_000000_zz_label", "manual_copy"]
+    e = next(x for x in catalog.entries(str(root)) if x["name"] == "20240101_000000_aa_label")
+    assert e["size"] == 10 and e["items"] == ["mods"]
+
+
+def test_select_prunable_limits():
+    now = 1_000_000.0
+    items = [{"name": f"b{i}", "created": now - i * 86400, "size": 100 * 1024 * 1024} for i in range(5)]
+    assert [e["name"] for e in catalog.select_prunable(items, keep_n=3, now=now)] == ["b3", "b4"]
+    assert [e["name"] for e in catalog.select_prunable(items, max_age_days=2.5, now=now)] == ["b3", "b4"]
+    assert [e["name"] for e in catalog.select_prunable(items, max_total_mb=250, now=now)] == ["b2", "b3", "b4"]
+    # the newest is kept even when it alone exceeds the size limit
+    assert catalog.select_prunable(items[:1], max_total_mb=1, now=now) == []
+
+
+def test_prune_moves_to_trash_then_purge_deletes(tmp_path):
+    root = tmp_path / "Backups"
+    for i in range(3):
+        catalog.add(str(root), _backup(root, f"b{i}", 1), "pre_update", ["mods"])
+        os.utime(root / f"b{i}", (i, i))
+
+    gone = catalog.prune(str(root), keep_n=1)
+    assert sorted(gone) == ["b0", "b1"]
+    assert [e["name"] for e in catalog.entries(str(root))] == ["b2"]
+    assert len(os.listdir(root / catalog.TRASH_DIR)) == 2
+    assert catalog.purge_trash(str(root)) == 2
+    assert not os.listdir(root / catalog.TRASH_DIR)
+
+
+def test_cancelled_purge_leaves_the_rest_in_the_trash(tmp_path):
+    root = tmp_path / "Backups"
+    for i in range(3):
+        catalog.add(str(root), _backup(root, f"b{i}", 1), "pre_update", ["mods"])
+    catalog.prune(str(root), keep_n=1)
+    calls = []
+
+    def cancelled():
+        calls.append(1)
+        return len(calls) > 2   # let the first folder go, then stop
+
+    assert catalog.purge_trash(str(root), cancelled=cancelled) == 1
+    assert len(os.listdir(root / catalog.TRASH_DIR)) == 1
+    assert catalog.purge_trash(str(root)) == 1
@@ -0,0 +1,44 @@
+import hashlib
+import io
+import json
+
+import pytest
+
+from app.services import compact_manifest, packer
+
+
+def _manifest(n):
+    files = [{"path": f"mods/m{i % 7}/file{i:05d}.jar", "size": i * 1000,
+              "sha256": hashlib.sha256(str(i).encode()).hexdigest()} for i in range(n)]
+    files[3]["alias"] = files[4]["path"]
+    return {"version": "v9", "asset": "minecraft-pack.zip", "sha256": "ab" * 32,
+            "paths": [{"path": "mods", "mode": "mirror"}], "files": files}
+
+
+def test_round_trip_lookup_and_stream():
+    mani = _manifest(1000)
+    data = compact_manifest.dumps(mani)
+    assert len(data) < len(json.dumps(mani)) / 3
+
+    loaded = compact_manifest.loads(data)
+    assert {k: v for k, v in loaded.items() if k != "files"} == {k: v for k, v in mani.items() if k != "files"}
+    assert list(loaded["files"]) == sorted(mani["files"], key=lambda f: f["path"])
+    assert len(loaded["files"]) == 1000
+    assert loaded["files"].get(mani["files"][3]["path"]) == mani["files"][3]
+    assert loaded["files"].get("mods/nope.jar") is None and loaded["files"].get("a") is None
+
+    head, files = compact_manifest.read_stream(io.BytesIO(data))
+    assert head["version"] == "v9" and sum(1 for _ in files) == 1000
+
+    with pytest.raises(ValueError):
+        compact_manifest.loads(data[:4].replace(b"\x01", b"\x09") + data[4:])
+
+
+def test_build_writes_both_forms(tmp_path):
+    mc = tmp_path / ".minecraft" / "config"
+    mc.mkdir(parents=True)
+    (mc / "a.txt").write_text("hi", encoding="utf-8")
+    res = packer.build(["config"], str(tmp_path / "out"), mc=str(tmp_path / ".minecraft"))
+    compact = compact_manifest.load(str(tmp_path / "out" / compact_manifest.ASSET))
+    assert compact["sha256"] == res.manifest["sha256"]
+    assert list(compact["files"]) == res.manifest["files"]
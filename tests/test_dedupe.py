@@ -0,0 +1,75 @@
+import os
+import zipfile
+
+import pytest
+from app.services import config, packer
+from app.services.updater import materialize_aliases
+
+
+@pytest.fixture(autouse=True)
+def _dedupe_on():
+    s = config.load_settings()
+    s["build_dedupe"] = True
+    config.save_settings(s)
+
+
+def _mc(tmp_path):
+    jar = os.urandom(4000)
+    mc = tmp_path / ".minecraft"
+    for rel, data in {"mods/a.jar": jar, "mods/copy-of-a.jar": jar, "mods/other.jar": os.urandom(4000),
+                      "config/x.toml": b"x=1", "defaultconfigs/x.toml": b"x=1"}.items():
+        (mc / rel).parent.mkdir(parents=True, exist_ok=True)
+        (mc / rel).write_bytes(data)
+    return mc
+
+
+def test_every_copy_after_the_first_is_an_alias(tmp_path):
+    jar = os.urandom(3000)
+    mc = tmp_path / ".minecraft" / "mods"
+    mc.mkdir(parents=True)
+    for n in "abcde":
+        (mc / f"{n}.jar").write_bytes(jar)
+    res = packer.build(["mods"], str(tmp_path / "out"), mc=str(tmp_path / ".minecraft"))
+    with zipfile.ZipFile(res.zip_path) as z:
+        assert z.namelist() == ["mods/a.jar"]
+    assert {f["path"]: f.get("alias") for f in res.manifest["files"]} == {
+        "mods/a.jar": None, **{f"mods/{n}.jar": "mods/a.jar" for n in "bcde"}}
+
+
+def test_copy_known_from_the_last_build_is_compared_with_new_files(tmp_path):
+    jar = os.urandom(3000)
+    mods = tmp_path / ".minecraft" / "mods"
+    mods.mkdir(parents=True)
+    (mods / "b.jar").write_bytes(jar)
+    packer.build(["mods"], str(tmp_path / "out"), mc=str(tmp_path / ".minecraft"))
+    (mods / "a.jar").write_bytes(jar)   # new, and walked before b.jar whose sha comes from the index
+    res = packer.build(["mods"], str(tmp_path / "out"), mc=str(tmp_path / ".minecraft"))
+    with zipfile.ZipFile(res.zip_path) as z:
+        assert z.namelist() == ["mods/a.jar"]
+    assert {f["path"]: f.get("alias") for f in res.manifest["files"]} == {"mods/a.jar": None, "mods/b.jar": "mods/a.jar"}
+
+
+def test_dedupe_is_off_by_default(tmp_path):
+    s = config.load_settings()
+    s.pop("build_dedupe")
+    config.save_settings(s)
+    mc = _mc(tmp_path)
+    res = packer.build(["mods"], str(tmp_path / "out"), mc=str(mc))
+    assert not any(f.get("alias") for f in res.manifest["files"])
+
+
+def test_duplicates_are_packed_once_and_recreated(tmp_path):
+    mc = _mc(tmp_path)
+    for _ in range(2):  # the second, incremental build must dedupe the same way
+        res = packer.build(["mods", "config", "defaultconfigs"], str(tmp_path / "out"), mc=str(mc))
+    aliases = {f["path"]: f["alias"] for f in res.manifest["files"] if f.get("alias")}
+    assert aliases == {"mods/copy-of-a.jar": "mods/a.jar", "defaultconfigs/x.toml": "config/x.toml"}
+
+    ex = tmp_path / "ex"
+    with zipfile.ZipFile(res.zip_path) as z:
+        assert sorted(z.namelist()) == ["config/x.toml", "mods/a.jar", "mods/other.jar"]
+        z.extractall(ex)
+    assert materialize_aliases(str(ex), res.manifest) == 2
+    assert (ex / "defaultconfigs/x.toml").read_bytes() == b"x=1"
+    assert os.path.samefile(ex / "mods/a.jar", ex / "mods/copy-of-a.jar")          # jars: hardlinked
+    assert not os.path.samefile(ex / "config/x.toml", ex / "defaultconfigs/x.toml")  # configs: copied
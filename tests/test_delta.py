@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import random
+import time
+import zipfile
+import pytest
+from app.services import delta, state
+
+
+def _zip(path, files):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for name, data in files.items():
+            z.writestr(name, data)
+
+
+def test_make_and_apply_delta_roundtrip(tmp_path):
+    rng = random.Random(7)
+    old = rng.randbytes(300_000)
+    new = old[:100_000] + b"inserted bytes" + old[100_000:250_000] + rng.randbytes(5000) + old[260_000:]
+    payload = delta.make_delta(old, new)
+    assert len(payload) < 20_000
+
+    (tmp_path / "old.bin").write_bytes(old)
+    delta.apply_delta(str(tmp_path / "old.bin"), payload, str(tmp_path / "new.bin"))
+    assert (tmp_path / "new.bin").read_bytes() == new
+
+
+def test_make_delta_gives_up_on_unrelated_content():
+    rng = random.Random(8)
+    assert delta.make_delta(rng.randbytes(100_000), rng.randbytes(100_000), max_literal=50_000) is None
+
+
+def test_build_and_reconstruct(tmp_path):
+    rng = random.Random(9)
+    jar_v1 = rng.randbytes(200_000)
+    jar_v2 = jar_v1[:150_000] + b"patched" + jar_v1[150_000:]
+    _zip(tmp_path / "v1.zip", {"mods/a.jar": jar_v1, "config/x.toml": b"x=1", "config/gone.toml": b"bye"})
+    _zip(tmp_path / "v2.zip", {"mods/a.jar": jar_v2, "config/x.toml": b"x=1", "config/new.toml": b"y=2"})
+
+    entry = delta.build_delta(str(tmp_path / "v1.zip"), {"version": "1"}, str(tmp_path / "v2.zip"),
+                              {"version": "2"}, str(tmp_path / delta.DELTA_ASSET), print)
+    assert (entry["from_version"], entry["to_version"]) == ("1", "2")
+    assert entry["size"] < 50_000
+
+    mc = tmp_path / "mc"
+    (mc / "mods").mkdir(parents=True)
+    (mc / "config").mkdir()
+    (mc / "mods/a.jar").write_bytes(jar_v1)
+    (mc / "config/x.toml").write_bytes(b"x=1")
+
+    out = tmp_path / "out"
+    assert delta.reconstruct(str(tmp_path / delta.DELTA_ASSET), str(mc), str(out), print) == 2  # patched + added
+    assert (out / "mods/a.jar").read_bytes() == jar_v2
+    assert (out / "config/x.toml").read_bytes() == b"x=1"
+    assert (out / "config/new.toml").read_bytes() == b"y=2"
+    assert not (out / "config/gone.toml").exists()
+
+    # a locally edited base file must not be patched
+    (mc / "mods/a.jar").write_bytes(b"edited")
+    with pytest.raises(delta.DeltaError):
+        delta.reconstruct(str(tmp_path / delta.DELTA_ASSET), str(mc), str(tmp_path / "out2"), print)
+
+
+def test_unchanged_files_are_reused_without_reading_them(tmp_path, monkeypatch):
+    rng = random.Random(12)
+    jar, cfg = rng.randbytes(100_000), b"x=1"
+    files = {"mods/same.jar": jar, "config/x.toml": cfg}
+    _zip(tmp_path / "v1.zip", {**files, "config/y.toml": b"y=1"})
+    _zip(tmp_path / "v2.zip", {**files, "config/y.toml": b"y=2"})
+    delta.build_delta(str(tmp_path / "v1.zip"), {"version": "1"}, str(tmp_path / "v2.zip"),
+                      {"version": "2"}, str(tmp_path / delta.DELTA_ASSET), print)
+    mc = tmp_path / "mc"
+    for rel, data in {**files, "config/y.toml": b"y=1"}.items():
+        (mc / rel).parent.mkdir(parents=True, exist_ok=True)
+        (mc / rel).write_bytes(data)
+    shas = {rel: hashlib.sha256(data).hexdigest() for rel, data in files.items()}
+    state.save(str(mc), {rel: [os.stat(mc / rel).st_size, os.stat(mc / rel).st_mtime_ns, sha] for rel, sha in shas.items()})
+    manifest = {"version": "2", "files": [{"path": rel, "sha256": sha} for rel, sha in shas.items()]}
+
+    read = []
+    crc = delta.crc32_file
+    monkeypatch.setattr(delta, "crc32_file", lambda p: read.append(os.path.relpath(p, tmp_path)) or crc(p))
+    out = tmp_path / "out"
+    assert delta.reconstruct(str(tmp_path / delta.DELTA_ASSET), str(mc), str(out), print, manifest) == 1
+    assert read == [os.path.join("out", "config", "y.toml")]   # only the file that was written
+    assert os.path.samefile(out / "mods/same.jar", mc / "mods/same.jar")          # shared path: hardlinked
+    assert not os.path.samefile(out / "config/x.toml", mc / "config/x.toml")      # elsewhere: copied
+    assert (out / "config/x.toml").read_bytes() == cfg
+
+    # a same-sized local edit the index doesn't know about is still caught
+    (mc / "config/x.toml").write_bytes(b"x=2")
+    with pytest.raises(delta.DeltaError):
+        delta.reconstruct(str(tmp_path / delta.DELTA_ASSET), str(mc), str(tmp_path / "out2"), print, manifest)
+
+
+def test_pick_delta_matches_local_version():
+    mani = {"version": "2", "deltas": [{"from_version": "1", "to_version": "2", "asset": "d.zip"}]}
+    assert delta.pick_delta(mani, "1")["asset"] == "d.zip"
+    assert delta.pick_delta(mani, "0") is None
+    assert delta.pick_delta(mani, "") is None
+
+
+def test_make_delta_rejects_unrelated_content_from_a_sample():
+    rng = random.Random(10)
+    old, new = rng.randbytes(4 << 20), rng.randbytes(4 << 20)
+    t0 = time.monotonic()
+    assert delta.make_delta(old, new, max_literal=len(new) // 2) is None
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_build_ships_files_whole_once_the_time_budget_is_spent(tmp_path, monkeypatch):
+    rng = random.Random(11)
+    jar_v1 = rng.randbytes(200_000)
+    jar_v2 = jar_v1[:150_000] + b"patched" + jar_v1[150_000:]
+    _zip(tmp_path / "v1.zip", {"mods/a.jar": jar_v1})
+    _zip(tmp_path / "v2.zip", {"mods/a.jar": jar_v2})
+    monkeypatch.setattr(delta, "TIME_BUDGET", 0.0)
+    lines = []
+
+    delta.build_delta(str(tmp_path / "v1.zip"), {"version": "1"}, str(tmp_path / "v2.zip"),
+                      {"version": "2"}, str(tmp_path / delta.DELTA_ASSET), lines.append)
+    with zipfile.ZipFile(tmp_path / delta.DELTA_ASSET) as z:
+        index = json.loads(z.read(delta.DELTA_INDEX))
+    assert [e["op"] for e in index["files"]] == ["add"]
+    assert any("budget" in l for l in lines)
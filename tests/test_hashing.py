@@ -0,0 +1,25 @@
+import hashlib
+import zlib
+from app.services import hashing
+
+
+def test_sha256_and_crc32_match_reference(tmp_path):
+    data = bytes(range(256)) * 9000  # spans several reuse cycles of the buffer
+    p = tmp_path / "blob.bin"
+    p.write_bytes(data)
+    want = hashlib.sha256(data).hexdigest()
+    assert hashing.sha256_file(str(p), use_mmap=False) == want
+    assert hashing.sha256_file(str(p), use_mmap=True) == want
+    assert hashing.crc32_file(str(p)) == zlib.crc32(data)
+
+
+def test_hash_files_concurrently(tmp_path):
+    paths = []
+    for i in range(20):
+        p = tmp_path / f"f{i}.txt"
+        p.write_text(f"file {i}", encoding="utf-8")
+        paths.append(str(p))
+    out = hashing.hash_files(paths, workers=4)
+    assert out == {p: hashlib.sha256(open(p, "rb").read()).hexdigest() for p in paths}
+    (tmp_path / "empty").write_bytes(b"")
+    assert hashing.sha256_file(str(tmp_path / "empty")) == hashlib.sha256(b"").hexdigest()
@@ -1,18 +1,51 @@
 from pathlib import Path
-from app.services.packer import build_pack, DEFAULT_INCLUDE
-from app.services.config import settings
-import json, os
+from app.services.packer import build, iter_entries
+from app.services.config import load_settings, save_settings
+import hashlib, json, os, zipfile
 
-def test_build_pack(tmp_path, monkeypatch):
+import pytest
+
+
+def _use_mc(mc):
+    s = load_settings()
+    s["minecraft_path"] = str(mc)
+    save_settings(s)
+
+
+def test_build_pack(tmp_path):
     # create fake minecraft dir with one file
     mc = tmp_path / ".minecraft" / "config"
     mc.mkdir(parents=True)
     (mc / "a.txt").write_text("hi", encoding="utf-8")
-    monkeypatch.setattr(settings, "minecraft_path", str((tmp_path/".minecraft").resolve()))
+    _use_mc((tmp_path / ".minecraft").resolve())
 
-    zip_path, manifest, manifest_path = build_pack(["config"], out_dir=tmp_path)
-    assert zip_path.exists()
-    assert manifest_path.exists()
+    zip_path, manifest_path, manifest = build(["config"], out_dir=str(tmp_path))
+    assert Path(zip_path).exists()
+    assert Path(manifest_path).exists()
     assert "sha256" in manifest
-    data = json.loads(manifest_path.read_text(encoding="utf-8"))
+    data = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
     assert data["asset"] == "minecraft-pack.zip"
+    assert data["files"] == [{"path": "config/a.txt", "size": 2, "sha256": hashlib.sha256(b"hi").hexdigest()}]
+
+
+def test_build_streams_and_skips_protected(tmp_path):
+    mc = tmp_path / ".minecraft"
+    for rel in ["mods/a.jar", "mods/sub/b.jar", "saves/w/level.dat", "options.txt"]:
+        (mc / rel).parent.mkdir(parents=True, exist_ok=True)
+        (mc / rel).write_bytes(os.urandom(100))
+
+    entries = iter_entries(str(mc), ["mods", "options.txt"])
+    assert next(entries).arc == "mods/a.jar"  # lazy: nothing is listed up front
+
+    seen = []
+    res = build(["mods", "saves", "options.txt"], str(tmp_path / "out"), mc=str(mc),
+                log=lambda _m: None, progress=seen.append)
+    with zipfile.ZipFile(res.zip_path) as z:
+        assert sorted(z.namelist()) == ["mods/a.jar", "mods/sub/b.jar", "options.txt"]
+        for f in res.manifest["files"]:
+            assert hashlib.sha256(z.read(f["path"])).hexdigest() == f["sha256"]
+    assert seen == sorted(seen) and seen[-1] == 0.95
+
+    with pytest.raises(RuntimeError):
+        build(["mods"], str(tmp_path / "out2"), mc=str(mc), cancelled=lambda: True)
+    assert not os.listdir(tmp_path / "out2")
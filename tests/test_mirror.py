@@ -0,0 +1,38 @@
+import hashlib
+import json
+from app.services import mirror
+
+
+def _out_dir(tmp_path, data=b"pack bytes" * 1000):
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "minecraft-pack.zip").write_bytes(data)
+    sha = hashlib.sha256(data).hexdigest()
+    (out / "manifest.json").write_text(json.dumps({"asset": "minecraft-pack.zip", "sha256": sha}), encoding="utf-8")
+    return out, sha
+
+
+def test_fetch_from_builtin_mirror(tmp_path):
+    out, sha = _out_dir(tmp_path)
+    with mirror.MirrorServer([str(out)], host="127.0.0.1", port=0) as srv:
+        url = f"http://127.0.0.1:{srv.port}"
+        got = mirror.fetch_from_mirror(url, "minecraft-pack.zip", sha, str(tmp_path / "dl"))
+        assert got and open(got, "rb").read() == (out / "minecraft-pack.zip").read_bytes()
+
+        # unknown object → None, nothing left behind
+        assert mirror.fetch_from_mirror(url, "x.zip", "0" * 64, str(tmp_path / "dl2")) is None
+        assert not list((tmp_path / "dl2").iterdir())
+
+
+def test_mirror_with_wrong_content_is_rejected(tmp_path):
+    out, sha = _out_dir(tmp_path)
+    with mirror.MirrorServer([], host="127.0.0.1", port=0) as srv:
+        srv.register(sha, str(out / "manifest.json"))  # serves the wrong bytes for this sha
+        got = mirror.fetch_from_mirror(f"http://127.0.0.1:{srv.port}", "minecraft-pack.zip", sha,
+                                       str(tmp_path / "dl"))
+    assert got is None
+    assert not (tmp_path / "dl" / "minecraft-pack.zip").exists()
+
+
+def test_unreachable_mirror_falls_through(tmp_path):
+    assert mirror.fetch_from_mirror("http://127.0.0.1:9", "a.zip", "a" * 64, str(tmp_path), timeout=0.5) is None
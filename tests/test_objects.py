@@ -0,0 +1,59 @@
+import hashlib
+import os
+
+from app.services import config, minecraft, objects
+
+
+def _tree(root, files):
+    for rel, text in files.items():
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(text, encoding="utf-8")
+
+
+def _manifest(version, files):
+    return {
+        "version": version,
+        "paths": [{"path": "mods", "mode": "mirror"}, {"path": "options.txt", "mode": "mirror"}],
+        "files": [{"path": rel, "size": len(t), "sha256": hashlib.sha256(t.encode()).hexdigest()}
+                  for rel, t in files.items()],
+    }
+
+
+def test_instances_share_one_copy_of_mods(tmp_path):
+    main, other = tmp_path / "main", tmp_path / "other"
+    _tree(main, {"options.txt": "o"})
+    _tree(other, {"mods/old.jar": "old", "options.txt": "mine"})
+    s = config.load_settings()
+    s["minecraft_path"], s["instances"] = str(main), [str(other), str(main), str(tmp_path / "missing")]
+    config.save_settings(s)
+    assert minecraft.extra_instances() == [str(other)]
+
+    pack = {"mods/a.jar": "aaaa", "mods/b.jar": "bbbb", "options.txt": "o"}
+    mani = _manifest("v1", pack)
+    ex = tmp_path / "ex"
+    _tree(ex, pack)
+    minecraft.apply_manifest(str(ex), mani, dry_run=False, log=lambda _m: None)
+
+    for rel in ("mods/a.jar", "mods/b.jar"):
+        assert os.path.samefile(main / rel, other / rel)  # one inode, two instances
+        assert os.stat(main / rel).st_nlink == 3           # + the store object
+    assert not (other / "mods/old.jar").exists()
+    assert (other / "options.txt").read_text() == "o"      # not shared: copied
+    assert os.stat(other / "options.txt").st_nlink == 1
+    assert minecraft.is_up_to_date(mani, lambda _m: None)
+
+    (other / "mods/extra.jar").write_text("x")
+    assert not minecraft.is_up_to_date(mani, lambda _m: None)
+
+
+def test_gc_drops_objects_no_instance_uses(tmp_path):
+    store = tmp_path / "store"
+    for text in ("kept", "gone"):
+        src = tmp_path / f"{text}.jar"
+        src.write_text(text)
+        objects.adopt(str(store), str(src), hashlib.sha256(text.encode()).hexdigest(), len(text))
+    os.remove(tmp_path / "gone.jar")
+
+    assert objects.gc(str(store)) == 1
+    assert os.path.exists(objects.path_for(str(store), hashlib.sha256(b"kept").hexdigest()))
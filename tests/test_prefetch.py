@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from app.services import config, minecraft, packer, prefetch, transaction, updater
+
+
+def _setup(tmp_path, monkeypatch):
+    src = tmp_path / "admin" / ".minecraft"
+    for rel, text in {"mods/a.jar": "a2", "config/x.toml": "x=2"}.items():
+        (src / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src / rel).write_text(text)
+    res = packer.build(["mods", "config"], str(tmp_path / "out"), mc=str(src))
+    res.manifest["version"] = "v2"
+
+    mc = tmp_path / ".minecraft"
+    (mc / "mods").mkdir(parents=True)
+    (mc / "mods/a.jar").write_text("a1")
+    s = config.load_settings()
+    s.update(minecraft_path=str(mc), last_applied_version="v1",
+             background_net_kbps=0, background_disk_kbps=0, background_low_priority=False)
+    config.save_settings(s)
+
+    polls = []
+
+    def latest(etag=None):
+        polls.append(etag)
+        return (None, etag) if etag == "e2" else ({"tag": "v2"}, "e2")
+
+    monkeypatch.setattr(prefetch, "get_latest_release", latest)
+    monkeypatch.setattr(prefetch, "manifest_from_release", lambda rel, log=None: res.manifest)
+    monkeypatch.setattr(updater, "download_asset", lambda *a, **k: res.zip_path)
+    return mc, res.manifest, polls
+
+
+def test_stage_then_apply_from_disk(tmp_path, monkeypatch):
+    mc, mani, polls = _setup(tmp_path, monkeypatch)
+    assert prefetch.run_once(lambda _m: None) == "staged"
+    assert (mc / "mods/a.jar").read_text() == "a1"          # nothing applied yet
+    assert prefetch.run_once(lambda _m: None) == "unchanged"
+    assert polls == [None, "e2"]
+
+    staged = prefetch.staged_manifest(str(mc))
+    assert staged["version"] == "v2" and list(staged["files"]) == sorted(mani["files"], key=lambda f: f["path"])
+    assert prefetch.take(str(mc), {**mani, "version": "v3"}, lambda _m: None) is None
+
+    monkeypatch.setattr(updater, "download_asset", lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+    ex = prefetch.take(str(mc), mani, lambda _m: None)
+    assert ex and prefetch.take(str(mc), mani, lambda _m: None) is None   # used once
+    minecraft.apply_manifest(ex, mani, dry_run=False, log=lambda _m: None)
+    assert (mc / "mods/a.jar").read_text() == "a2" and (mc / "config/x.toml").read_text() == "x=2"
+    assert prefetch.staged_manifest(str(mc)) is None
+
+
+def test_installed_version_discards_stage(tmp_path, monkeypatch):
+    mc, mani, _ = _setup(tmp_path, monkeypatch)
+    prefetch.run_once(lambda _m: None)
+    s = config.load_settings()
+    s["last_applied_version"] = "v2"
+    config.save_settings(s)
+    monkeypatch.setattr(prefetch, "get_latest_release", lambda etag=None: ({"tag": "v2"}, "e3"))
+    assert prefetch.run_once(lambda _m: None) == "current"
+    assert not os.path.exists(prefetch._stage_dir(str(mc)))
+
+
+def test_skips_the_poll_while_an_update_holds_minecraft(tmp_path, monkeypatch):
+    mc, mani, polls = _setup(tmp_path, monkeypatch)
+    with transaction.busy(str(mc)):
+        assert prefetch.run_once(lambda _m: None) == "busy"
+        with pytest.raises(transaction.BusyError):
+            with transaction.busy(str(mc), wait=False):
+                pass
+    assert polls == [] and prefetch.staged_manifest(str(mc)) is None
+    assert prefetch.run_once(lambda _m: None) == "staged"
@@ -0,0 +1,30 @@
+from app.services import minecraft, packer, rules
+
+
+def test_last_match_wins_and_dirs_prune():
+    m = rules.compile(["-*.log", "+keep.log", "-.cache/", "-config/secret/**", "junk"])
+    assert m.rules == ["-*.log", "+keep.log", "-.cache/", "-config/secret/**"]
+    assert not m.allows("logs/latest.log") and m.allows("config/keep.log")
+    assert m.allows("config/a.toml")
+    assert not m.allows("mods/.cache", True) and m.allows("mods/.cache")   # "dir/" only matches folders
+    assert not m.allows("config/secret/x.toml")
+    assert not m.allows_path("mods/.cache/index.bin")
+    assert rules.compile(None).allows("anything") and not rules.compile([])
+
+
+def test_build_skips_excluded_and_client_keeps_them(tmp_path, monkeypatch):
+    mc = tmp_path / ".minecraft"
+    for rel in ("config/a.toml", "config/debug.log", "config/.cache/big.bin"):
+        (mc / rel).parent.mkdir(parents=True, exist_ok=True)
+        (mc / rel).write_text(rel)
+    monkeypatch.setattr(packer, "load_settings", lambda: {"pack_rules": ["-*.log", "-.cache/"]})
+    res = packer.build(["config"], str(tmp_path / "out"), mc=str(mc))
+    assert [f["path"] for f in res.manifest["files"]] == ["config/a.toml"]
+    assert res.manifest["rules"] == ["-*.log", "-.cache/"]
+
+    # a mirror apply must not count the excluded local files as extras
+    rels, _ = minecraft.plan_apply(str(mc), res.manifest, lambda _m: None)
+    assert rels == []
+    (mc / "config/stray.toml").write_text("x")
+    rels, _ = minecraft.plan_apply(str(mc), res.manifest, lambda _m: None)
+    assert rels == ["config/stray.toml"]
@@ -0,0 +1,23 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from app.services import timing
+
+
+def test_record_writes_an_external_span():
+    timing.record("startup", 0.25, tab="user")
+    with open(timing.spans_path(), encoding="utf-8") as f:
+        last = json.loads(f.read().splitlines()[-1])
+    assert last["span"] == "startup" and last["duration_s"] == 0.25 and last["tab"] == "user"
+
+
+def test_main_window_import_stays_light():
+    pytest.importorskip("PySide6")
+    code = ("import sys, app.ui.main_window; "
+            "print(sorted(m for m in ('requests', 'app.services.github_api', "
+            "'app.services.minecraft', 'app.services.packer') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,46 @@
+import json
+
+from app.services import config, github_api, telemetry
+
+
+def _enabled(tmp_path):
+    s = config.load_settings()
+    s["telemetry_enabled"] = True
+    config.save_settings(s)
+    return telemetry.Telemetry(store=tmp_path / "t")
+
+
+def test_disabled_track_is_a_no_op(tmp_path):
+    t = telemetry.Telemetry(store=tmp_path / "t")
+    t.track("update")
+    t.save()
+    assert not t.journal.exists()
+
+
+def test_batches_append_one_line_and_compact(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "COMPACT_LINES", 3)
+    t = _enabled(tmp_path)
+    for _ in range(1000):
+        t.track("update")
+    t.track("build")
+    t.save()
+    assert t.journal.read_text().count("\n") == 1
+
+    for _ in range(2):
+        t.track("update")
+        t.save()
+    assert t.journal.read_text() == ""  # folded into the snapshot
+    assert json.loads(t.snapshot.read_text()) == {"update": 1002, "build": 1}
+    t.track("verify")
+    assert t.totals() == {"update": 1002, "build": 1, "verify": 1}
+
+
+def test_flush_uploads_totals_and_resets(tmp_path, monkeypatch):
+    t = _enabled(tmp_path)
+    sent = []
+    monkeypatch.setattr(github_api, "create_issue", lambda title, body: sent.append(body) or {})
+    t.track("publish", 2)
+    assert t.flush_due()
+    t.flush().join(5)
+    assert "| publish | 2 |" in sent[0]
+    assert not t.totals() and not t.flush_due()
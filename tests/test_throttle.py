@@ -0,0 +1,79 @@
+import hashlib
+import os
+
+from app.services import throttle
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, s):
+        self.now += s
+
+
+def test_token_bucket_paces_to_rate():
+    clock = _Clock()
+    b = throttle.TokenBucket(1000, clock=clock, sleep=clock.sleep)
+    for _ in range(10):
+        b.consume(500)
+    # 1000 tokens of burst, then 4000 more at 1000/s
+    assert abs(clock.now - 4.0) < 1e-9
+    assert throttle.TokenBucket(0, clock=clock, sleep=clock.sleep).consume(10 ** 9) == 0.0
+
+
+def test_background_limits_adapt_and_reset(monkeypatch):
+    slept, idle, logs = [], [0.0], []
+    monkeypatch.setattr(throttle.time, "sleep", slept.append)
+    monkeypatch.setattr(throttle, "ADAPT_EVERY", 0.0)
+    s = {"background_net_kbps": 1, "background_disk_kbps": 0, "background_idle_seconds": 60,
+         "background_low_priority": False}
+    with throttle.background(logs.append, s, idle=lambda: idle[0]):
+        throttle.net(3 * 1024)           # 1 KB burst, 2 KB of debt at 1 KB/s
+        throttle.disk(10 ** 9)           # no disk limit
+        assert len(slept) == 1 and 1.9 < slept[0] <= 2.0
+        idle[0] = 600                    # player walked away: full speed
+        throttle.net(10 ** 9)
+        assert len(slept) == 1
+        assert any("idle" in line for line in logs)
+    throttle.net(10 ** 9)               # outside the block nothing is limited
+    assert len(slept) == 1
+
+
+def test_extract_is_paced(tmp_path, monkeypatch):
+    import zipfile
+    from app.services import updater
+
+    z = tmp_path / "p.zip"
+    with zipfile.ZipFile(z, "w") as zf:
+        zf.writestr("mods/a.jar", os.urandom(100))
+        zf.writestr("config/b.toml", b"b")
+    seen = []
+    monkeypatch.setattr(throttle, "disk", seen.append)
+    monkeypatch.setattr(updater, "download_asset", lambda *a, **k: str(z))
+    monkeypatch.setattr(updater, "stage_root", lambda mc: str(tmp_path))
+    mani = {"asset": "p.zip", "sha256": hashlib.sha256(z.read_bytes()).hexdigest()}
+    ex = updater.prepare_update(mani, str(tmp_path), "", lambda _m: None)
+    assert sorted(seen) == [1, 100]
+    assert (tmp_path / ex / "mods" / "a.jar").stat().st_size == 100
+
+
+def test_limits_apply_only_to_the_job_that_asked(monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services import timing
+
+    slept = []
+    monkeypatch.setattr(throttle.time, "sleep", lambda s: slept.append((threading.current_thread().name, s)))
+    s = {"background_net_kbps": 1, "background_disk_kbps": 1, "background_low_priority": False}
+    with throttle.background(lambda _m: None, s):
+        other = threading.Thread(target=throttle.net, args=(10 ** 6,), name="mirror")   # e.g. the LAN mirror
+        other.start()
+        other.join()
+        assert slept == []
+        with ThreadPoolExecutor(1, thread_name_prefix="pool") as pool:
+            pool.submit(timing.bind(throttle.disk), 3 * 1024).result()   # working for the job: limited
+        assert [name for name, _ in slept] == ["pool_0"]
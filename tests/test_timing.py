@@ -0,0 +1,63 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.services import timing
+
+
+def _spans():
+    with open(timing.spans_path(), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_nested_spans_share_the_run_and_land_as_json_lines():
+    lines = []
+    with timing.run("update", log=lines.append, version="2"):
+        with timing.span("download", asset="pack.zip") as sp:
+            sp.add(bytes=2_000_000, files=1)
+            with timing.span("verify"):
+                pass
+        with timing.run("apply"):   # a nested run just joins the outer one
+            pass
+
+    rows = {r["span"]: r for r in _spans()}
+    assert list(rows) == ["verify", "download", "apply", "update"]   # written as each one ends
+    assert len({r["run"] for r in rows.values()}) == 1 and rows["update"]["run"].startswith("update-")
+    assert rows["verify"]["parent"] == "download" and rows["download"]["parent"] == "update"
+    assert rows["update"]["parent"] is None
+    assert (rows["download"]["bytes"], rows["download"]["files"], rows["download"]["asset"]) == (2_000_000, 1, "pack.zip")
+    assert rows["update"]["version"] == "2" and all(r["ok"] for r in rows.values())
+
+    assert lines[0].startswith("[TIMING] phase")
+    assert [l.split()[1] for l in lines[1:]] == ["update", "download", "verify", "apply"]
+    assert timing._runs == {}   # the run's spans are dropped once summarised
+
+
+def test_bind_carries_the_run_into_a_pool_thread():
+    def work(i):
+        with timing.span("hash", n=i):
+            return timing.current().run
+
+    with timing.run("build") as outer:
+        with ThreadPoolExecutor(2) as pool:
+            seen = list(pool.map(timing.bind(work), range(3)))
+            unbound = pool.submit(work, 9).result()   # without bind() the span has no run
+
+    assert seen == [outer.run] * 3 and unbound is None
+    hashed = [r for r in _spans() if r["span"] == "hash"]
+    assert sorted(r["n"] for r in hashed if r["run"] == outer.run) == [0, 1, 2]
+    assert all(r["parent"] == "build" for r in hashed if r["run"])
+
+
+def test_failed_span_and_timed_decorator():
+    @timing.timed()
+    def step():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        with timing.run("publish"):
+            step()
+
+    rows = {r["span"]: r for r in _spans()}
+    assert rows["step"]["ok"] is False and rows["publish"]["ok"] is False
+    assert rows["step"]["parent"] == "publish"
@@ -0,0 +1,107 @@
+import os
+import pytest
+from app.services import transaction
+
+
+def _tree(root, files):
+    for rel, text in files.items():
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(text, encoding="utf-8")
+
+
+def _read(root, rel):
+    return (root / rel).read_text(encoding="utf-8")
+
+
+def _setup(tmp_path):
+    mc = tmp_path / ".minecraft"
+    _tree(mc, {"mods/a.jar": "old-a", "mods/b.jar": "old-b", "options.txt": "old-opts"})
+    src = tmp_path / "src"
+    _tree(src, {"mods/a.jar": "new-a", "config/x.toml": "new-x", "options.txt": "new-opts"})
+    return mc, src, mc / "Backups"
+
+
+def test_apply_then_rollback(tmp_path):
+    mc, src, backups = _setup(tmp_path)
+    backup = transaction.apply_paths(str(mc), str(src), ["mods", "config", "options.txt"], str(backups), print,
+                                     version="2", prev_version="1")
+
+    assert _read(mc, "mods/a.jar") == "new-a"
+    assert not (mc / "mods/b.jar").exists()
+    assert _read(mc, "config/x.toml") == "new-x"
+    assert (mc / "Backups" / os.path.basename(backup) / "mods/b.jar").read_text(encoding="utf-8") == "old-b"
+    assert transaction.is_transaction_backup(backup)
+    assert not os.listdir(mc / ".mcman" / "txn")
+
+    hdr = transaction.rollback_backup(str(mc), backup, str(backups), print)
+    assert hdr["prev_version"] == "1"
+    assert _read(mc, "mods/b.jar") == "old-b"
+    assert _read(mc, "options.txt") == "old-opts"
+    assert not (mc / "config").exists()
+
+
+def test_failure_mid_swap_rolls_back(tmp_path, monkeypatch):
+    mc, src, backups = _setup(tmp_path)
+    real_replace = os.replace
+    calls = {"n": 0}
+
+    def flaky(a, b):
+        calls["n"] += 1
+        if str(a).endswith("options.txt") and str(mc) in str(a) and ".mcman" not in str(a):
+            raise PermissionError("locked")
+        return real_replace(a, b)
+
+    monkeypatch.setattr(transaction.os, "replace", flaky)
+    with pytest.raises(PermissionError):
+        transaction.apply_paths(str(mc), str(src), ["mods", "config", "options.txt"], str(backups), print)
+    monkeypatch.setattr(transaction.os, "replace", real_replace)
+
+    assert _read(mc, "mods/a.jar") == "old-a"
+    assert _read(mc, "mods/b.jar") == "old-b"
+    assert not (mc / "config").exists()
+    assert not os.listdir(mc / ".mcman" / "txn")
+
+
+def test_recover_rolls_forward_interrupted_swap(tmp_path):
+    mc, src, backups = _setup(tmp_path)
+    txn = transaction.Transaction.begin(str(mc), ["mods", "options.txt"], version="2")
+    txn.stage(str(src), print)
+    txn._mark("swapping")
+    txn._swap_one(0, txn.ops[0])  # "crash" after the first path
+
+    assert transaction.recover(str(mc), str(backups), print) == ["committed"]
+    assert _read(mc, "mods/a.jar") == "new-a"
+    assert _read(mc, "options.txt") == "new-opts"
+    assert any(n.endswith("_pre_update") for n in os.listdir(backups))
+
+
+@pytest.mark.parametrize("rel, text", [("options.txt", "new-opts"), ("config", None)])
+def test_recover_when_renames_landed_but_their_journal_lines_did_not(tmp_path, rel, text):
+    mc, src, backups = _setup(tmp_path)
+    txn = transaction.Transaction.begin(str(mc), [rel, "mods"], version="2")
+    txn.stage(str(src), print)
+    txn._mark("swapping")
+    txn._swap_one(0, txn.ops[0])
+    # power loss: the renames reached the disk, the un-synced "done" lines did not
+    with open(txn.journal, encoding="utf-8") as f:
+        lines = [line for line in f if '"step"' not in line]
+    with open(txn.journal, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+    assert transaction.recover(str(mc), str(backups), print) == ["committed"]
+    assert _read(mc, "options.txt" if text else "config/x.toml") == (text or "new-x")
+    assert _read(mc, "mods/a.jar") == "new-a"
+    backup = backups / next(n for n in os.listdir(backups) if n.endswith("_pre_update"))
+    assert _read(backup, "mods/b.jar") == "old-b"
+    if text:
+        assert _read(backup, "options.txt") == "old-opts"   # the original survives in the backup
+    else:
+        assert not (backup / "config").exists()
+
+
+def test_recover_discards_partial_stage(tmp_path):
+    mc, src, backups = _setup(tmp_path)
+    transaction.Transaction.begin(str(mc), ["mods"])
+    assert transaction.recover(str(mc), str(backups), print) == ["discarded"]
+    assert _read(mc, "mods/a.jar") == "old-a"
@@ -0,0 +1,146 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+from app.services import config, github_api
+
+
+class _MockRelease:
+    """Just enough of the GitHub release/upload API: list, delete and upload assets."""
+
+    def __init__(self, fail_first: int = 0):
+        self.assets = {}
+        self.events = []
+        self.fail_left = fail_first
+        self.next_id = 100
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *a):
+                pass
+
+            def _json(self, code, obj):
+                body = json.dumps(obj).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if "per_page" in self.path:  # list releases (publish prunes others)
+                    return self._json(200, [])
+                base = f"http://127.0.0.1:{self.server.server_address[1]}"
+                assets = [{"name": n, "url": f"{base}/assets/{a['id']}"} for n, a in mock.assets.items()]
+                self._json(200, {"id": 1, "tag_name": "v1", "upload_url": mock.upload_url, "assets": assets})
+
+            def do_DELETE(self):
+                aid = int(self.path.rsplit("/", 1)[1])
+                name = next(n for n, a in mock.assets.items() if a["id"] == aid)
+                del mock.assets[name]
+                mock.events.append(("delete", name))
+                self.send_response(204)
+                self.end_headers()
+
+            def do_POST(self):
+                name = parse_qs(urlparse(self.path).query)["name"][0]
+                data = self.rfile.read(int(self.headers["Content-Length"]))
+                if mock.fail_left:
+                    mock.fail_left -= 1
+                    mock.events.append(("fail", name))
+                    return self._json(502, {"message": "Bad Gateway"})
+                if name in mock.assets:
+                    return self._json(422, {"errors": [{"code": "already_exists"}]})
+                mock.next_id += 1
+                mock.assets[name] = {"id": mock.next_id, "data": data}
+                mock.events.append(("upload", name))
+                self._json(201, {"id": mock.next_id, "name": name, "size": len(data)})
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def upload_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/repos/o/r/releases/1/assets{{?name,label}}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def mock_release(monkeypatch):
+    monkeypatch.setattr(github_api, "UPLOAD_BACKOFF", 0.0)
+    monkeypatch.setattr(github_api, "UPLOAD_CHUNK", 4096)  # many chunks through one buffer
+    made = []
+
+    def make(**kw):
+        m = _MockRelease(**kw)
+        made.append(m)
+        return m
+
+    yield make
+    for m in made:
+        m.close()
+
+
+def test_upload_streams_whole_file(tmp_path, mock_release):
+    m = mock_release()
+    data = bytes(range(256)) * 1000
+    (tmp_path / "pack.zip").write_bytes(data)
+    seen = []
+    github_api._upload_asset(m.upload_url, str(tmp_path / "pack.zip"), "pack.zip", "application/zip",
+                             progress=seen.append)
+    assert m.assets["pack.zip"]["data"] == data
+    assert seen[-1] == 1.0
+
+
+def test_conflict_deleted_before_upload_and_transient_failure_retried(tmp_path, mock_release):
+    m = mock_release(fail_first=1)
+    m.assets["pack.zip"] = {"id": 5, "data": b"old"}
+    (tmp_path / "pack.zip").write_bytes(b"new content")
+    logs = []
+    github_api._upload_asset(m.upload_url, str(tmp_path / "pack.zip"), "pack.zip", "application/zip", log=logs.append)
+
+    assert m.events == [("delete", "pack.zip"), ("fail", "pack.zip"), ("upload", "pack.zip")]
+    assert m.assets["pack.zip"]["data"] == b"new content"
+    assert any("retry 1/" in line for line in logs)
+
+
+def test_gives_up_after_max_attempts(tmp_path, mock_release, monkeypatch):
+    monkeypatch.setattr(github_api, "UPLOAD_ATTEMPTS", 2)
+    m = mock_release(fail_first=5)
+    (tmp_path / "pack.zip").write_bytes(b"x")
+    with pytest.raises(requests.HTTPError, match=r"^502 Server Error.*name=pack\.zip") as exc:
+        github_api._upload_asset(m.upload_url, str(tmp_path / "pack.zip"), "pack.zip", "application/zip")
+    assert exc.value.response.status_code == 502
+    assert [e[0] for e in m.events] == ["fail", "fail"]
+
+
+def test_publish_uploads_assets_concurrently_and_manifest_last(tmp_path, mock_release, monkeypatch):
+    m = mock_release()
+    m.assets["manifest.json"] = {"id": 7, "data": b"{}"}
+    monkeypatch.setattr(github_api, "API_BASE", m.upload_url.split("/repos/")[0])
+    monkeypatch.setattr(github_api, "remember_published", lambda *a, **k: None)
+    monkeypatch.setenv("GITHUB_TOKEN", "test-token")
+    s = config.load_settings()
+    s["repo_owner"], s["repo_name"] = "o", "r"
+    config.save_settings(s)
+
+    (tmp_path / "minecraft-pack.zip").write_bytes(b"z" * 50_000)
+    (tmp_path / "minecraft-pack.delta.zip").write_bytes(b"d" * 5_000)
+    mani = {"version": "v1", "deltas": [{"asset": "minecraft-pack.delta.zip"}]}
+    (tmp_path / "manifest.json").write_text(json.dumps(mani), encoding="utf-8")
+
+    seen = []
+    tag = github_api.publish_pack(str(tmp_path / "manifest.json"), str(tmp_path / "minecraft-pack.zip"),
+                                  log=lambda _m: None, progress=seen.append)
+    assert tag == "v1"
+    assert m.events[0] == ("delete", "manifest.json")
+    assert m.events[-1] == ("upload", "manifest.json")
+    assert {e[1] for e in m.events[1:-1]} == {"minecraft-pack.zip", "minecraft-pack.delta.zip"}
+    assert seen[-1] == 1.0
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services import cache, config, github_api, verify
+
+PACK = {"mods/a.jar": "a" * 5000, "mods/b.jar": "b" * 5000, "options.txt": "o"}
+
+
+def _setup(tmp_path):
+    mc = tmp_path / ".minecraft"
+    for rel, text in PACK.items():
+        (mc / rel).parent.mkdir(parents=True, exist_ok=True)
+        (mc / rel).write_text(text)
+    s = config.load_settings()
+    s["minecraft_path"] = str(mc)
+    config.save_settings(s)
+
+    zp = tmp_path / "minecraft-pack.zip"
+    with zipfile.ZipFile(zp, "w", zipfile.ZIP_DEFLATED) as z:
+        for rel, text in PACK.items():
+            z.writestr(rel, text)
+    mani = {
+        "version": "v1",
+        "sha256": hashlib.sha256(zp.read_bytes()).hexdigest(),
+        "paths": [{"path": "mods", "mode": "replace"}, {"path": "options.txt", "mode": "replace"}],
+        "files": [{"path": r, "size": len(t), "sha256": hashlib.sha256(t.encode()).hexdigest()}
+                  for r, t in PACK.items()],
+    }
+    return mc, zp, mani
+
+
+def test_verify_reports_and_repair_restores_only_broken_files(tmp_path):
+    mc, zp, mani = _setup(tmp_path)
+    assert not any(verify.verify(str(mc), mani, lambda _m: None)[k] for k in ("missing", "modified", "extra"))
+
+    (mc / "mods/a.jar").unlink()
+    (mc / "options.txt").write_text("edited")
+    (mc / "mods/extra.jar").write_text("x")
+    report = verify.verify(str(mc), mani, lambda _m: None)
+    assert report["missing"] == ["mods/a.jar"]
+    assert report["modified"] == ["options.txt"]
+    assert report["extra"] == ["mods/extra.jar"]
+
+    cache.put(str(zp), mani["sha256"])  # repair reads from the cached pack, no network
+    assert verify.repair(str(mc), mani, report, lambda _m: None) == 2
+    assert (mc / "mods/a.jar").read_text() == PACK["mods/a.jar"]
+    assert (mc / "options.txt").read_text() == "o"
+    assert (mc / "mods/extra.jar").exists()  # extras are only removed when asked
+    after = verify.verify(str(mc), mani, lambda _m: None)
+    assert not after["missing"] and not after["modified"]
+
+
+def test_range_file_reads_single_member(tmp_path):
+    _, zp, _ = _setup(tmp_path)
+    data = zp.read_bytes()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            start, end = self.headers["Range"].split("=")[1].split("-")
+            body = data[int(start):int(end) + 1]
+            self.send_response(206)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        rf = github_api.RangeFile(f"http://127.0.0.1:{httpd.server_address[1]}/p", len(data), {}, block=64)
+        with zipfile.ZipFile(rf) as z:
+            assert z.read("options.txt") == b"o"
+        assert rf.fetched < len(data)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_verify_uses_the_installed_version_and_never_repairs_across_versions(tmp_path, monkeypatch):
+    mc, zp, mani = _setup(tmp_path)
+    s = config.load_settings()
+    s["last_applied_version"] = "v1"
+    config.save_settings(s)
+    newer = {**mani, "version": "v2", "files": [dict(f, sha256="0" * 64) for f in mani["files"]]}
+    monkeypatch.setattr(github_api, "get_latest_manifest", lambda progress=None, log=None: newer)
+    monkeypatch.setattr(github_api, "get_manifest_for_version", lambda version, log=None: None)
+
+    # the v1 release is gone and nothing was saved locally: report against v2, no repair
+    logs = []
+    got, can_repair = verify.manifest_to_check(str(mc), logs.append)
+    assert got["version"] == "v2" and not can_repair
+    assert any("report only" in line for line in logs)
+    assert len(verify.verify(str(mc), got, lambda _m: None)["modified"]) == 3
+
+    # the release of the installed version is still there
+    monkeypatch.setattr(github_api, "get_manifest_for_version",
+                        lambda version, log=None: mani if version == "v1" else None)
+    got, can_repair = verify.manifest_to_check(str(mc), lambda _m: None)
+    assert got is mani and can_repair
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import zipfile
+
+from app.services import packer, watch
+
+
+def _mc(tmp_path):
+    mc = tmp_path / ".minecraft"
+    for rel, data in {"config/a.toml": b"a=1", "config/b.toml": b"b=1", "mods/x.jar": os.urandom(5000)}.items():
+        (mc / rel).parent.mkdir(parents=True, exist_ok=True)
+        (mc / rel).write_bytes(data)
+    return mc
+
+
+def test_rebuild_copies_unchanged_members(tmp_path):
+    mc, out = _mc(tmp_path), str(tmp_path / "out")
+    packer.build(["config", "mods"], out, mc=str(mc))
+    (mc / "config/a.toml").write_bytes(b"a=2, longer")
+    os.remove(mc / "config/b.toml")
+
+    logs = []
+    res = packer.build(["config", "mods"], out, mc=str(mc), log=logs.append)
+    assert any("1 unchanged" in line for line in logs)
+    with zipfile.ZipFile(res.zip_path) as z:
+        assert z.testzip() is None
+        assert sorted(z.namelist()) == ["config/a.toml", "mods/x.jar"]
+        for f in res.manifest["files"]:
+            assert hashlib.sha256(z.read(f["path"])).hexdigest() == f["sha256"]
+
+
+def test_watch_rebuilds_after_changes(tmp_path):
+    mc, out = _mc(tmp_path), str(tmp_path / "out")
+    packer.build(["config"], out, mc=str(mc))
+    built = []
+    ticks = iter(range(100))
+
+    def sleep(_s):
+        if next(ticks) == 1:
+            (mc / "config/new.toml").write_text("n")
+
+    n = watch.run(["config"], out, lambda _m: None, cancelled=lambda: len(built) == 1,
+                  after_build=built.append, mc=str(mc), interval=0, quiet=0, sleep=sleep)
+    assert n == 1
+    assert "config/new.toml" in {f["path"] for f in built[0].manifest["files"]}
+
+
+def test_build_with_changed_paths_touches_only_those(tmp_path, monkeypatch):
+    mc, out = _mc(tmp_path), str(tmp_path / "out")
+    (mc / "config/deep/x").mkdir(parents=True)
+    (mc / "config/deep/x/c.toml").write_bytes(b"c=1")
+    packer.build(["config", "mods"], out, mc=str(mc))
+    (mc / "config/a.toml").write_bytes(b"a=2, longer")
+    os.remove(mc / "config/b.toml")
+    (mc / "config/sub").mkdir()
+    (mc / "config/sub/n.toml").write_bytes(b"n=1")
+
+    walked = []
+    walk = packer._walk
+    monkeypatch.setattr(packer, "_walk", lambda top, arc, m=None: walked.append(arc) or walk(top, arc, m))
+    res = packer.build(["config", "mods"], out, mc=str(mc),
+                       changed=["config/a.toml", "config/b.toml", "config/sub"])
+    assert walked == ["config/sub"]
+    monkeypatch.undo()
+
+    full = packer.build(["config", "mods"], str(tmp_path / "full"), mc=str(mc))
+    with zipfile.ZipFile(res.zip_path) as a, zipfile.ZipFile(full.zip_path) as b:
+        assert a.namelist() == b.namelist()   # same member order as a full walk
+    assert res.manifest["files"] == full.manifest["files"]
+
+
+def test_folder_poller_sees_new_files_at_once_and_in_place_edits_on_the_sweep(tmp_path, monkeypatch):
+    from app.services import rules
+    mc = _mc(tmp_path)
+    monkeypatch.setattr(watch, "FULL_RESCAN_SECONDS", 3600)
+    poller = watch._FolderPoller(str(mc), ["config", "mods"], rules.compile(["-*.log"]))
+    assert poller.poll() == []
+
+    (mc / "config/new.toml").write_text("n")
+    (mc / "config/junk.log").write_text("x")
+    os.remove(mc / "mods/x.jar")
+    assert poller.poll() == ["config/new.toml", "mods/x.jar"]
+
+    st = os.stat(mc / "config")
+    (mc / "config/a.toml").write_bytes(b"a=2, longer")
+    os.utime(mc / "config", ns=(st.st_atime_ns, st.st_mtime_ns))   # an in-place edit leaves the folder alone
+    assert poller.poll() == []
+    monkeypatch.setattr(watch, "FULL_RESCAN_SECONDS", 0)
+    assert poller.poll() == ["config/a.toml"]
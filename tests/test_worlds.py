@@ -0,0 +1,50 @@
+import os
+import time
+
+from app.services import worlds
+
+
+def _write(root, rel, data):
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def _snapshot(root):
+    return {os.path.relpath(os.path.join(b, f), root).replace("\\", "/"): open(os.path.join(b, f), "rb").read()
+            for b, _, fs in os.walk(root) for f in fs}
+
+
+def test_increments_store_only_changes_and_restore_any_point(tmp_path):
+    mc, store = tmp_path / ".minecraft", str(tmp_path / "store")
+    _write(mc, "saves/w/region/r.0.0.mca", b"a" * 4000)
+    _write(mc, "saves/w/region/r.0.1.mca", b"b" * 4000)
+    _write(mc, "saves/w/level.dat", b"v1")
+    first = worlds.backup(str(mc), lambda _m: None, store=store, keep=0)
+    v1 = _snapshot(mc / "saves")
+
+    time.sleep(0.01)
+    _write(mc, "saves/w/level.dat", b"v2")
+    os.remove(mc / "saves/w/region/r.0.1.mca")
+    second = worlds.backup(str(mc), lambda _m: None, store=store, keep=0)
+    assert second["stored"] == 1
+    assert worlds.backup(str(mc), lambda _m: None, store=store, keep=0) is None  # nothing changed
+
+    worlds.restore(store, first["id"], str(tmp_path / "r1"), lambda _m: None)
+    worlds.restore(store, second["id"], str(tmp_path / "r2"), lambda _m: None)
+    assert _snapshot(tmp_path / "r1" / "saves") == v1
+    assert _snapshot(tmp_path / "r2" / "saves") == _snapshot(mc / "saves")
+
+
+def test_merge_keeps_latest_restorable(tmp_path):
+    mc, store = tmp_path / ".minecraft", str(tmp_path / "store")
+    ids = []
+    for i in range(3):
+        _write(mc, f"saves/w/f{i}.dat", b"x" * (i + 1))
+        ids.append(worlds.backup(str(mc), lambda _m: None, store=store, keep=0)["id"])
+
+    assert worlds.merge_old(store, 1, lambda _m: None) == 2
+    assert [e["id"] for e in worlds.load_chain(store)] == [ids[-1]]
+    assert sorted(os.listdir(store)) == sorted([worlds.CHAIN_FILE, f"{ids[-1]}.zip"])
+    worlds.restore(store, ids[-1], str(tmp_path / "r"), lambda _m: None)
+    assert _snapshot(tmp_path / "r" / "saves") == _snapshot(mc / "saves")